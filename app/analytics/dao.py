@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.analytics.models import (
+    BranchMonth,
+    CustomerSpend,
+    MvRefreshLog,
+    ProductSales,
+)
+from app.dao.base import BaseDAO
+from app.database import session_scope
+
+
+# Чтение материализованных представлений: списки, fields и filters
+# из BaseDAO плюс время последнего обновления данных
+class MaterializedViewDAO(BaseDAO):
+    @classmethod
+    async def refreshed_at(cls, session: AsyncSession | None = None) -> datetime | None:
+        async with session_scope(session) as session:
+            return await session.scalar(
+                select(MvRefreshLog.refreshed_at).filter_by(
+                    view_name=cls.model.__tablename__
+                )
+            )
+
+
+class CustomerSpendDAO(MaterializedViewDAO):
+    model = CustomerSpend
+
+
+class ProductSalesDAO(MaterializedViewDAO):
+    model = ProductSales
+
+
+class BranchMonthDAO(MaterializedViewDAO):
+    model = BranchMonth
+
+
+class RefreshLogDAO(BaseDAO):
+    model = MvRefreshLog
@@ -0,0 +1,86 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import Numeric
+from sqlalchemy.ext.asyncio import AsyncAttrs
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+from app.database import Base
+
+
+# Дневные итоги продаж в разрезе филиала, города, типа клиента и категории.
+# orders — продажи, в которых есть товары категории; order_share засчитывает
+# каждую продажу одной её категории, и его сумма по категориям не задваивает
+# продажи с товарами нескольких категорий
+class DailySalesRollup(Base):
+    __tablename__ = "daily_sales_rollup"
+    __table_args__ = ()
+
+    sale_date: Mapped[date] = mapped_column(primary_key=True)
+    branch: Mapped[str] = mapped_column(primary_key=True)
+    city: Mapped[str] = mapped_column(primary_key=True)
+    customer_type: Mapped[str] = mapped_column(primary_key=True)
+    product_category: Mapped[str] = mapped_column(primary_key=True)
+    revenue: Mapped[Decimal] = mapped_column(Numeric)
+    units: Mapped[int]
+    orders: Mapped[int]
+    order_share: Mapped[int]
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(sale_date={self.sale_date})"
+
+
+# Материализованные представления создаются миграциями вручную, поэтому
+# их модели живут в отдельных метаданных, которые не видит autogenerate
+class ViewBase(AsyncAttrs, DeclarativeBase):
+    __abstract__ = True
+
+
+class CustomerSpend(ViewBase):
+    __tablename__ = "mv_customer_spend"
+
+    customer_id: Mapped[int] = mapped_column(primary_key=True)
+    first_name: Mapped[str]
+    last_name: Mapped[str]
+    email: Mapped[str]
+    orders: Mapped[int]
+    units: Mapped[int]
+    revenue: Mapped[Decimal] = mapped_column(Numeric)
+    first_sale_date: Mapped[date | None]
+    last_sale_date: Mapped[date | None]
+
+
+class ProductSales(ViewBase):
+    __tablename__ = "mv_product_sales"
+
+    product_id: Mapped[int] = mapped_column(primary_key=True)
+    product_name: Mapped[str]
+    product_category: Mapped[str]
+    orders: Mapped[int]
+    units: Mapped[int]
+    revenue: Mapped[Decimal] = mapped_column(Numeric)
+    last_sale_date: Mapped[date | None]
+
+
+class BranchMonth(ViewBase):
+    __tablename__ = "mv_branch_month"
+
+    branch: Mapped[str] = mapped_column(primary_key=True)
+    month: Mapped[date] = mapped_column(primary_key=True)
+    orders: Mapped[int]
+    units: Mapped[int]
+    customers: Mapped[int]
+    revenue: Mapped[Decimal] = mapped_column(Numeric)
+
+
+# Время и длительность последнего обновления каждого представления
+class MvRefreshLog(Base):
+    __tablename__ = "mv_refresh_log"
+    __table_args__ = ()
+
+    view_name: Mapped[str] = mapped_column(primary_key=True)
+    refreshed_at: Mapped[datetime]
+    duration_ms: Mapped[int]
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(view_name={self.view_name})"
@@ -0,0 +1,82 @@
+from datetime import date
+
+from app.dao.filters import Filters, parse_filters
+
+
+class RBCustomerSpend:
+    def __init__(
+            self,
+            customer_id: int | None = None,
+            email: str | None = None,
+            filters: Filters = None,
+    ):
+        self.customer_id = customer_id
+        self.email = email
+        self.filters = parse_filters(filters)
+
+    def to_dict(self) -> dict:
+        date = {
+            'customer_id': self.customer_id,
+            'email': self.email,
+            'filters': self.filters,
+        }
+        filttered_date = {
+            key: value
+            for key, value in date.items()
+            if value is not None
+        }
+        return filttered_date
+
+
+class RBProductSales:
+    def __init__(
+            self,
+            product_id: int | None = None,
+            product_category: str | None = None,
+            filters: Filters = None,
+    ):
+        self.product_id = product_id
+        self.product_category = product_category
+        self.filters = parse_filters(filters)
+
+    def to_dict(self) -> dict:
+        date = {
+            'product_id': self.product_id,
+            'product_category': self.product_category,
+            'filters': self.filters,
+        }
+        filttered_date = {
+            key: value
+            for key, value in date.items()
+            if value is not None
+        }
+        return filttered_date
+
+
+class RBBranchMonth:
+    def __init__(
+            self,
+            branch: str | None = None,
+            start_time: date | None = None,
+            end_time: date | None = None,
+            filters: Filters = None,
+    ):
+        self.branch = branch
+        self.start_time = start_time
+        self.end_time = end_time
+        self.filters = parse_filters(filters)
+
+    def to_dict(self) -> dict:
+        date = {
+            'branch': self.branch,
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'param': 'month',
+            'filters': self.filters,
+        }
+        filttered_date = {
+            key: value
+            for key, value in date.items()
+            if value is not None
+        }
+        return filttered_date
@@ -0,0 +1,252 @@
+import argparse
+import asyncio
+from datetime import date
+from typing import Iterable
+
+from fastapi.logger import logger
+from sqlalchemy import (
+    Date,
+    Integer,
+    Numeric,
+    any_,
+    cast,
+    delete,
+    func,
+    insert,
+    literal,
+    select,
+    text,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.analytics.models import DailySalesRollup
+from app.cache import bump_table_version
+from app.dao.base import MAX_QUERY_PARAMS
+from app.database import close_engine, primary_reads, session_scope
+from app.products.models import Product
+from app.saledetails.models import SaleDetails
+from app.sales.models import Sale
+
+
+ROLLUP_COLUMNS = [
+    "sale_date",
+    "branch",
+    "city",
+    "customer_type",
+    "product_category",
+    "revenue",
+    "units",
+    "orders",
+    "order_share",
+]
+ROLLUP_KEY = ROLLUP_COLUMNS[:5]
+ROLLUP_MEASURES = ROLLUP_COLUMNS[5:]
+ZERO = (0, 0, 0, 0)
+
+
+def date_array(dates: Iterable[date]):
+    return literal(sorted(set(dates)), ARRAY(Date))
+
+
+# Продажи по списку (id, sale_date): два параметра-массива вместо
+# параметра на каждую продажу
+def affected_sales(keys: Iterable[tuple[int, date]]):
+    ids, dates = zip(*sorted(keys))
+    return func.unnest(
+        literal(list(ids), ARRAY(Integer)),
+        literal(list(dates), ARRAY(Date))
+    ).table_valued("sale_id", "sale_date").render_derived(name="affected")
+
+
+# Итоги по дням из сырых таблиц: сначала по продаже и категории,
+# затем по ключу таблицы итогов. Цена приводится к numeric до суммирования,
+# чтобы вклад продажи считался одинаково при каждом пересчёте
+def rollup_query(*conditions, sales=None):
+    category = Product.product_category
+    keys = [Sale.sale_date, Sale.branch, Sale.city, Sale.customer_type]
+    per_sale = (
+        select(
+            *keys,
+            category,
+            func.sum(
+                cast(Product.unit_price, Numeric) * SaleDetails.quantity
+            ).label("revenue"),
+            func.sum(SaleDetails.quantity).label("units"),
+            (
+                category
+                == func.min(category).over(partition_by=[Sale.id, Sale.sale_date])
+            ).label("first_category"),
+        )
+        .join(
+            SaleDetails,
+            (SaleDetails.sale_id == Sale.id)
+            & (SaleDetails.sale_date == Sale.sale_date)
+        )
+        .join(Product, Product.id == SaleDetails.product_id)
+    )
+    if sales is not None:
+        per_sale = per_sale.join(
+            sales,
+            (sales.c.sale_id == Sale.id) & (sales.c.sale_date == Sale.sale_date)
+        )
+    per_sale = (
+        per_sale
+        .where(*conditions)
+        .group_by(Sale.id, *keys, category)
+        .subquery("per_sale")
+    )
+    group = [per_sale.c[name] for name in ROLLUP_KEY]
+    return select(
+        *group,
+        func.sum(per_sale.c.revenue).label("revenue"),
+        func.sum(per_sale.c.units).label("units"),
+        func.count().label("orders"),
+        func.count().filter(per_sale.c.first_category).label("order_share"),
+    ).group_by(*group)
+
+
+# Вклад продаж в итоги по ключам таблицы итогов
+async def contributions(
+    session: AsyncSession,
+    keys: set[tuple[int, date]]
+) -> dict[tuple, tuple]:
+    if not keys:
+        return {}
+    query = rollup_query(
+        # Список дат даёт отсечение секций, которого нет у соединения с unnest
+        Sale.sale_date == any_(date_array(key[1] for key in keys)),
+        sales=affected_sales(keys)
+    )
+    with primary_reads():
+        result = await session.execute(query)
+    return {
+        tuple(row[:5]): (row.revenue, int(row.units), row.orders, row.order_share)
+        for row in result.all()
+    }
+
+
+# Прибавляет разницу к строкам итогов. Конкурентные записи по разным
+# продажам складываются и ждут друг друга только на общих строках итогов
+async def apply_rollup_delta(session: AsyncSession, delta: dict[tuple, tuple]):
+    if not delta:
+        return
+    rollup = DailySalesRollup
+    rows = [
+        dict(zip(ROLLUP_COLUMNS, (*key, *values)))
+        for key, values in sorted(delta.items())
+    ]
+    batch_size = MAX_QUERY_PARAMS // len(ROLLUP_COLUMNS)
+    with primary_reads():
+        for start in range(0, len(rows), batch_size):
+            query = pg_insert(rollup).values(rows[start:start + batch_size])
+            query = query.on_conflict_do_update(
+                index_elements=ROLLUP_KEY,
+                set_={
+                    **{
+                        name: getattr(rollup, name) + query.excluded[name]
+                        for name in ROLLUP_MEASURES
+                    },
+                    "updated_at": func.now(),
+                }
+            )
+            await session.execute(query)
+        # Ключи, в которых не осталось продаж
+        await session.execute(
+            delete(rollup).where(
+                rollup.orders == 0,
+                rollup.sale_date == any_(date_array(key[0] for key in delta))
+            )
+        )
+
+
+# Изменение итогов от одной записи: затронутые продажи и их вклад до неё.
+# Вклад считается по продаже целиком, поэтому orders и order_share,
+# которые не складываются построчно, остаются точными
+class RollupChange:
+    def __init__(self):
+        self.sales: set[tuple[int, date]] = set()
+        self.moved: set[tuple[int, date]] = set()
+        self.before: dict[tuple, list] = {}
+
+    # Вызывается до записи. Продажи блокируются, чтобы конкурентные записи
+    # по одной продаже считали её вклад по очереди
+    async def track(self, session: AsyncSession, keys: Iterable[tuple[int, date]]):
+        keys = {key for key in keys if None not in key} - self.sales
+        if not keys:
+            return
+        sales = affected_sales(keys)
+        with primary_reads():
+            await session.execute(
+                select(Sale.id)
+                .join(
+                    sales,
+                    (sales.c.sale_id == Sale.id) & (sales.c.sale_date == Sale.sale_date)
+                )
+                .order_by(Sale.id)
+                .with_for_update(key_share=True)
+            )
+        for key, values in (await contributions(session, keys)).items():
+            total = self.before.setdefault(key, list(ZERO))
+            for i, value in enumerate(values):
+                total[i] += value
+        self.sales |= keys
+
+    # Продажи, которые после записи окажутся под другой датой
+    def expect(self, keys: Iterable[tuple[int, date]]):
+        self.moved |= {key for key in keys if None not in key}
+
+    # Вызывается после записи в той же транзакции
+    async def apply(self, session: AsyncSession):
+        if not self.sales and not self.moved:
+            return
+        await session.flush()
+        after = await contributions(session, self.sales | self.moved)
+        delta = {}
+        for key in self.before.keys() | after.keys():
+            before = self.before.get(key, ZERO)
+            values = tuple(
+                new - old for new, old in zip(after.get(key, ZERO), before)
+            )
+            if any(values):
+                delta[key] = values
+        await apply_rollup_delta(session, delta)
+
+
+async def sale_keys(session: AsyncSession, query) -> set[tuple[int, date]]:
+    with primary_reads():
+        result = await session.execute(query)
+    return set(result.tuples().all())
+
+
+# Полный пересчёт для починки. EXCLUSIVE не мешает чтению итогов,
+# а изменения итогов от конкурентных записей ждут его фиксации
+async def rebuild_daily_rollup():
+    async with session_scope(workload="bulk") as session:
+        async with session.begin():
+            with primary_reads():
+                await session.execute(
+                    text("LOCK TABLE daily_sales_rollup IN EXCLUSIVE MODE")
+                )
+                await session.execute(delete(DailySalesRollup))
+                result = await session.execute(
+                    insert(DailySalesRollup).from_select(ROLLUP_COLUMNS, rollup_query())
+                )
+    await bump_table_version(DailySalesRollup.__tablename__)
+    logger.info(f"Rebuilt daily_sales_rollup: {result.rowcount} rows")
+    return result.rowcount
+
+
+async def main(command: str):
+    try:
+        if command == "rebuild":
+            await rebuild_daily_rollup()
+    finally:
+        await close_engine()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Дневные итоги продаж")
+    parser.add_argument("command", choices=["rebuild"])
+    args = parser.parse_args()
+    asyncio.run(main(args.command))
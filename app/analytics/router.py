@@ -0,0 +1,119 @@
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.analytics.dao import (
+    BranchMonthDAO,
+    CustomerSpendDAO,
+    MaterializedViewDAO,
+    ProductSalesDAO,
+    RefreshLogDAO,
+)
+from app.analytics.rb import RBBranchMonth, RBCustomerSpend, RBProductSales
+from app.analytics.schemas import (
+    SBranchMonth,
+    SCustomerSpend,
+    SProductSales,
+    SViewRefresh,
+)
+from app.dao.fields import RBFields
+from app.dao.pagination import RBPage
+from app.database import get_session, use_workload
+from app.users.dependencies import is_current_user_analyst
+from app.users.models import User
+
+router = APIRouter(
+    prefix="/analytics",
+    tags=["Аналитические представления"],
+    dependencies=[Depends(use_workload("analytics"))]
+)
+
+# Время последнего обновления данных представления
+REFRESHED_AT_HEADER = "X-Refreshed-At"
+
+
+async def read_view(
+    dao: type[MaterializedViewDAO],
+    response: Response,
+    request_body,
+    page: RBPage,
+    fields: RBFields,
+    session: AsyncSession
+):
+    rows = await dao.find_rows(
+        **request_body.to_dict(),
+        **page.to_dict(),
+        **fields.to_dict(),
+        session=session
+    )
+    refreshed_at = await dao.refreshed_at(session=session)
+    if refreshed_at is not None:
+        response.headers[REFRESHED_AT_HEADER] = refreshed_at.isoformat()
+    page.set_next_cursor(response, rows, dao.cursor_keys())
+    return fields.render(rows, response)
+
+
+@router.get(
+    "/views",
+    response_model=list[SViewRefresh],
+    summary="Время последнего обновления материализованных представлений"
+)
+async def get_views_freshness(
+    user_data: User = Depends(is_current_user_analyst),
+    session: AsyncSession = Depends(get_session)
+) -> list[SViewRefresh]:
+    return await RefreshLogDAO.find_rows(session=session)
+
+
+@router.get(
+    "/customer_spend",
+    response_model=list[SCustomerSpend],
+    summary="Сводка покупок по клиентам"
+)
+async def get_customer_spend(
+    response: Response,
+    request_body: RBCustomerSpend = Depends(),
+    page: RBPage = Depends(),
+    fields: RBFields = Depends(),
+    user_data: User = Depends(is_current_user_analyst),
+    session: AsyncSession = Depends(get_session)
+) -> list[SCustomerSpend]:
+    return await read_view(
+        CustomerSpendDAO, response, request_body, page, fields, session
+    )
+
+
+@router.get(
+    "/product_sales",
+    response_model=list[SProductSales],
+    summary="Сводка продаж по товарам"
+)
+async def get_product_sales(
+    response: Response,
+    request_body: RBProductSales = Depends(),
+    page: RBPage = Depends(),
+    fields: RBFields = Depends(),
+    user_data: User = Depends(is_current_user_analyst),
+    session: AsyncSession = Depends(get_session)
+) -> list[SProductSales]:
+    return await read_view(
+        ProductSalesDAO, response, request_body, page, fields, session
+    )
+
+
+@router.get(
+    "/branch_month",
+    response_model=list[SBranchMonth],
+    summary="Продажи филиалов по месяцам. "
+            "start_time и end_time ограничивают месяц"
+)
+async def get_branch_month(
+    response: Response,
+    request_body: RBBranchMonth = Depends(),
+    page: RBPage = Depends(),
+    fields: RBFields = Depends(),
+    user_data: User = Depends(is_current_user_analyst),
+    session: AsyncSession = Depends(get_session)
+) -> list[SBranchMonth]:
+    return await read_view(
+        BranchMonthDAO, response, request_body, page, fields, session
+    )
@@ -0,0 +1,45 @@
+from datetime import date, datetime
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class SCustomerSpend(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    customer_id: int = Field(..., description="ID клиента")
+    first_name: str = Field(..., description="Имя клиента")
+    last_name: str = Field(..., description="Фамилия клиента")
+    email: str = Field(..., description="Электронная почта клиента")
+    orders: int = Field(..., description="Количество продаж")
+    units: int = Field(..., description="Количество купленных единиц товара")
+    revenue: float = Field(..., description="Сумма покупок")
+    first_sale_date: Optional[date] = Field(None, description="Дата первой покупки")
+    last_sale_date: Optional[date] = Field(None, description="Дата последней покупки")
+
+
+class SProductSales(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    product_id: int = Field(..., description="ID товара")
+    product_name: str = Field(..., description="Название товара")
+    product_category: str = Field(..., description="Категория товара")
+    orders: int = Field(..., description="Количество продаж с товаром")
+    units: int = Field(..., description="Количество проданных единиц")
+    revenue: float = Field(..., description="Выручка по товару")
+    last_sale_date: Optional[date] = Field(None, description="Дата последней продажи")
+
+
+class SBranchMonth(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    branch: str = Field(..., description="Название филиала")
+    month: date = Field(..., description="Месяц продажи")
+    orders: int = Field(..., description="Количество продаж")
+    units: int = Field(..., description="Количество проданных единиц товара")
+    customers: int = Field(..., description="Количество разных клиентов")
+    revenue: float = Field(..., description="Выручка")
+
+
+class SViewRefresh(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    view_name: str = Field(..., description="Материализованное представление")
+    refreshed_at: datetime = Field(..., description="Время последнего обновления")
+    duration_ms: int = Field(..., description="Длительность обновления в мс")
@@ -0,0 +1,132 @@
+import argparse
+import asyncio
+import contextlib
+import time
+from datetime import timedelta
+
+from fastapi.logger import logger
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.analytics.models import BranchMonth, CustomerSpend, MvRefreshLog, ProductSales
+from app.cache import bump_table_version
+from app.config import settings
+from app.database import close_engine, primary_reads, session_scope
+
+
+MATERIALIZED_VIEWS = {
+    view.__tablename__: view
+    for view in (CustomerSpend, ProductSales, BranchMonth)
+}
+# Ключ advisory-блокировок обновления; второй ключ — хеш имени представления
+VIEW_LOCK_ID = 7_340_025
+
+_scheduler: asyncio.Task | None = None
+
+
+# Обновляет представление, если за интервал его не обновил другой воркер.
+# Блокировка берётся без ожидания: занятая значит, что представление уже
+# обновляется. CONCURRENTLY не блокирует чтение представления, но требует
+# уникального индекса на нём. Пул bulk выбран из-за отсутствия statement_timeout
+async def refresh_view(name: str, force: bool = False) -> bool:
+    async with session_scope(workload="bulk") as session:
+        async with session.begin():
+            with primary_reads():
+                acquired = await session.scalar(
+                    select(func.pg_try_advisory_xact_lock(
+                        VIEW_LOCK_ID,
+                        func.hashtext(name)
+                    ))
+                )
+                if not acquired:
+                    return False
+                if not force:
+                    fresh = await session.scalar(
+                        select(MvRefreshLog.refreshed_at).where(
+                            MvRefreshLog.view_name == name,
+                            MvRefreshLog.refreshed_at > func.now() - timedelta(
+                                seconds=settings.MV_REFRESH_INTERVAL
+                            )
+                        )
+                    )
+                    if fresh is not None:
+                        return False
+
+                started = time.perf_counter()
+                await session.execute(
+                    text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {name}")
+                )
+                duration_ms = int((time.perf_counter() - started) * 1000)
+                # now() — начало транзакции: данные представления не старше него
+                query = pg_insert(MvRefreshLog).values(
+                    view_name=name,
+                    refreshed_at=func.now(),
+                    duration_ms=duration_ms
+                )
+                query = query.on_conflict_do_update(
+                    index_elements=["view_name"],
+                    set_={
+                        "refreshed_at": query.excluded.refreshed_at,
+                        "duration_ms": query.excluded.duration_ms,
+                        "updated_at": func.now(),
+                    }
+                )
+                await session.execute(query)
+    await bump_table_version(name)
+    logger.info(f"Refreshed materialized view {name} in {duration_ms} ms")
+    return True
+
+
+async def refresh_views(force: bool = False):
+    for name in MATERIALIZED_VIEWS:
+        try:
+            await refresh_view(name, force)
+        except Exception as e:
+            logger.error(f"Error refreshing materialized view {name}: {str(e)}")
+
+
+# Планировщик запускается в каждом воркере, а обновляет один:
+# остальных отсекают блокировка и время последнего обновления
+async def _refresh_loop():
+    while True:
+        await refresh_views()
+        await asyncio.sleep(settings.MV_REFRESH_CHECK_INTERVAL)
+
+
+async def start_view_refresh():
+    global _scheduler
+    _scheduler = asyncio.create_task(_refresh_loop())
+
+
+async def stop_view_refresh():
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.cancel()
+        # Дожидаемся отмены, чтобы обновление не шло по закрытому движку
+        with contextlib.suppress(asyncio.CancelledError):
+            await _scheduler
+        _scheduler = None
+
+
+async def main(views: list[str]):
+    try:
+        for name in views:
+            await refresh_view(name, force=True)
+    finally:
+        await close_engine()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Материализованные представления")
+    parser.add_argument("command", choices=["refresh"])
+    parser.add_argument(
+        "views",
+        nargs="*",
+        help=f"Представления для обновления: {', '.join(MATERIALIZED_VIEWS)}. "
+             f"По умолчанию все"
+    )
+    args = parser.parse_args()
+    unknown = [name for name in args.views if name not in MATERIALIZED_VIEWS]
+    if unknown:
+        parser.error(f"Неизвестные представления: {', '.join(unknown)}")
+    asyncio.run(main(args.views or list(MATERIALIZED_VIEWS)))
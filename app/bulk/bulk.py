@@ -1,15 +1,89 @@
+from enum import Enum
+from typing import AsyncIterator
+
 import pandas as pd
-from fastapi import File, HTTPException
+from fastapi import HTTPException, UploadFile
 from pydantic import BaseModel, ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from app.bulk.validation import column_specs, validate_frame
+from app.config import settings
+
+
+class BulkMode(str, Enum):
+    insert = "insert"
+    copy = "copy"
+    upsert = "upsert"
+    ignore = "ignore"
+
+
+class BulkErrors:
+    def __init__(self, max_errors: int = settings.BULK_MAX_ERRORS):
+        self.max_errors = max_errors
+        self.count = 0
+        self.items = []
+
+    def add(self, line: int, error: ValidationError):
+        self.count += 1
+        if len(self.items) < self.max_errors:
+            self.items.append({
+                "line": line,
+                "errors": error.errors(
+                    include_url=False,
+                    include_context=False,
+                    include_input=False
+                )
+            })
+
+    def to_detail(self) -> dict:
+        return {"errors_count": self.count, "errors": self.items}
+
+
+def _validate_chunk(
+    chunk: pd.DataFrame,
+    model: BaseModel,
+    first_line: int,
+    errors: BulkErrors
+) -> list[dict]:
+    specs = column_specs(model)
+    if specs is not None:
+        records, valid = validate_frame(chunk, specs)
+    else:
+        records, valid = [None] * len(chunk), pd.Series(False, index=chunk.index)
+
+    # Через Pydantic идут только строки, не прошедшие векторную проверку:
+    # он либо примет их в менее строгом формате, либо вернёт ошибки
+    fallback = chunk[~valid]
+    fallback = fallback.astype(object).where(fallback.notna(), None)
+    positions = valid.index.get_indexer(fallback.index).tolist()
+    for position, record in zip(positions, fallback.to_dict(orient="records")):
+        try:
+            records[position] = model(**record).dict()
+        except ValidationError as e:
+            errors.add(first_line + position, e)
+    return [record for record in records if record is not None]
 
 
-async def get_bulk_dict(file: File(...), model: BaseModel) -> list[dict]:
+async def iter_bulk_batches(
+    file: UploadFile,
+    model: BaseModel,
+    chunk_size: int = settings.BULK_CHUNK_SIZE
+) -> AsyncIterator[list[dict]]:
     if not file.filename.endswith(".csv"):
         raise HTTPException(status_code=422, detail="Файл должен быть в формате CSV")
 
-    try:
-        records = pd.read_csv(file.file).to_dict(orient="records")
+    errors = BulkErrors()
+    reader = pd.read_csv(file.file, dtype=str, chunksize=chunk_size)
+    # Строка 1 — заголовок, данные начинаются со второй
+    line = 2
+    while True:
+        chunk = await run_in_threadpool(next, reader, None)
+        if chunk is None:
+            break
+        batch = await run_in_threadpool(_validate_chunk, chunk, model, line, errors)
+        line += len(chunk)
+        if batch and not errors.count:
+            yield batch
 
-        return [model(**record).dict() for record in records]
-    except ValidationError as e:
-        raise HTTPException(status_code=422, detail=e.errors())
+    if errors.count:
+        raise HTTPException(status_code=422, detail=errors.to_detail())
@@ -0,0 +1,142 @@
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+
+import annotated_types
+import pandas as pd
+from pydantic import BaseModel
+
+# Строки, которые Pydantic гарантированно примет для типа. Всё остальное
+# (пробелы, экспонента у int, другие форматы дат) проверяется моделью построчно
+INT_PATTERN = r"-?\d{1,18}"
+FLOAT_PATTERN = r"[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?"
+DATE_PATTERN = r"\d{4}-\d{2}-\d{2}"
+
+SUPPORTED_TYPES = (int, float, str, date)
+SUPPORTED_CONSTRAINTS = (
+    annotated_types.Gt,
+    annotated_types.Ge,
+    annotated_types.Lt,
+    annotated_types.Le,
+    annotated_types.MinLen,
+    annotated_types.MaxLen,
+)
+UNSUPPORTED_CONFIG = (
+    "strict",
+    "str_strip_whitespace",
+    "str_to_lower",
+    "str_to_upper",
+    "str_min_length",
+    "str_max_length",
+)
+
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    name: str
+    python_type: type
+    constraints: tuple = ()
+
+
+def _has_validators(model: type[BaseModel]) -> bool:
+    decorators = model.__pydantic_decorators__
+    return any((
+        decorators.validators,
+        decorators.field_validators,
+        decorators.root_validators,
+        decorators.model_validators,
+    ))
+
+
+# Описание колонок берётся из схемы S*Add. None — схему нельзя проверить
+# векторно (валидаторы, EmailStr, необязательные поля), и она валидируется построчно
+@lru_cache
+def column_specs(model: type[BaseModel]) -> tuple[ColumnSpec, ...] | None:
+    if _has_validators(model):
+        return None
+    if any(model.model_config.get(option) for option in UNSUPPORTED_CONFIG):
+        return None
+
+    specs = []
+    for name, field in model.model_fields.items():
+        if field.annotation not in SUPPORTED_TYPES or not field.is_required():
+            return None
+        if field.alias and field.alias != name:
+            return None
+        constraints = tuple(field.metadata)
+        if not all(isinstance(c, SUPPORTED_CONSTRAINTS) for c in constraints):
+            return None
+        if field.annotation is date and constraints:
+            return None
+        specs.append(ColumnSpec(name, field.annotation, constraints))
+    return tuple(specs)
+
+
+def _apply_constraints(values: pd.Series, spec: ColumnSpec) -> pd.Series:
+    valid = pd.Series(True, index=values.index)
+    measured = values.str.len() if spec.python_type is str else values
+    for constraint in spec.constraints:
+        if isinstance(constraint, annotated_types.Gt):
+            valid &= measured > constraint.gt
+        elif isinstance(constraint, annotated_types.Ge):
+            valid &= measured >= constraint.ge
+        elif isinstance(constraint, annotated_types.Lt):
+            valid &= measured < constraint.lt
+        elif isinstance(constraint, annotated_types.Le):
+            valid &= measured <= constraint.le
+        elif isinstance(constraint, annotated_types.MinLen):
+            valid &= measured >= constraint.min_length
+        elif isinstance(constraint, annotated_types.MaxLen):
+            valid &= measured <= constraint.max_length
+    return valid.fillna(False)
+
+
+def _convert_column(raw: pd.Series, spec: ColumnSpec) -> tuple[pd.Series, pd.Series]:
+    present = raw.notna()
+    if spec.python_type is str:
+        valid = present
+        values = raw
+    else:
+        pattern = {int: INT_PATTERN, float: FLOAT_PATTERN, date: DATE_PATTERN}
+        matched = raw[present].str.fullmatch(pattern[spec.python_type])
+        valid = matched.reindex(raw.index, fill_value=False).astype(bool)
+        if spec.python_type is date:
+            parsed = pd.to_datetime(raw[valid], format="%Y-%m-%d", errors="coerce")
+            valid &= parsed.reindex(raw.index).notna()
+            values = parsed
+        else:
+            dtype = "int64" if spec.python_type is int else "float64"
+            values = raw[valid].astype(dtype)
+
+    if spec.constraints:
+        valid &= _apply_constraints(values.reindex(raw.index), spec)
+    return values, valid
+
+
+# Проверяет кадр со строковыми колонками (read_csv(dtype=str)).
+# Возвращает записи для строк, прошедших проверку, и маску строк,
+# которые нужно прогнать через Pydantic
+def validate_frame(
+    frame: pd.DataFrame,
+    specs: tuple[ColumnSpec, ...]
+) -> tuple[list[dict | None], pd.Series]:
+    valid = pd.Series(True, index=frame.index)
+    converted = {}
+    for spec in specs:
+        if spec.name not in frame.columns:
+            return [None] * len(frame), pd.Series(False, index=frame.index)
+        values, column_valid = _convert_column(frame[spec.name], spec)
+        converted[spec.name] = values
+        valid &= column_valid
+
+    columns = []
+    for spec in specs:
+        values = converted[spec.name].loc[valid.index[valid]]
+        if spec.python_type is date:
+            values = values.dt.date
+        columns.append(values.tolist())
+
+    names = [spec.name for spec in specs]
+    good_records = iter(dict(zip(names, row)) for row in zip(*columns))
+    records = [next(good_records) if ok else None for ok in valid.tolist()]
+    return records, valid
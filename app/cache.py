@@ -0,0 +1,236 @@
+import asyncio
+import contextlib
+import json
+from datetime import timedelta
+from typing import Awaitable, Callable
+
+from fastapi.logger import logger
+from redis.asyncio import ConnectionPool, Redis
+from redis.exceptions import LockError, RedisError
+
+from app.config import settings
+
+
+redis_pool: ConnectionPool | None = None
+redis_client: Redis | None = None
+
+# Заполнения кеша, выполняющиеся в этом процессе, по ключу
+_inflight: dict[str, asyncio.Task] = {}
+
+
+def get_redis() -> Redis:
+    global redis_pool, redis_client
+    if redis_client is None:
+        redis_pool = ConnectionPool(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_DB,
+            username=settings.REDIS_USER,
+            password=settings.REDIS_USER_PASSWORD,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        )
+        redis_client = Redis(connection_pool=redis_pool)
+    return redis_client
+
+
+async def init_redis():
+    try:
+        await get_redis().ping()
+    except RedisError as e:
+        logger.error(f"Redis is unavailable, caching is disabled: {str(e)}")
+
+
+async def close_redis():
+    global redis_pool, redis_client
+    if redis_client is not None:
+        await redis_client.aclose()
+        await redis_pool.aclose()
+    redis_pool = None
+    redis_client = None
+
+
+async def cache_get(key: str) -> bytes | None:
+    try:
+        return await get_redis().get(key)
+    except RedisError as e:
+        logger.warning(f"Error reading cache key {key}: {str(e)}")
+        return None
+
+
+async def cache_set(key: str, value: bytes, ttl: timedelta | int):
+    try:
+        await get_redis().setex(key, ttl, value)
+    except RedisError as e:
+        logger.warning(f"Error writing cache key {key}: {str(e)}")
+
+
+async def cache_delete(*keys: str):
+    try:
+        await get_redis().delete(*keys)
+    except RedisError as e:
+        logger.warning(f"Error deleting cache keys {keys}: {str(e)}")
+
+
+def version_key(table: str) -> str:
+    return f"version:{table}"
+
+
+async def get_table_versions(*tables: str) -> list[int] | None:
+    try:
+        versions = await get_redis().mget([version_key(t) for t in tables])
+    except RedisError as e:
+        logger.warning(f"Error reading data versions for {tables}: {str(e)}")
+        return None
+    return [int(v) if v is not None else 0 for v in versions]
+
+
+async def bump_table_version(*tables: str):
+    try:
+        async with get_redis().pipeline(transaction=False) as pipe:
+            for table in tables:
+                pipe.incr(version_key(table))
+            await pipe.execute()
+    except RedisError as e:
+        logger.error(f"Error bumping data versions for {tables}: {str(e)}")
+
+
+def canonical_params(params: dict) -> str:
+    return json.dumps(
+        {k: v for k, v in params.items() if v is not None},
+        sort_keys=True,
+        default=str,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+
+
+async def build_cache_key(prefix: str, tables: list[str], **params) -> str | None:
+    versions = await get_table_versions(*tables)
+    if versions is None:
+        return None
+    version_part = ",".join(f"{t}={v}" for t, v in zip(tables, versions))
+    return f"{prefix}:{version_part}:{canonical_params(params)}"
+
+
+def _fresh_key(key: str) -> str:
+    return f"fresh:{key}"
+
+
+async def _store(key: str, value: bytes, ttl: int, stale_ttl: int):
+    if not stale_ttl:
+        await cache_set(key, value, ttl)
+        return
+    try:
+        async with get_redis().pipeline(transaction=True) as pipe:
+            pipe.setex(key, ttl + stale_ttl, value)
+            pipe.setex(_fresh_key(key), ttl, b"1")
+            await pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Error writing cache key {key}: {str(e)}")
+
+
+# Продлевает блокировку, пока идёт заполнение: долгий экспорт
+# не отдаёт ключ другому воркеру по истечении CACHE_LOCK_TIMEOUT
+async def _keep_lock(key: str, lock):
+    while True:
+        await asyncio.sleep(settings.CACHE_LOCK_TIMEOUT / 3)
+        try:
+            await lock.reacquire()
+        except (LockError, RedisError) as e:
+            logger.warning(f"Error extending cache lock for {key}: {str(e)}")
+            return
+
+
+async def _fill(
+    key: str,
+    compute: Callable[[], Awaitable[bytes]],
+    ttl: int,
+    stale_ttl: int,
+) -> bytes:
+    lock = get_redis().lock(
+        f"lock:{key}",
+        timeout=settings.CACHE_LOCK_TIMEOUT,
+        blocking=False,
+    )
+    try:
+        acquired = await lock.acquire()
+    except RedisError as e:
+        logger.warning(f"Error acquiring cache lock for {key}: {str(e)}")
+        acquired = False
+        lock = None
+
+    if not acquired and lock is not None:
+        # Другой воркер уже считает значение — ждём его результат,
+        # пока он держит блокировку
+        while True:
+            await asyncio.sleep(settings.CACHE_LOCK_POLL_INTERVAL)
+            cached = await cache_get(key)
+            if cached is not None:
+                return cached
+            try:
+                if not await lock.locked():
+                    break
+            except RedisError:
+                break
+
+    keeper = asyncio.create_task(_keep_lock(key, lock)) if acquired else None
+    try:
+        value = await compute()
+        await _store(key, value, ttl, stale_ttl)
+        return value
+    finally:
+        if acquired:
+            keeper.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await keeper
+            try:
+                await lock.release()
+            except (LockError, RedisError) as e:
+                logger.warning(f"Error releasing cache lock for {key}: {str(e)}")
+
+
+def _single_flight(
+    key: str,
+    compute: Callable[[], Awaitable[bytes]],
+    ttl: int,
+    stale_ttl: int,
+) -> asyncio.Task:
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_fill(key, compute, ttl, stale_ttl))
+        _inflight[key] = task
+        task.add_done_callback(lambda done: _forget(key, done))
+    return task
+
+
+# Фоновое обновление никто не ждёт, поэтому его ошибка пишется в лог здесь
+def _forget(key: str, task: asyncio.Task):
+    _inflight.pop(key, None)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Error filling cache key {key}: {str(task.exception())}")
+
+
+# Конкурентные промахи по одному ключу ждут одно вычисление: в процессе
+# через общую задачу, между воркерами через блокировку в Redis.
+# При stale_ttl > 0 устаревшее значение отдаётся сразу, а обновление идёт в фоне.
+async def get_or_compute(
+    key: str,
+    compute: Callable[[], Awaitable[bytes]],
+    ttl: int,
+    stale_ttl: int = 0,
+) -> bytes:
+    cached = await cache_get(key)
+    if cached is not None:
+        if not stale_ttl:
+            return cached
+        try:
+            is_fresh = await get_redis().exists(_fresh_key(key))
+        except RedisError:
+            is_fresh = True
+        if not is_fresh:
+            _single_flight(key, compute, ttl, stale_ttl)
+        return cached
+
+    return await asyncio.shield(_single_flight(key, compute, ttl, stale_ttl))
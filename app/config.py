@@ -1,6 +1,5 @@
 import os
 from pydantic_settings import BaseSettings, SettingsConfigDict
-import redis
 
 
 class Settings(BaseSettings):
@@ -14,6 +13,52 @@ class Settings(BaseSettings):
     REDIS_PASSWORD: str
     REDIS_USER: str
     REDIS_USER_PASSWORD: str
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 10.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_WARMUP: int = 5
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_STATEMENT_TIMEOUT_MS: int = 30000
+    DB_PGBOUNCER: bool = False
+    DB_ANALYTICS_POOL_SIZE: int = 5
+    DB_ANALYTICS_MAX_OVERFLOW: int = 0
+    DB_ANALYTICS_POOL_TIMEOUT: float = 30.0
+    DB_ANALYTICS_STATEMENT_TIMEOUT_MS: int = 300000
+    DB_BULK_POOL_SIZE: int = 2
+    DB_BULK_MAX_OVERFLOW: int = 0
+    DB_BULK_POOL_TIMEOUT: float = 60.0
+    DB_BULK_STATEMENT_TIMEOUT_MS: int = 0
+    DB_REPLICA_URLS: str = ""
+    DB_REPLICA_CHECK_INTERVAL: float = 5.0
+    DB_REPLICA_CHECK_TIMEOUT: float = 2.0
+    REDIS_HOST: str = "localhost"
+    REDIS_PORT: int = 6379
+    REDIS_DB: int = 0
+    REDIS_MAX_CONNECTIONS: int = 100
+    REDIS_CONNECT_TIMEOUT: float = 1.0
+    REDIS_SOCKET_TIMEOUT: float = 1.0
+    CACHE_LOCK_TIMEOUT: float = 60.0
+    CACHE_LOCK_POLL_INTERVAL: float = 0.1
+    PRINCIPAL_CACHE_TTL: int = 300
+    PRINCIPAL_LOCAL_TTL: float = 5.0
+    PRINCIPAL_LOCAL_MAX_SIZE: int = 10000
+    PASSWORD_HASH_WORKERS: int = os.cpu_count() or 1
+    PASSWORD_HASH_QUEUE_SIZE: int = 64
+
+    PAGE_LIMIT_DEFAULT: int = 100
+    PAGE_LIMIT_MAX: int = 1000
+    CSV_STREAM_BATCH_SIZE: int = 5000
+    CSV_CACHE_TTL: int = 60 * 60 * 24
+    PIVOT_CACHE_TTL: int = 60 * 60
+    BULK_COPY_BATCH_SIZE: int = 10000
+    BULK_CHUNK_SIZE: int = 10000
+    BULK_MAX_ERRORS: int = 1000
+    SALES_PARTITIONS_AHEAD: int = 3
+    SALES_PARTITION_CHECK_INTERVAL: float = 3600.0
+    MV_REFRESH_INTERVAL: int = 15 * 60
+    MV_REFRESH_CHECK_INTERVAL: float = 60.0
 
     model_config = SettingsConfigDict(
         env_file=os.path.join(
@@ -37,6 +82,10 @@ def get_db_url():
     )
 
 
+def get_replica_urls() -> list[str]:
+    return [url.strip() for url in settings.DB_REPLICA_URLS.split(",") if url.strip()]
+
+
 def get_db_url_without_asyncpg():
     return (
         f"postgresql://{settings.DB_USER}:"
@@ -48,18 +97,10 @@ def get_db_url_without_asyncpg():
 def get_redis_url():
     return (
         f"redis://{settings.REDIS_USER}:"
-        f"{settings.REDIS_USER_PASSWORD}@127.0.0.1:6379"
+        f"{settings.REDIS_USER_PASSWORD}@{settings.REDIS_HOST}:"
+        f"{settings.REDIS_PORT}/{settings.REDIS_DB}"
     )
 
 
 def get_auth_data():
     return {"secret_key": settings.SECRET_KEY, "algorithm": settings.ALGORITHM}
-
-
-redis_client = redis.Redis(
-    host='localhost',
-    port=6379,
-    db=0,
-    username=settings.REDIS_USER,
-    password=settings.REDIS_USER_PASSWORD
-)
@@ -4,3 +4,4 @@ from app.dao.base import BaseDAO
 
 class CustomerDAO(BaseDAO):
     model = Customer
+    upsert_keys = ("email",)
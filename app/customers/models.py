@@ -1,5 +1,6 @@
+from sqlalchemy import Index
 from sqlalchemy.orm import Mapped, relationship
-from app.database import Base, str_uniq, int_pk
+from app.database import Base, str_uniq, int_pk, timestamp_indexes
 
 from datetime import date
 
@@ -13,6 +14,11 @@ class Customer(Base):
     phone_number: Mapped[str_uniq]
     gender: Mapped[str]
 
+    __table_args__ = (
+        Index("ix_customers_date_of_birth", "date_of_birth"),
+        *timestamp_indexes("customers"),
+    )
+
     sales: Mapped[list["Sale"]] = relationship(  # noqa: F821
         "Sale",
         back_populates="customer"
@@ -1,5 +1,7 @@
 from datetime import date
 
+from app.dao.filters import Filters, parse_filters
+
 
 class RBCustomer:
     def __init__(
@@ -11,6 +13,7 @@ class RBCustomer:
             email: str | None = None,
             phone_number: str | None = None,
             gender: str | None = None,
+            filters: Filters = None,
     ):
         self.id = id
         self.first_name = first_name
@@ -19,6 +22,7 @@ class RBCustomer:
         self.email = email
         self.phone_number = phone_number
         self.gender = gender
+        self.filters = parse_filters(filters)
 
     def to_dict(self) -> dict:
         date = {
@@ -29,6 +33,7 @@ class RBCustomer:
             'email': self.email,
             'phone_number': self.phone_number,
             'gender': self.gender,
+            'filters': self.filters,
         }
         filttered_date = {
             key: value
@@ -49,7 +54,8 @@ class RBCustomerTime:
             phone_number: str | None = None,
             gender: str | None = None,
             start_time: date | None = None,
-            end_time: date | None = None
+            end_time: date | None = None,
+            filters: Filters = None
     ):
         self.id = id
         self.first_name = first_name
@@ -60,6 +66,7 @@ class RBCustomerTime:
         self.gender = gender
         self.start_time = start_time
         self.end_time = end_time
+        self.filters = parse_filters(filters)
 
     def to_dict(self) -> dict:
         date = {
@@ -71,7 +78,8 @@ class RBCustomerTime:
             'phone_number': self.phone_number,
             'gender': self.gender,
             'start_time': self.start_time,
-            'end_time': self.end_time
+            'end_time': self.end_time,
+            'filters': self.filters,
         }
         filttered_date = {
             key: value
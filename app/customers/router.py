@@ -5,9 +5,14 @@ from fastapi import (
     HTTPException,
     UploadFile,
     File,
+    Response,
 )
 from fastapi.responses import StreamingResponse
-from app.bulk.bulk import get_bulk_dict
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_session, use_workload
+from app.bulk.bulk import BulkMode, iter_bulk_batches
+from app.dao.fields import RBFields
+from app.dao.pagination import RBPage
 
 from app.analytics.analytics import get_gender_distribution
 
@@ -33,10 +38,21 @@ router = APIRouter(
     summary="Получить список всех клиентов"
 )
 async def get_all_customers(
+    response: Response,
     user_data: User = Depends(is_current_user_analyst),
-    request_body: RBCustomer = Depends()
+    request_body: RBCustomer = Depends(),
+    page: RBPage = Depends(),
+    fields: RBFields = Depends(),
+    session: AsyncSession = Depends(get_session)
 ) -> list[SCustomer]:
-    return await CustomerDAO.find_all(**request_body.to_dict())
+    customers = await CustomerDAO.find_rows(
+        **request_body.to_dict(),
+        **page.to_dict(),
+        **fields.to_dict(),
+        session=session
+    )
+    page.set_next_cursor(response, customers, CustomerDAO.cursor_keys())
+    return fields.render(customers, response)
 
 
 @router.get(
@@ -46,9 +62,10 @@ async def get_all_customers(
 )
 async def get_customer_by_id(
     id: int,
-    user_data: User = Depends(is_current_user_analyst)
+    user_data: User = Depends(is_current_user_analyst),
+    session: AsyncSession = Depends(get_session)
 ) -> SCustomer | None:
-    rez = await CustomerDAO.find_one_or_none_by_id(id)
+    rez = await CustomerDAO.find_one_or_none_by_id(id, session=session)
     if not rez:
         raise HTTPException(status_code=404, detail=f'Клиент с id={id} не найден')
     return rez
@@ -60,25 +77,36 @@ async def get_customer_by_id(
     summary=(
         "Получить детали продаж в заданном временном диапазоне."
         "Доступные параметры: date_of_birth, created_at, updated_at"
-    )
+    ),
+    dependencies=[Depends(use_workload("analytics"))]
 )
 async def get_customers_by_time_range(
     param: str,
+    response: Response,
     user_data: User = Depends(is_current_user_analyst),
-    request_body: RBCustomerTime = Depends()
+    request_body: RBCustomerTime = Depends(),
+    page: RBPage = Depends(),
+    fields: RBFields = Depends(),
+    session: AsyncSession = Depends(get_session)
 ) -> list[SCustomer]:
-    return await CustomerDAO.find_all_in_time_range(
+    customers = await CustomerDAO.find_rows(
         **request_body.to_dict(),
-        param=param
+        **page.to_dict(),
+        **fields.to_dict(),
+        param=param,
+        session=session
     )
+    page.set_next_cursor(response, customers, CustomerDAO.cursor_keys())
+    return fields.render(customers, response)
 
 
 @router.post("/add/")
 async def add_customer(
     customer: SCustomerAdd,
-    user_data: User = Depends(is_current_user_vendor)
+    user_data: User = Depends(is_current_user_vendor),
+    session: AsyncSession = Depends(get_session)
 ) -> dict:
-    check = await CustomerDAO.add(**customer.dict())
+    check = await CustomerDAO.add(**customer.dict(), session=session)
     if check:
         return {"message": "Покупатель успешно добавлен!", "customer": customer}
     else:
@@ -89,11 +117,13 @@ async def add_customer(
 async def upd_customer_by_id(
     id: int,
     new_customer: SCustomerUpd = Depends(),
-    user_data: User = Depends(is_current_user_admin)
+    user_data: User = Depends(is_current_user_admin),
+    session: AsyncSession = Depends(get_session)
 ) -> dict:
     check = await CustomerDAO.update(
         filter_by={"id": id},
-        **new_customer.to_new_data_dict()
+        **new_customer.to_new_data_dict(),
+        session=session
     )
     if check:
         return {
@@ -107,11 +137,13 @@ async def upd_customer_by_id(
 @router.put("/update_by_filter/")
 async def upd_customer_by_filter(
     new_customer: SCustomerUpd = Depends(),
-    user_data: User = Depends(is_current_user_admin)
+    user_data: User = Depends(is_current_user_admin),
+    session: AsyncSession = Depends(get_session)
 ) -> dict:
     check = await CustomerDAO.update(
         filter_by=new_customer.to_filter_dict(),
-        **new_customer.to_new_data_dict()
+        **new_customer.to_new_data_dict(),
+        session=session
     )
     if check:
         return {
@@ -138,23 +170,31 @@ async def delete_customer_by_id(
 @router.post("/bulk_insert/")
 async def bulk_insert_products(
     user_data: User = Depends(is_current_user_admin),
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    mode: BulkMode = BulkMode.insert
 ):
-    valid_records = await get_bulk_dict(file, SCustomerAdd)
+    batches = iter_bulk_batches(file, SCustomerAdd)
 
-    check = await CustomerDAO.bulk_insert(valid_records)
-    if check:
-        return {"message": "Покупатели успешно добавлены!"}
+    check = await CustomerDAO.bulk_load(batches, mode)
+    if check["inserted"] or check["updated"]:
+        return {"message": "Покупатели успешно добавлены!", **check}
     else:
-        return {"message": "Ошибка при добавлении покупателей!"}
+        return {"message": "Ошибка при добавлении покупателей!", **check}
 
 
-@router.get("/get_csv/")
+@router.get(
+    "/get_csv/",
+    dependencies=[Depends(use_workload("analytics"))]
+)
 async def get_csv(
     request_body: RBCustomer = Depends(),
+    fields: RBFields = Depends(),
     user_data: User = Depends(is_current_user_admin)
 ):
-    return await CustomerDAO.export_to_csv(**request_body.to_dict())
+    return await CustomerDAO.export_to_csv(
+        **request_body.to_dict(),
+        **fields.to_dict()
+    )
 
 
 @router.get(
@@ -165,16 +205,19 @@ async def get_csv(
             "content": {"text/csv": {}},
             "description": "Return the CSV file."
         }
-    }
+    },
+    dependencies=[Depends(use_workload("analytics"))]
 )
 async def download_csv(
     request_body: RBCustomer = Depends(),
+    fields: RBFields = Depends(),
     user_data: User = Depends(is_current_user_admin)
 ) -> StreamingResponse:
-    csv_data = await CustomerDAO.export_to_csv(**request_body.to_dict())
-
+    # Параметры проверяются до начала потока: после заголовков 422 уже не отдать
+    CustomerDAO.check_query(**request_body.to_dict(), **fields.to_dict())
     return StreamingResponse(
-        iter([csv_data]), media_type="text/csv",
+        CustomerDAO.stream_csv(**request_body.to_dict(), **fields.to_dict()),
+        media_type="text/csv",
         headers={"Content-Disposition": "attachment; filename=customers.csv"}
     )
 
@@ -187,7 +230,8 @@ async def download_csv(
             "content": {"image/png": {}},
             "description": "Return the plot."
         }
-    }
+    },
+    dependencies=[Depends(use_workload("analytics"))]
 )
 async def plot_gender_distribution(
     user_data: User = Depends(is_current_user_analyst)
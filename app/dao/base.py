@@ -1,28 +1,159 @@
-from app.database import async_session_maker
-from sqlalchemy import insert
+import csv
+from typing import AsyncIterable
+
+from app.database import primary_reads, session_scope, transaction_scope
+from sqlalchemy import UniqueConstraint, func, insert, literal_column, or_, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.future import select
 from sqlalchemy import update as sqlalchemy_update, delete as sqlalchemy_delete
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from datetime import datetime, timedelta
+from datetime import datetime
 
 from fastapi.logger import logger
 from fastapi import HTTPException
 import pandas as pd
 from io import StringIO
-from app.config import redis_client
+from app.cache import bump_table_version, build_cache_key, get_or_compute
+from app.config import settings
+from app.dao.filters import compile_filters
+from app.dao.pagination import apply_keyset
+
+
+# Лимит параметров одного запроса в протоколе PostgreSQL
+MAX_QUERY_PARAMS = 32767
 
 
 class BaseDAO:
     model = None
+    # Уникальные колонки, по которым bulk_load в режиме upsert ищет конфликт
+    upsert_keys: tuple[str, ...] = ()
+    # Колонки, которые upsert не перезаписывает у существующих строк
+    upsert_exclude: tuple[str, ...] = ()
+    # Колонки, по которым нельзя задавать условия filters
+    filter_exclude: tuple[str, ...] = ()
+
+    @classmethod
+    def pk_columns(cls) -> list:
+        return list(cls.model.__mapper__.primary_key)
+
+    @classmethod
+    def cursor_keys(cls) -> tuple[str, ...]:
+        return tuple(column.key for column in cls.pk_columns())
+
+    # Колонки таблицы для выборки fields в порядке таблицы; первичный ключ
+    # добавляется всегда, без него не построить курсор следующей страницы
+    @classmethod
+    def select_columns(cls, fields: tuple[str, ...] | None = None) -> list:
+        columns = cls.model.__table__.columns
+        if not fields:
+            return list(columns)
+        unknown = [name for name in fields if name not in columns]
+        if unknown:
+            raise HTTPException(
+                status_code=422,
+                detail=(
+                    f"Неизвестные поля {', '.join(unknown)} для "
+                    f"{cls.model.__tablename__}. "
+                    f"Доступные поля: {', '.join(columns.keys())}"
+                )
+            )
+        return [
+            column
+            for column in columns
+            if column.primary_key or column.key in fields
+        ]
+
+    @classmethod
+    def filter_clauses(cls, filters: list[tuple[str, str, str]] | None = None) -> list:
+        if not filters:
+            return []
+        columns = {
+            key: column
+            for key, column in cls.model.__table__.columns.items()
+            if key not in cls.filter_exclude
+        }
+        return compile_filters(columns, filters)
+
+    # Проверяет fields и filters заранее, чтобы ошибка ушла клиенту как 422
+    # до начала потоковой выгрузки или обращения к кешу
+    @classmethod
+    def check_query(
+        cls,
+        fields: tuple[str, ...] | None = None,
+        filters: list[tuple[str, str, str]] | None = None,
+        **filter_by
+    ):
+        cls.select_columns(fields)
+        cls.filter_clauses(filters)
+
+    # filters приходят из RB-классов вместе с равенствами filter_by
+    # Вызывается в транзакции записи перед add, update и пачками bulk_load:
+    # наследники дополняют строки и готовят для них базу
+    @classmethod
+    async def prepare_rows(cls, session: AsyncSession, rows: list[dict]) -> list[dict]:
+        return rows
+
+    # Вызывается в транзакции записи до add, update, delete и каждой пачки
+    # загрузки: rows — записываемые значения, filter_by — условие update
+    # и delete. Возвращает change, в котором наследники копят то,
+    # что нужно after_write
+    @classmethod
+    async def before_write(
+        cls,
+        session: AsyncSession,
+        rows: list[dict],
+        change=None,
+        **filter_by
+    ):
+        return change
+
+    # Вызывается в той же транзакции один раз после всей записи.
+    # Наследники поддерживают по change производные таблицы
+    @classmethod
+    async def after_write(cls, session: AsyncSession, change):
+        pass
+
+    @classmethod
+    def _list_query(
+        cls,
+        query,
+        start_time: datetime = None,
+        end_time: datetime = None,
+        param: str = "created_at",
+        limit: int | None = None,
+        after: str | None = None,
+        filters: list[tuple[str, str, str]] | None = None,
+        **filter_by
+    ):
+        query = query.filter_by(**filter_by).where(*cls.filter_clauses(filters))
+        if start_time:
+            query = query.where(getattr(cls.model, param) >= start_time)
+        if end_time:
+            query = query.where(getattr(cls.model, param) <= end_time)
+        return apply_keyset(query, cls.pk_columns(), limit, after)
 
     @classmethod
-    async def find_all(cls, **filter_by):
+    async def find_all(
+        cls,
+        limit: int | None = None,
+        after: str | None = None,
+        session: AsyncSession | None = None,
+        **filter_by
+    ):
         try:
-            async with async_session_maker() as session:
-                query = select(cls.model).filter_by(**filter_by)
+            async with session_scope(session) as session:
+                query = cls._list_query(
+                    select(cls.model),
+                    limit=limit,
+                    after=after,
+                    **filter_by
+                )
                 result = await session.execute(query)
                 return result.scalars().all()
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Error finding all for {cls.model.__tablename__}: {str(e)}")
             raise HTTPException(
@@ -31,9 +162,13 @@ class BaseDAO:
             ) from e
 
     @classmethod
-    async def find_one_or_none_by_id(cls, data_id: int):
+    async def find_one_or_none_by_id(
+        cls,
+        data_id: int,
+        session: AsyncSession | None = None
+    ):
         try:
-            async with async_session_maker() as session:
+            async with session_scope(session) as session:
                 query = select(cls.model).filter_by(id=data_id)
                 result = await session.execute(query)
                 return result.scalar_one_or_none()
@@ -48,9 +183,13 @@ class BaseDAO:
             ) from e
 
     @classmethod
-    async def find_one_or_none_by_filter(cls, **filter_by):
+    async def find_one_or_none_by_filter(
+        cls,
+        session: AsyncSession | None = None,
+        **filter_by
+    ):
         try:
-            async with async_session_maker() as session:
+            async with session_scope(session) as session:
                 query = select(cls.model).filter_by(**filter_by)
                 result = await session.execute(query)
                 return result.scalar_one_or_none()
@@ -65,18 +204,19 @@ class BaseDAO:
             ) from e
 
     @classmethod
-    async def add(cls, **values):
+    async def add(cls, session: AsyncSession | None = None, **values):
         try:
-            async with async_session_maker() as session:
-                async with session.begin():
+            try:
+                async with transaction_scope(session) as session:
+                    [values] = await cls.prepare_rows(session, [values])
+                    change = await cls.before_write(session, [values])
                     new_instance = cls.model(**values)
-                session.add(new_instance)
-                try:
-                    await session.commit()
-                except SQLAlchemyError as e:
-                    await session.rollback()
-                    return e
-                return new_instance
+                    session.add(new_instance)
+                    await cls.after_write(session, change)
+            except SQLAlchemyError as e:
+                return e
+            await bump_table_version(cls.model.__tablename__)
+            return new_instance
         except Exception as e:
             logger.error(f"Error adding to {cls.model.__tablename__}: {str(e)}")
             raise HTTPException(
@@ -85,10 +225,17 @@ class BaseDAO:
             ) from e
 
     @classmethod
-    async def update(cls, filter_by, **values):
+    async def update(
+        cls,
+        filter_by,
+        session: AsyncSession | None = None,
+        **values
+    ):
         try:
-            async with async_session_maker() as session:
-                async with session.begin():
+            try:
+                async with transaction_scope(session) as session:
+                    [values] = await cls.prepare_rows(session, [values])
+                    change = await cls.before_write(session, [values], **filter_by)
                     query = (
                         sqlalchemy_update(cls.model)
                         .where(
@@ -97,14 +244,14 @@ class BaseDAO:
                         .values(**values)
                         .execution_options(synchronize_session="fetch")
                     )
-                result = await session.execute(query)
-                try:
-                    await session.commit()
-                except SQLAlchemyError as e:
-                    logger.error(f"Ошибка сохранения данных: {str(e)}")
-                    await session.rollback()
-                    raise e
-                return result.rowcount
+                    result = await session.execute(query)
+                    await cls.after_write(session, change)
+            except SQLAlchemyError as e:
+                logger.error(f"Ошибка сохранения данных: {str(e)}")
+                raise e
+            if result.rowcount:
+                await bump_table_version(cls.model.__tablename__)
+            return result.rowcount
         except Exception as e:
             logger.error(f"Error updating {cls.model.__tablename__}: {str(e)}")
             raise HTTPException(
@@ -113,20 +260,23 @@ class BaseDAO:
             ) from e
 
     @classmethod
-    async def delete(cls, delete_all: bool = False, **filter_by):
+    async def delete(
+        cls,
+        delete_all: bool = False,
+        session: AsyncSession | None = None,
+        **filter_by
+    ):
         if not delete_all and not filter_by:
             raise ValueError("Необходимо указать хотя бы один параметр для удаления")
         try:
-            async with async_session_maker() as session:
-                async with session.begin():
-                    query = sqlalchemy_delete(cls.model).filter_by(**filter_by)
-                    result = await session.execute(query)
-                try:
-                    await session.commit()
-                except SQLAlchemyError as e:
-                    await session.rollback()
-                    raise e
-                return result.rowcount
+            async with transaction_scope(session) as session:
+                change = await cls.before_write(session, [], **filter_by)
+                query = sqlalchemy_delete(cls.model).filter_by(**filter_by)
+                result = await session.execute(query)
+                await cls.after_write(session, change)
+            if result.rowcount:
+                await bump_table_version(cls.model.__tablename__)
+            return result.rowcount
         except Exception as e:
             logger.error(f"Error deleting from {cls.model.__tablename__}: {str(e)}")
             raise HTTPException(
@@ -140,19 +290,26 @@ class BaseDAO:
         start_time: datetime = None,
         end_time: datetime = None,
         param: str = "created_at",
+        limit: int | None = None,
+        after: str | None = None,
+        session: AsyncSession | None = None,
         **filter_by
     ):
         try:
-            async with async_session_maker() as session:
-                query = select(cls.model).filter_by(**filter_by)
-
-                if start_time:
-                    query = query.where(getattr(cls.model, param) >= start_time)
-                if end_time:
-                    query = query.where(getattr(cls.model, param) <= end_time)
-
-            result = await session.execute(query)
-            return result.scalars().all()
+            async with session_scope(session) as session:
+                query = cls._list_query(
+                    select(cls.model),
+                    start_time,
+                    end_time,
+                    param,
+                    limit,
+                    after,
+                    **filter_by
+                )
+                result = await session.execute(query)
+                return result.scalars().all()
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(
                 f"Error finding all in time range for {cls.model.__tablename__}:"
@@ -167,55 +324,329 @@ class BaseDAO:
                 )
             ) from e
 
+    # Чтение списков без ORM: строки приходят как словари из колонок таблицы,
+    # без identity map и состояния объектов, и сразу идут в сериализацию
     @classmethod
-    async def bulk_insert(cls, data: list[dict]):
+    async def find_rows(
+        cls,
+        start_time: datetime = None,
+        end_time: datetime = None,
+        param: str = "created_at",
+        limit: int | None = None,
+        after: str | None = None,
+        fields: tuple[str, ...] | None = None,
+        session: AsyncSession | None = None,
+        **filter_by
+    ):
         try:
-            async with async_session_maker() as session:
+            async with session_scope(session) as session:
+                query = cls._list_query(
+                    select(*cls.select_columns(fields)),
+                    start_time,
+                    end_time,
+                    param,
+                    limit,
+                    after,
+                    **filter_by
+                )
+                result = await session.execute(query)
+                return result.mappings().all()
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error finding rows for {cls.model.__tablename__}: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error finding rows for {cls.model.__tablename__}, {str(e)}"
+            ) from e
+
+    @classmethod
+    def _copy_record(cls, row: dict, columns: list) -> tuple:
+        record = []
+        for column in columns:
+            value = row.get(column.key)
+            python_type = column.type.python_type
+            if value is not None and python_type in (int, float):
+                value = python_type(value)
+            record.append(value)
+        return tuple(record)
+
+    @classmethod
+    async def _copy_batch(
+        cls,
+        session,
+        data: list[dict],
+        batch_size: int = settings.BULK_COPY_BATCH_SIZE
+    ) -> int:
+        table = cls.model.__table__
+        columns = [column for column in table.columns if column.key in data[0]]
+        connection = await session.connection()
+        raw_connection = await connection.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+        for start in range(0, len(data), batch_size):
+            records = [
+                cls._copy_record(row, columns)
+                for row in data[start:start + batch_size]
+            ]
+            await driver_connection.copy_records_to_table(
+                table.name,
+                records=records,
+                columns=[column.name for column in columns]
+            )
+        return len(data)
+
+    @classmethod
+    async def _insert_batch(cls, session, data: list[dict]) -> int:
+        # executemany сам режет пачку по лимиту параметров драйвера
+        await session.execute(insert(cls.model), data)
+        return len(data)
+
+    @classmethod
+    def _upsert_statement(cls, data: list[dict], update: bool):
+        query = pg_insert(cls.model).values(data)
+        if update:
+            skip = set(cls.upsert_keys) | set(cls.upsert_exclude)
+            new_values = {
+                key: query.excluded[key]
+                for key in data[0]
+                if key not in skip
+            }
+            if "updated_at" in cls.model.__table__.columns:
+                new_values["updated_at"] = func.now()
+            query = query.on_conflict_do_update(
+                index_elements=list(cls.upsert_keys),
+                set_=new_values
+            )
+        else:
+            # Без указания ключа пропускаются конфликты по любому уникальному индексу
+            query = query.on_conflict_do_nothing()
+        # xmax = 0 только у строк, вставленных этим запросом, а не обновлённых
+        return query.returning(
+            cls.model.id,
+            literal_column("xmax = 0").label("inserted")
+        )
+
+    # Уникальные колонки и наборы колонок модели, кроме первичного ключа
+    @classmethod
+    def unique_keys(cls) -> list[tuple[str, ...]]:
+        table = cls.model.__table__
+        keys = [(column.key,) for column in table.columns if column.unique]
+        keys += [
+            tuple(column.key for column in constraint.columns)
+            for constraint in table.constraints
+            if isinstance(constraint, UniqueConstraint)
+        ]
+        keys += [
+            tuple(column.key for column in index.columns)
+            for index in table.indexes
+            if index.unique
+        ]
+        return list(dict.fromkeys(keys))
+
+    @classmethod
+    def _key_clause(cls, key: tuple[str, ...], values: list[tuple]):
+        if len(key) == 1:
+            return getattr(cls.model, key[0]).in_([value[0] for value in values])
+        return tuple_(*[getattr(cls.model, column) for column in key]).in_(values)
+
+    # Убирает строки файла, повторяющие другую строку по любому уникальному
+    # ключу. Как и база, upsert оставляет последний повтор, а ignore — первый
+    @classmethod
+    def _drop_duplicates(cls, data: list[dict], update: bool) -> tuple[list[dict], int]:
+        keys = [
+            key for key in cls.unique_keys()
+            if all(column in data[0] for column in key)
+        ]
+        seen = {key: set() for key in keys}
+        kept = []
+        for row in reversed(data) if update else data:
+            values = {key: tuple(row[column] for column in key) for key in keys}
+            if any(
+                None not in value and value in seen[key]
+                for key, value in values.items()
+            ):
+                continue
+            for key, value in values.items():
+                seen[key].add(value)
+            kept.append(row)
+        if update:
+            kept.reverse()
+        return kept, len(data) - len(kept)
+
+    # ON CONFLICT DO UPDATE разрешает конфликт только по upsert_keys:
+    # строка, чьё значение другого уникального ключа занято другой записью,
+    # уронила бы всю загрузку. Такие строки пропускаются
+    @classmethod
+    async def _drop_conflicts(cls, session, data: list[dict]) -> list[dict]:
+        upsert_key = tuple(cls.upsert_keys)
+        keys = [
+            key for key in cls.unique_keys()
+            if key != upsert_key and all(column in data[0] for column in key)
+        ]
+        if not keys:
+            return data
+        keys = [upsert_key, *keys]
+        columns = list(dict.fromkeys(column for key in keys for column in key))
+        query = select(
+            cls.model.id,
+            *[getattr(cls.model, column) for column in columns]
+        ).where(or_(*[
+            cls._key_clause(key, [
+                tuple(row[column] for column in key) for row in data
+            ])
+            for key in keys
+        ]))
+        with primary_reads():
+            result = await session.execute(query)
+        owners = {key: {} for key in keys}
+        for existing in result.mappings():
+            for key in keys:
+                owners[key][tuple(existing[column] for column in key)] = existing["id"]
+        kept = []
+        for row in data:
+            target = owners[upsert_key].get(
+                tuple(row[column] for column in upsert_key)
+            )
+            if all(
+                owners[key].get(tuple(row[column] for column in key), target) == target
+                for key in keys
+            ):
+                kept.append(row)
+        return kept
+
+    # Возвращает записанные строки и число повторов внутри файла
+    @classmethod
+    async def _upsert_batch(
+        cls,
+        session,
+        data: list[dict],
+        update: bool
+    ) -> tuple[list, int]:
+        data, duplicates = cls._drop_duplicates(data, update)
+        batch_size = MAX_QUERY_PARAMS // len(data[0])
+        rows = []
+        for start in range(0, len(data), batch_size):
+            chunk = data[start:start + batch_size]
+            if update:
+                chunk = await cls._drop_conflicts(session, chunk)
+            if not chunk:
+                continue
+            result = await session.execute(cls._upsert_statement(chunk, update))
+            rows.extend(result.all())
+        return rows, duplicates
+
+    # Вызывается после фиксации загрузки со списком id обновлённых строк
+    @classmethod
+    async def after_bulk_update(cls, ids: list[int]):
+        pass
+
+    # Загружает пачки по мере их разбора в одной транзакции:
+    # ошибка в любой пачке (в том числе 422 от валидации) откатывает всю загрузку
+    @classmethod
+    async def bulk_load(
+        cls,
+        batches: AsyncIterable[list[dict]],
+        mode: str = "insert"
+    ) -> dict:
+        if mode in ("upsert", "ignore") and not cls.upsert_keys:
+            raise HTTPException(
+                status_code=422,
+                detail=(
+                    f"Режим {mode} недоступен для {cls.model.__tablename__}: "
+                    f"нет уникальных колонок"
+                )
+            )
+        counts = {"inserted": 0, "updated": 0, "skipped": 0, "duplicates": 0}
+        updated_ids = []
+        change = None
+        try:
+            async with session_scope(workload="bulk") as session:
                 async with session.begin():
-                    query = insert(cls.model).values(data)
-                    result = await session.execute(query)
-                    try:
-                        await session.commit()
-                    except SQLAlchemyError as e:
-                        await session.rollback()
-                        raise e
-                    return result.rowcount
+                    async for batch in batches:
+                        batch = await cls.prepare_rows(session, batch)
+                        change = await cls.before_write(session, batch, change)
+                        if mode == "copy":
+                            counts["inserted"] += await cls._copy_batch(session, batch)
+                        elif mode == "insert":
+                            counts["inserted"] += await cls._insert_batch(
+                                session,
+                                batch
+                            )
+                        else:
+                            rows, duplicates = await cls._upsert_batch(
+                                session,
+                                batch,
+                                update=mode == "upsert"
+                            )
+                            inserted = sum(1 for row in rows if row.inserted)
+                            updated_ids.extend(
+                                row.id for row in rows if not row.inserted
+                            )
+                            counts["inserted"] += inserted
+                            counts["updated"] += len(rows) - inserted
+                            counts["duplicates"] += duplicates
+                            counts["skipped"] += len(batch) - duplicates - len(rows)
+                    # Производные таблицы пересчитываются один раз за загрузку
+                    await cls.after_write(session, change)
+            if counts["inserted"] or counts["updated"]:
+                await bump_table_version(cls.model.__tablename__)
+            if updated_ids:
+                await cls.after_bulk_update(updated_ids)
+            return counts
+        except HTTPException:
+            raise
+        except IntegrityError as e:
+            logger.error(f"Error bulk loading to {cls.model.__tablename__}: {str(e)}")
+            raise HTTPException(
+                status_code=409,
+                detail=f"Конфликт данных в {cls.model.__tablename__}, {str(e.orig)}"
+            ) from e
         except Exception as e:
-            logger.error(f"Error bulk inserting to {cls.model.__tablename__}: {str(e)}")
+            logger.error(f"Error bulk loading to {cls.model.__tablename__}: {str(e)}")
             raise HTTPException(
                 status_code=500,
-                detail=f"Error bulk inserting to {cls.model.__tablename__}, {str(e)}"
+                detail=f"Error bulk loading to {cls.model.__tablename__}, {str(e)}"
             ) from e
 
     @classmethod
-    async def export_to_csv(cls, ignore_cache: bool = False, **filter_by):
+    async def export_to_csv(
+        cls,
+        ignore_cache: bool = False,
+        fields: tuple[str, ...] | None = None,
+        **filter_by
+    ):
+        cls.check_query(fields, **filter_by)
         try:
             table_name = cls.model.__tablename__
-            chache_key = f"csv:{table_name}"
-
-            if filter_by:
-                chache_key += ":".join(f"{k}:{v}" for k, v in filter_by.items())
-
+            chache_key = None
             if not ignore_cache:
-                chached_csv = redis_client.get(chache_key)
+                chache_key = await build_cache_key(
+                    f"csv:{table_name}",
+                    [table_name],
+                    fields=",".join(fields) if fields else None,
+                    **filter_by
+                )
 
-                if chached_csv:
-                    return chached_csv
+            async def build_csv() -> bytes:
+                return "".join(
+                    [chunk async for chunk in cls.stream_csv(fields, **filter_by)]
+                ).encode("utf-8")
 
-            data = await cls.find_all(**filter_by)
-            df = pd.DataFrame(row.__dict__ for row in data)
-            df.drop("_sa_instance_state", axis=1, inplace=True)
+            if not chache_key:
+                return await build_csv()
 
-            csv_buffer = StringIO()
-            df.to_csv(csv_buffer, index=False)
+            # Значение живёт под текущей версией таблицы, поэтому читается
+            # с основной базы: реплика может ещё не видеть записи,
+            # которая подняла версию
+            async def fill_csv() -> bytes:
+                with primary_reads():
+                    return await build_csv()
 
-            redis_client.setex(
+            return await get_or_compute(
                 chache_key,
-                timedelta(hours=1),
-                csv_buffer.getvalue().encode("utf-8")
+                fill_csv,
+                settings.CSV_CACHE_TTL
             )
-
-            return csv_buffer.getvalue().encode("utf-8")
         except Exception as e:
             logger.error(
                 f"Error exporting to csv for {cls.model.__tablename__}:"
@@ -226,13 +657,48 @@ class BaseDAO:
                 detail=f"Error exporting to csv for {cls.model.__tablename__}, {str(e)}"
             ) from e
 
+    @classmethod
+    async def stream_csv(
+        cls,
+        fields: tuple[str, ...] | None = None,
+        batch_size: int = settings.CSV_STREAM_BATCH_SIZE,
+        filters: list[tuple[str, str, str]] | None = None,
+        **filter_by
+    ):
+        columns = cls.select_columns(fields)
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+
+        writer.writerow(column.key for column in columns)
+        yield buffer.getvalue()
+
+        try:
+            async with session_scope(workload="analytics") as session:
+                query = (
+                    select(*columns)
+                    .filter_by(**filter_by)
+                    .where(*cls.filter_clauses(filters))
+                    .execution_options(yield_per=batch_size)
+                )
+                result = await session.stream(query)
+                async for rows in result.partitions(batch_size):
+                    buffer.seek(0)
+                    buffer.truncate()
+                    writer.writerows(rows)
+                    yield buffer.getvalue()
+        except Exception as e:
+            logger.error(
+                f"Error streaming csv for {cls.model.__tablename__}:"
+                f"{str(e)}"
+            )
+            raise
+
     @classmethod
     async def export_to_pdDF(cls, **filter_by):
         try:
-            data = await cls.find_all(**filter_by)
-            df = pd.DataFrame(row.__dict__ for row in data)
-            df.drop("_sa_instance_state", axis=1, inplace=True)
-            return df
+            async with session_scope(workload="analytics") as session:
+                data = await cls.find_rows(session=session, **filter_by)
+            return pd.DataFrame(data, columns=list(cls.model.__table__.columns.keys()))
         except Exception as e:
             logger.error(
                 f"Error exporting to pandas DataFrame for {cls.model.__tablename__}:"
@@ -0,0 +1,48 @@
+from fastapi import Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+
+def parse_fields(raw: str | None) -> tuple[str, ...] | None:
+    if not raw:
+        return None
+    fields = []
+    for name in raw.split(","):
+        name = name.strip()
+        if name and name not in fields:
+            fields.append(name)
+    return tuple(fields) or None
+
+
+class RBFields:
+    def __init__(
+            self,
+            fields: str | None = Query(
+                None,
+                description=(
+                    "Колонки ответа через запятую, например id,city,sale_date. "
+                    "Первичный ключ возвращается всегда"
+                )
+            ),
+    ):
+        self.fields = parse_fields(fields)
+
+    def to_dict(self) -> dict:
+        if self.fields is None:
+            return {}
+        return {'fields': self.fields}
+
+    # Неполные строки не проходят response_model, поэтому при выборке колонок
+    # ответ собирается сам, с заголовками, уже выставленными в response
+    def render(self, rows, response: Response):
+        if self.fields is None:
+            return rows
+        headers = {
+            key: value
+            for key, value in response.headers.items()
+            if key != "content-length"
+        }
+        return JSONResponse(
+            jsonable_encoder([dict(row) for row in rows]),
+            headers=headers
+        )
@@ -0,0 +1,111 @@
+import operator
+from datetime import date, datetime
+from typing import Annotated
+
+from fastapi import HTTPException, Query
+
+
+OPERATORS = ("gt", "gte", "lt", "lte", "in", "prefix", "ilike", "is_null")
+# Операторы сравнения строк по шаблону, допустимые только для текстовых колонок
+TEXT_OPERATORS = ("prefix", "ilike")
+COMPARISONS = {
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "lt": operator.lt,
+    "lte": operator.le,
+}
+
+Filters = Annotated[
+    list[str] | None,
+    Query(
+        description=(
+            "Условия вида колонка:оператор:значение, например "
+            "unit_price:gte:10, city:in:Moscow,Kazan, product_name:prefix:Tea, "
+            "customer_id:is_null:true. "
+            f"Операторы: {', '.join(OPERATORS)}"
+        )
+    )
+]
+
+
+def _filter_error(condition: str, reason: str) -> HTTPException:
+    return HTTPException(
+        status_code=422,
+        detail=f"Некорректный фильтр {condition!r}: {reason}"
+    )
+
+
+def parse_filters(raw: list[str] | None) -> list[tuple[str, str, str]] | None:
+    if not raw:
+        return None
+    filters = []
+    for condition in raw:
+        parts = condition.split(":", 2)
+        if len(parts) == 2 and parts[1] == "is_null":
+            parts.append("true")
+        if len(parts) != 3 or not parts[0]:
+            raise _filter_error(condition, "ожидается колонка:оператор:значение")
+        name, op, value = parts
+        if op not in OPERATORS:
+            raise _filter_error(
+                condition,
+                f"неизвестный оператор, доступны {', '.join(OPERATORS)}"
+            )
+        filters.append((name, op, value))
+    return filters
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("/", "//").replace("%", "/%").replace("_", "/_")
+
+
+def _coerce_flag(value: str) -> bool:
+    if value.lower() not in ("true", "false", "1", "0"):
+        raise ValueError("ожидается true или false")
+    return value.lower() in ("true", "1")
+
+
+def _coerce(column, value: str):
+    python_type = column.type.python_type
+    if python_type is bool:
+        return _coerce_flag(value)
+    if python_type in (date, datetime):
+        return python_type.fromisoformat(value)
+    return python_type(value)
+
+
+# Условия компилируются в предикаты SQL, чтобы фильтрация шла в базе по индексам
+def compile_filters(columns, filters: list[tuple[str, str, str]]) -> list:
+    clauses = []
+    for name, op, value in filters:
+        condition = f"{name}:{op}:{value}"
+        if name not in columns:
+            raise _filter_error(
+                condition,
+                f"фильтрация по колонке недоступна, доступны {', '.join(columns)}"
+            )
+        column = columns[name]
+        if op in TEXT_OPERATORS and column.type.python_type is not str:
+            raise _filter_error(condition, "оператор только для текстовых колонок")
+        try:
+            if op == "is_null":
+                clauses.append(
+                    column.is_(None)
+                    if _coerce_flag(value)
+                    else column.is_not(None)
+                )
+            elif op == "in":
+                clauses.append(
+                    column.in_([_coerce(column, item) for item in value.split(",")])
+                )
+            elif op == "prefix":
+                # Шаблон собирается заранее: LIKE 'abc%' с константой может идти
+                # по индексу, а конкатенация в SQL этого не позволяет
+                clauses.append(column.like(f"{_escape_like(value)}%", escape="/"))
+            elif op == "ilike":
+                clauses.append(column.ilike(f"%{_escape_like(value)}%", escape="/"))
+            else:
+                clauses.append(COMPARISONS[op](column, _coerce(column, value)))
+        except ValueError as e:
+            raise _filter_error(condition, str(e))
+    return clauses
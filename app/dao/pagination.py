@@ -0,0 +1,103 @@
+import base64
+import json
+from datetime import date, datetime
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import tuple_
+
+from app.config import settings
+
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _to_json(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _from_json(column, value):
+    python_type = column.type.python_type
+    if isinstance(value, python_type):
+        return value
+    if python_type in (date, datetime):
+        return python_type.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(values: tuple) -> str:
+    raw = json.dumps([_to_json(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: list) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("cursor size mismatch")
+        return tuple(
+            _from_json(column, value)
+            for column, value in zip(columns, values)
+        )
+    except Exception:
+        raise HTTPException(status_code=422, detail="Некорректный курсор after")
+
+
+def apply_keyset(query, columns: list, limit: int | None, after: str | None):
+    if after is not None:
+        after_values = decode_cursor(after, columns)
+        if len(columns) == 1:
+            query = query.where(columns[0] > after_values[0])
+        else:
+            query = query.where(tuple_(*columns) > tuple_(*after_values))
+    if limit is not None or after is not None:
+        query = query.order_by(*columns)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def next_cursor(rows, limit: int | None, keys: tuple[str, ...]) -> str | None:
+    if not rows or limit is None or len(rows) < limit:
+        return None
+    last = rows[-1]
+    if isinstance(last, dict) or hasattr(last, "keys"):
+        return encode_cursor(tuple(last[key] for key in keys))
+    return encode_cursor(tuple(getattr(last, key) for key in keys))
+
+
+class RBPage:
+    def __init__(
+            self,
+            limit: int = Query(
+                min(settings.PAGE_LIMIT_DEFAULT, settings.PAGE_LIMIT_MAX),
+                ge=1,
+                le=settings.PAGE_LIMIT_MAX,
+                description="Размер страницы"
+            ),
+            after: str | None = Query(
+                None,
+                description=f"Курсор следующей страницы из {NEXT_CURSOR_HEADER}"
+            ),
+    ):
+        self.limit = limit
+        self.after = after
+
+    def to_dict(self) -> dict:
+        date = {
+            'limit': self.limit,
+            'after': self.after,
+        }
+        filttered_date = {
+            key: value
+            for key, value in date.items()
+            if value is not None
+        }
+        return filttered_date
+
+    def set_next_cursor(self, response: Response, rows, keys: tuple[str, ...]):
+        cursor = next_cursor(rows, self.limit, keys)
+        if cursor:
+            response.headers[NEXT_CURSOR_HEADER] = cursor
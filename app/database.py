@@ -1,15 +1,329 @@
+import asyncio
+import contextlib
+import itertools
+from contextlib import AsyncExitStack, asynccontextmanager, contextmanager
+from contextvars import ContextVar
 from datetime import datetime
-from typing import Annotated
+from typing import Annotated, AsyncIterator
+from uuid import uuid4
 
-from sqlalchemy import func
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncAttrs
-from sqlalchemy.orm import DeclarativeBase, declared_attr, Mapped, mapped_column
+from fastapi.logger import logger
+from sqlalchemy import Index, Select, func
+from sqlalchemy.ext.asyncio import (
+    AsyncAttrs,
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import (
+    DeclarativeBase,
+    Mapped,
+    Session,
+    declared_attr,
+    mapped_column,
+)
+
+from app.config import get_db_url, get_replica_urls, settings
+
+
+WORKLOADS = ("oltp", "analytics", "bulk")
+
+_workload: ContextVar[str | None] = ContextVar("workload", default=None)
+
+
+# Настройки пула для нагрузки: oltp берёт DB_*, остальные — DB_<NAME>_*
+def pool_settings(workload: str = "oltp") -> dict:
+    prefix = "DB_" if workload == "oltp" else f"DB_{workload.upper()}_"
+    return {
+        "pool_size": getattr(settings, f"{prefix}POOL_SIZE"),
+        "max_overflow": getattr(settings, f"{prefix}MAX_OVERFLOW"),
+        "pool_timeout": getattr(settings, f"{prefix}POOL_TIMEOUT"),
+        "statement_timeout_ms": getattr(settings, f"{prefix}STATEMENT_TIMEOUT_MS"),
+    }
+
+
+def engine_options(workload: str = "oltp") -> dict:
+    pool = pool_settings(workload)
+    connect_args = {
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "server_settings": {
+            "statement_timeout": str(pool["statement_timeout_ms"]),
+        },
+    }
+    if settings.DB_PGBOUNCER:
+        # В транзакционном режиме PgBouncer соседние транзакции идут через разные
+        # серверные соединения: подготовленные выражения отключаем, а
+        # statement_timeout задаётся на роли (ALTER ROLE ... SET), а не при подключении
+        connect_args = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    return {
+        "pool_size": pool["pool_size"],
+        "max_overflow": pool["max_overflow"],
+        "pool_timeout": pool["pool_timeout"],
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "connect_args": connect_args,
+    }
+
+
+def make_engine(url: str, workload: str = "oltp") -> AsyncEngine:
+    return create_async_engine(url, **engine_options(workload))
 
-from app.config import get_db_url
 
 DB_URL = get_db_url()
-engine = create_async_engine(DB_URL)
-async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
+
+# Отдельный пул на каждую пару (нагрузка, сервер): выгрузки аналитиков
+# и массовые загрузки не могут занять соединения кассовых запросов
+engines: dict[tuple[str, str], AsyncEngine] = {}
+
+
+def get_engine(workload: str = "oltp", url: str = DB_URL) -> AsyncEngine:
+    key = (workload, url)
+    if key not in engines:
+        engines[key] = make_engine(url, workload)
+    return engines[key]
+
+
+engine = get_engine("oltp")
+
+replica_urls = get_replica_urls()
+# Пока реплика не прошла проверку, чтения на неё не отправляются.
+# У каждого пула нагрузки свои соединения с репликой и своя проверка
+replica_healthy = {name: [False] * len(replica_urls) for name in WORKLOADS}
+_replica_counter = itertools.count()
+_primary_reads: ContextVar[bool] = ContextVar("primary_reads", default=False)
+_replica_monitor: asyncio.Task | None = None
+
+
+# Чтения, которые должны видеть только что записанные данные
+# (авторизация, повторное чтение после записи), выполняем на основной базе
+@contextmanager
+def primary_reads():
+    token = _primary_reads.set(True)
+    try:
+        yield
+    finally:
+        _primary_reads.reset(token)
+
+
+@contextmanager
+def workload_scope(name: str):
+    token = _workload.set(name)
+    try:
+        yield
+    finally:
+        _workload.reset(token)
+
+
+# Зависимость для роутеров: запрос и его сессия работают в пуле name
+def use_workload(name: str):
+    if name not in WORKLOADS:
+        raise ValueError(f"Неизвестная нагрузка {name}")
+
+    async def set_workload():
+        _workload.set(name)
+
+    return set_workload
+
+
+def current_workload(default: str = "oltp") -> str:
+    return _workload.get() or default
+
+
+def pick_replica(workload: str = "oltp") -> str | None:
+    healthy = [url for url, ok in zip(replica_urls, replica_healthy[workload]) if ok]
+    if not healthy:
+        return None
+    return healthy[next(_replica_counter) % len(healthy)]
+
+
+class RoutingSession(Session):
+    # SELECT уходят на реплику, всё остальное — на основную базу. После первой
+    # записи сессия читает только с основной базы, чтобы видеть свои изменения
+    def get_bind(self, mapper=None, clause=None, **kw):
+        session_workload = self.info.get("workload", "oltp")
+        primary = get_engine(session_workload)
+        if self.info.get("wrote") or _primary_reads.get():
+            return primary.sync_engine
+        if (
+            self._flushing
+            or not isinstance(clause, Select)
+            or clause._for_update_arg is not None
+        ):
+            self.info["wrote"] = True
+            return primary.sync_engine
+        if "replica" not in self.info:
+            replica_url = pick_replica(session_workload)
+            self.info["replica"] = (
+                get_engine(session_workload, replica_url) if replica_url else primary
+            )
+        return self.info["replica"].sync_engine
+
+
+session_makers = {
+    name: async_sessionmaker(
+        get_engine(name),
+        expire_on_commit=False,
+        sync_session_class=RoutingSession,
+        info={"workload": name}
+    )
+    for name in WORKLOADS
+}
+async_session_maker = session_makers["oltp"]
+
+
+# Явно заданная нагрузка важнее метки маршрута: bulk_load и обновление
+# представлений идут в свой пул, откуда бы их ни вызвали
+def get_session_maker(workload: str | None = None) -> async_sessionmaker:
+    return session_makers[workload or current_workload()]
+
+
+async def ping(engine: AsyncEngine):
+    async with engine.connect() as connection:
+        await connection.exec_driver_sql("SELECT 1")
+
+
+async def check_replica(replica: AsyncEngine) -> bool:
+    try:
+        await asyncio.wait_for(ping(replica), settings.DB_REPLICA_CHECK_TIMEOUT)
+        return True
+    except Exception as e:
+        logger.warning(f"Replica {replica.url.host} is unavailable: {str(e)}")
+        return False
+
+
+async def check_replicas():
+    results = await asyncio.gather(*[
+        check_replica(get_engine(name, url))
+        for name in WORKLOADS
+        for url in replica_urls
+    ])
+    count = len(replica_urls)
+    for i, name in enumerate(WORKLOADS):
+        replica_healthy[name][:] = results[i * count:(i + 1) * count]
+
+
+async def _monitor_replicas():
+    while True:
+        await asyncio.sleep(settings.DB_REPLICA_CHECK_INTERVAL)
+        await check_replicas()
+
+
+async def start_replica_monitor():
+    global _replica_monitor
+    if not replica_urls:
+        return
+    await check_replicas()
+    _replica_monitor = asyncio.create_task(_monitor_replicas())
+
+
+async def warm_up_engine(pool_engine: AsyncEngine, connections: int):
+    try:
+        async with AsyncExitStack() as stack:
+            opened = await asyncio.gather(*[
+                stack.enter_async_context(pool_engine.connect())
+                for _ in range(connections)
+            ])
+            for connection in opened:
+                await connection.exec_driver_sql("SELECT 1")
+    except Exception as e:
+        logger.error(
+            f"Error warming up database pool {pool_engine.url.host}: {str(e)}"
+        )
+
+
+# Открывает соединения заранее, чтобы первые запросы после деплоя
+# не тратили время на установку соединений с базой. Греются пулы всех
+# нагрузок на основной базе и на здоровых репликах
+async def warm_up_pool(connections: int = settings.DB_POOL_WARMUP):
+    warm_ups = []
+    for name in WORKLOADS:
+        size = min(connections, pool_settings(name)["pool_size"])
+        urls = [DB_URL] + [
+            url
+            for url, ok in zip(replica_urls, replica_healthy[name])
+            if ok
+        ]
+        warm_ups += [warm_up_engine(get_engine(name, url), size) for url in urls]
+    await asyncio.gather(*warm_ups)
+
+
+async def close_engine():
+    global _replica_monitor
+    if _replica_monitor is not None:
+        _replica_monitor.cancel()
+        # Идущая проверка не должна работать с уже закрытыми движками
+        with contextlib.suppress(asyncio.CancelledError):
+            await _replica_monitor
+        _replica_monitor = None
+    for pool_engine in list(engines.values()):
+        await pool_engine.dispose()
+
+
+def pool_metrics() -> list[dict]:
+    metrics = []
+    for (name, url), pool_engine in engines.items():
+        pool = pool_engine.pool
+        capacity = pool.size() + pool_settings(name)["max_overflow"]
+        checked_out = pool.checkedout()
+        metrics.append({
+            "workload": name,
+            "host": pool_engine.url.host,
+            "database": pool_engine.url.database,
+            "replica": url != DB_URL,
+            "pool_size": pool.size(),
+            "capacity": capacity,
+            "checked_out": checked_out,
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "saturation": round(checked_out / capacity, 3) if capacity else 0.0,
+        })
+    return metrics
+
+
+# Одна сессия (и одно соединение из пула) на запрос: авторизация и DAO
+# в обработчике работают через неё, если передать её в методы DAO
+async def get_session() -> AsyncIterator[AsyncSession]:
+    async with get_session_maker()() as session:
+        yield session
+
+
+@asynccontextmanager
+async def session_scope(
+    session: AsyncSession | None = None,
+    workload: str | None = None
+) -> AsyncIterator[AsyncSession]:
+    if session is not None:
+        yield session
+        return
+    async with get_session_maker(workload)() as new_session:
+        yield new_session
+
+
+# Чужую сессию фиксируем commit-ом: транзакция в ней уже могла начаться
+# с чтений в этом же запросе, и session.begin() на ней недоступен
+@asynccontextmanager
+async def transaction_scope(
+    session: AsyncSession | None = None,
+    workload: str | None = None
+) -> AsyncIterator[AsyncSession]:
+    if session is None:
+        async with get_session_maker(workload)() as new_session:
+            async with new_session.begin():
+                yield new_session
+        return
+    try:
+        yield session
+        await session.commit()
+    except BaseException:
+        await session.rollback()
+        raise
+
 
 int_pk = Annotated[
     int,
@@ -36,6 +350,20 @@ str_null_true = Annotated[
 ]
 
 
+# В больших таблицах, куда строки только дописываются, created_at растёт
+# вместе с физическим порядком строк, и ему хватает компактного BRIN.
+# updated_at меняется при обновлениях и всегда получает B-tree
+def timestamp_indexes(table: str, brin: bool = False) -> tuple[Index, ...]:
+    return (
+        Index(
+            f"ix_{table}_created_at",
+            "created_at",
+            postgresql_using="brin" if brin else "btree"
+        ),
+        Index(f"ix_{table}_updated_at", "updated_at"),
+    )
+
+
 class Base(AsyncAttrs, DeclarativeBase):
     __abstract__ = True
 
@@ -43,5 +371,9 @@ class Base(AsyncAttrs, DeclarativeBase):
     def __tablename__(cls) -> str:
         return f'{cls.__name__.lower()}s'
 
+    @declared_attr.directive
+    def __table_args__(cls) -> tuple:
+        return timestamp_indexes(cls.__tablename__)
+
     created_at: Mapped[created_at]
     updated_at: Mapped[updated_at]
@@ -39,3 +39,12 @@ class NoUserException(HTTPException):
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
+
+
+class PasswordHashingBusyException(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Сервис аутентификации перегружен, повторите попытку позже",
+            headers={"Retry-After": "1"}
+        )
@@ -1,7 +1,17 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from fastapi.responses import RedirectResponse
 from fastapi.logger import logger
 
+from app.cache import init_redis, close_redis
+from app.database import close_engine, start_replica_monitor, warm_up_pool
+from app.sales.partitions import (
+    start_partition_maintenance,
+    stop_partition_maintenance,
+)
+from app.analytics.views import start_view_refresh, stop_view_refresh
+from app.users.auth import close_password_hashing
 from app.exceptions import (
     TokenExpiredException,
     TokenNotFoundException,
@@ -10,14 +20,31 @@ from app.exceptions import (
     NoJwtException,
 )
 
+from app.analytics.router import router as router_analytics
 from app.customers.router import router as router_customers
+from app.metrics.router import router as router_metrics
 from app.products.router import router as router_products
 from app.saledetails.router import router as router_saledetails
 from app.sales.router import router as router_sales
 from app.users.router import router_users, router_auth
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await init_redis()
+    await start_replica_monitor()
+    await warm_up_pool()
+    await start_partition_maintenance()
+    await start_view_refresh()
+    yield
+    await stop_view_refresh()
+    await stop_partition_maintenance()
+    close_password_hashing()
+    await close_redis()
+    await close_engine()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 @app.get("/")
@@ -31,6 +58,8 @@ app.include_router(router_sales)
 app.include_router(router_saledetails)
 app.include_router(router_users)
 app.include_router(router_auth)
+app.include_router(router_metrics)
+app.include_router(router_analytics)
 
 
 @app.exception_handler(TokenExpiredException)
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends
+
+from app.database import pool_metrics
+from app.users.dependencies import is_current_user_admin
+from app.users.models import User
+
+router = APIRouter(prefix="/metrics", tags=["Метрики"])
+
+
+@router.get(
+    "/pools",
+    summary="Загрузка пулов соединений с базой по типам нагрузки"
+)
+async def get_pool_metrics(
+    user_data: User = Depends(is_current_user_admin)
+) -> list[dict]:
+    return pool_metrics()
@@ -18,6 +18,7 @@ from app.saledetails.models import SaleDetails
 from app.products.models import Product
 from app.customers.models import Customer
 from app.users.models import User
+from app.analytics.models import DailySalesRollup
 
 
 # this is the Alembic Config object, which provides
@@ -0,0 +1,73 @@
+"""Secondary indexes
+
+Revision ID: 56d21fd07bc2
+Revises: 19a6ec5e72b7
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '56d21fd07bc2'
+down_revision: Union[str, None] = '19a6ec5e72b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (имя, таблица, колонки, параметры) — совпадает с __table_args__ моделей
+INDEXES = [
+    ('ix_sales_customer_id', 'sales', ['customer_id'], {}),
+    ('ix_sales_sale_date', 'sales', ['sale_date'], {}),
+    ('ix_sales_branch_city', 'sales', ['branch', 'city'], {}),
+    ('ix_sales_city', 'sales', ['city'], {}),
+    ('ix_saledetailss_product_id', 'saledetailss', ['product_id'], {}),
+    ('ix_customers_date_of_birth', 'customers', ['date_of_birth'], {}),
+    ('ix_products_product_category', 'products', ['product_category'], {}),
+    (
+        'ix_products_product_name_pattern',
+        'products',
+        ['product_name'],
+        {'postgresql_ops': {'product_name': 'text_pattern_ops'}}
+    ),
+] + [
+    index
+    for table, using in (
+        ('customers', 'btree'),
+        ('products', 'btree'),
+        ('users', 'btree'),
+        ('sales', 'brin'),
+        ('saledetailss', 'brin'),
+    )
+    for index in (
+        (f'ix_{table}_created_at', table, ['created_at'], {'postgresql_using': using}),
+        (f'ix_{table}_updated_at', table, ['updated_at'], {}),
+    )
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY не блокирует запись, но не работает в транзакции
+    with op.get_context().autocommit_block():
+        for name, table, columns, kwargs in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+                **kwargs
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, kwargs in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True
+            )
@@ -0,0 +1,209 @@
+"""Partition sales and saledetailss by month
+
+Revision ID: b7f5b2e4a146
+Revises: 56d21fd07bc2
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7f5b2e4a146'
+down_revision: Union[str, None] = '56d21fd07bc2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Сколько будущих месяцев создать сразу; дальше их создаёт фоновая задача
+MONTHS_AHEAD = 3
+
+SALES_COLUMNS = (
+    'id, branch, city, customer_type, customer_id, sale_date, created_at, updated_at'
+)
+DETAILS_COLUMNS = 'sale_id, product_id, quantity, created_at, updated_at'
+
+INDEXES = [
+    ('ix_sales_customer_id', 'sales', ['customer_id'], {}),
+    ('ix_sales_sale_date', 'sales', ['sale_date'], {}),
+    ('ix_sales_branch_city', 'sales', ['branch', 'city'], {}),
+    ('ix_sales_city', 'sales', ['city'], {}),
+    ('ix_sales_created_at', 'sales', ['created_at'], {'postgresql_using': 'brin'}),
+    ('ix_sales_updated_at', 'sales', ['updated_at'], {}),
+    ('ix_saledetailss_product_id', 'saledetailss', ['product_id'], {}),
+    (
+        'ix_saledetailss_created_at',
+        'saledetailss',
+        ['created_at'],
+        {'postgresql_using': 'brin'}
+    ),
+    ('ix_saledetailss_updated_at', 'saledetailss', ['updated_at'], {}),
+]
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def timestamps() -> list:
+    return [
+        sa.Column(
+            'created_at',
+            sa.DateTime(),
+            server_default=sa.text('now()'),
+            nullable=False
+        ),
+        sa.Column(
+            'updated_at',
+            sa.DateTime(),
+            server_default=sa.text('now()'),
+            nullable=False
+        ),
+    ]
+
+
+def months_to_create(first_date: date | None, last_date: date | None) -> list[date]:
+    today = date.today()
+    first = (first_date or today).replace(day=1)
+    last = max(last_date or today, add_months(today.replace(day=1), MONTHS_AHEAD))
+    months = []
+    month = first
+    while month <= last:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def move_old_tables(suffix: str):
+    # Имена индексов общие для схемы, поэтому старые индексы удаляются,
+    # а первичные ключи переименовываются до создания новых таблиц
+    for name, table, columns, kwargs in INDEXES:
+        op.drop_index(name, table_name=table, if_exists=True)
+    for table in ('saledetailss', 'sales'):
+        op.rename_table(table, f'{table}_{suffix}')
+        op.execute(
+            f'ALTER TABLE {table}_{suffix} '
+            f'RENAME CONSTRAINT {table}_pkey TO {table}_{suffix}_pkey'
+        )
+
+
+def create_indexes():
+    for name, table, columns, kwargs in INDEXES:
+        op.create_index(name, table, columns, **kwargs)
+
+
+def upgrade() -> None:
+    # Перенос переписывает таблицы целиком: на время миграции запись в них
+    # должна быть остановлена
+    move_old_tables('unpartitioned')
+
+    op.create_table('sales',
+    sa.Column(
+        'id',
+        sa.Integer(),
+        server_default=sa.text("nextval('sales_id_seq'::regclass)"),
+        nullable=False
+    ),
+    sa.Column('branch', sa.String(), nullable=False),
+    sa.Column('city', sa.String(), nullable=False),
+    sa.Column('customer_type', sa.String(), nullable=False),
+    sa.Column('customer_id', sa.Integer(), nullable=True),
+    sa.Column('sale_date', sa.Date(), nullable=False),
+    *timestamps(),
+    sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ),
+    sa.PrimaryKeyConstraint('id', 'sale_date', name='sales_pkey'),
+    postgresql_partition_by='RANGE (sale_date)'
+    )
+    op.execute('ALTER SEQUENCE sales_id_seq OWNED BY sales.id')
+    op.create_table('saledetailss',
+    sa.Column('sale_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('sale_date', sa.Date(), nullable=False),
+    *timestamps(),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.ForeignKeyConstraint(
+        ['sale_id', 'sale_date'],
+        ['sales.id', 'sales.sale_date'],
+        name='saledetailss_sale_fkey',
+        onupdate='CASCADE'
+    ),
+    sa.PrimaryKeyConstraint(
+        'sale_id', 'product_id', 'sale_date', name='saledetailss_pkey'
+    ),
+    postgresql_partition_by='RANGE (sale_date)'
+    )
+
+    first_date, last_date = op.get_bind().execute(
+        sa.text('SELECT min(sale_date), max(sale_date) FROM sales_unpartitioned')
+    ).one()
+    for month in months_to_create(first_date, last_date):
+        for table in ('sales', 'saledetailss'):
+            op.execute(
+                f'CREATE TABLE {table}_{month:%Y_%m} PARTITION OF {table} '
+                f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')"
+            )
+
+    op.execute(
+        f'INSERT INTO sales ({SALES_COLUMNS}) '
+        f'SELECT {SALES_COLUMNS} FROM sales_unpartitioned'
+    )
+    op.execute(
+        f'INSERT INTO saledetailss ({DETAILS_COLUMNS}, sale_date) '
+        f'SELECT d.sale_id, d.product_id, d.quantity, d.created_at, d.updated_at, '
+        f's.sale_date '
+        f'FROM saledetailss_unpartitioned AS d '
+        f'JOIN sales_unpartitioned AS s ON s.id = d.sale_id'
+    )
+    op.drop_table('saledetailss_unpartitioned')
+    op.drop_table('sales_unpartitioned')
+    create_indexes()
+
+
+def downgrade() -> None:
+    move_old_tables('partitioned')
+
+    op.create_table('sales',
+    sa.Column(
+        'id',
+        sa.Integer(),
+        server_default=sa.text("nextval('sales_id_seq'::regclass)"),
+        nullable=False
+    ),
+    sa.Column('branch', sa.String(), nullable=False),
+    sa.Column('city', sa.String(), nullable=False),
+    sa.Column('customer_type', sa.String(), nullable=False),
+    sa.Column('customer_id', sa.Integer(), nullable=True),
+    sa.Column('sale_date', sa.Date(), nullable=False),
+    *timestamps(),
+    sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ),
+    sa.PrimaryKeyConstraint('id', name='sales_pkey')
+    )
+    op.execute('ALTER SEQUENCE sales_id_seq OWNED BY sales.id')
+    op.create_table('saledetailss',
+    sa.Column('sale_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    *timestamps(),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.ForeignKeyConstraint(['sale_id'], ['sales.id'], ),
+    sa.PrimaryKeyConstraint('sale_id', 'product_id', name='saledetailss_pkey')
+    )
+
+    op.execute(
+        f'INSERT INTO sales ({SALES_COLUMNS}) '
+        f'SELECT {SALES_COLUMNS} FROM sales_partitioned'
+    )
+    op.execute(
+        f'INSERT INTO saledetailss ({DETAILS_COLUMNS}) '
+        f'SELECT {DETAILS_COLUMNS} FROM saledetailss_partitioned'
+    )
+    # Секции удаляются вместе с родительскими таблицами
+    op.drop_table('saledetailss_partitioned')
+    op.drop_table('sales_partitioned')
+    create_indexes()
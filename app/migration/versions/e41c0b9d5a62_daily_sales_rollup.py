@@ -0,0 +1,71 @@
+"""Daily sales rollup
+
+Revision ID: e41c0b9d5a62
+Revises: b7f5b2e4a146
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e41c0b9d5a62'
+down_revision: Union[str, None] = 'b7f5b2e4a146'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Тот же расчёт, что app.analytics.rollup.rollup_query, для начального заполнения
+BACKFILL = """
+INSERT INTO daily_sales_rollup (
+    sale_date, branch, city, customer_type, product_category,
+    revenue, units, orders, order_share
+)
+SELECT sale_date, branch, city, customer_type, product_category,
+    sum(revenue), sum(units), count(*),
+    count(*) FILTER (WHERE first_category)
+FROM (
+    SELECT s.sale_date, s.branch, s.city, s.customer_type, p.product_category,
+        sum(CAST(p.unit_price AS NUMERIC) * d.quantity) AS revenue,
+        sum(d.quantity) AS units,
+        p.product_category = min(p.product_category)
+            OVER (PARTITION BY s.id, s.sale_date) AS first_category
+    FROM sales AS s
+    JOIN saledetailss AS d ON d.sale_id = s.id AND d.sale_date = s.sale_date
+    JOIN products AS p ON p.id = d.product_id
+    GROUP BY s.id, s.sale_date, s.branch, s.city, s.customer_type, p.product_category
+) AS per_sale
+GROUP BY sale_date, branch, city, customer_type, product_category
+"""
+
+
+def upgrade() -> None:
+    op.create_table('daily_sales_rollup',
+    sa.Column('sale_date', sa.Date(), nullable=False),
+    sa.Column('branch', sa.String(), nullable=False),
+    sa.Column('city', sa.String(), nullable=False),
+    sa.Column('customer_type', sa.String(), nullable=False),
+    sa.Column('product_category', sa.String(), nullable=False),
+    sa.Column('revenue', sa.Numeric(), nullable=False),
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.Column('orders', sa.Integer(), nullable=False),
+    sa.Column('order_share', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint(
+        'sale_date',
+        'branch',
+        'city',
+        'customer_type',
+        'product_category',
+        name='daily_sales_rollup_pkey'
+    )
+    )
+    op.execute(BACKFILL)
+
+
+def downgrade() -> None:
+    op.drop_table('daily_sales_rollup')
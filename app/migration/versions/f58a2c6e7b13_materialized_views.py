@@ -0,0 +1,103 @@
+"""Materialized views
+
+Revision ID: f58a2c6e7b13
+Revises: e41c0b9d5a62
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f58a2c6e7b13'
+down_revision: Union[str, None] = 'e41c0b9d5a62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (имя, запрос, уникальный ключ) — REFRESH ... CONCURRENTLY требует
+# уникального индекса по обычным колонкам представления
+VIEWS = [
+    (
+        'mv_customer_spend',
+        """
+        SELECT c.id AS customer_id, c.first_name, c.last_name, c.email,
+            count(DISTINCT s.id) AS orders,
+            coalesce(sum(d.quantity), 0) AS units,
+            round(CAST(coalesce(sum(p.unit_price * d.quantity), 0) AS NUMERIC), 2)
+                AS revenue,
+            min(s.sale_date) AS first_sale_date,
+            max(s.sale_date) AS last_sale_date
+        FROM customers AS c
+        LEFT JOIN sales AS s ON s.customer_id = c.id
+        LEFT JOIN saledetailss AS d ON d.sale_id = s.id AND d.sale_date = s.sale_date
+        LEFT JOIN products AS p ON p.id = d.product_id
+        GROUP BY c.id
+        """,
+        ['customer_id'],
+    ),
+    (
+        'mv_product_sales',
+        """
+        SELECT p.id AS product_id, p.product_name, p.product_category,
+            count(d.sale_id) AS orders,
+            coalesce(sum(d.quantity), 0) AS units,
+            round(CAST(coalesce(sum(p.unit_price * d.quantity), 0) AS NUMERIC), 2)
+                AS revenue,
+            max(d.sale_date) AS last_sale_date
+        FROM products AS p
+        LEFT JOIN saledetailss AS d ON d.product_id = p.id
+        GROUP BY p.id
+        """,
+        ['product_id'],
+    ),
+    (
+        'mv_branch_month',
+        """
+        SELECT s.branch,
+            CAST(date_trunc('month', CAST(s.sale_date AS TIMESTAMP)) AS DATE) AS month,
+            count(DISTINCT s.id) AS orders,
+            coalesce(sum(d.quantity), 0) AS units,
+            count(DISTINCT s.customer_id) AS customers,
+            round(CAST(coalesce(sum(p.unit_price * d.quantity), 0) AS NUMERIC), 2)
+                AS revenue
+        FROM sales AS s
+        LEFT JOIN saledetailss AS d ON d.sale_id = s.id AND d.sale_date = s.sale_date
+        LEFT JOIN products AS p ON p.id = d.product_id
+        GROUP BY 1, 2
+        """,
+        ['branch', 'month'],
+    ),
+]
+
+
+def upgrade() -> None:
+    op.create_table('mv_refresh_log',
+    sa.Column('view_name', sa.String(), nullable=False),
+    sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+    sa.Column('duration_ms', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('view_name')
+    )
+    for name, query, keys in VIEWS:
+        op.execute(f'CREATE MATERIALIZED VIEW {name} AS {query}')
+        op.create_index(f'ux_{name}_{"_".join(keys)}', name, keys, unique=True)
+        op.execute(
+            f"INSERT INTO mv_refresh_log (view_name, refreshed_at, duration_ms) "
+            f"VALUES ('{name}', now(), 0)"
+        )
+    op.create_index(
+        'ix_mv_product_sales_product_category',
+        'mv_product_sales',
+        ['product_category']
+    )
+
+
+def downgrade() -> None:
+    for name, query, keys in reversed(VIEWS):
+        op.execute(f'DROP MATERIALIZED VIEW {name}')
+    op.drop_table('mv_refresh_log')
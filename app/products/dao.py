@@ -1,6 +1,48 @@
-from app.products.models import Product
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.analytics.rollup import RollupChange, sale_keys
 from app.dao.base import BaseDAO
+from app.products.models import Product
+from app.saledetails.models import SaleDetails
+
+# Колонки товара, от которых зависят дневные итоги
+ROLLUP_PRODUCT_COLUMNS = ("unit_price", "product_category")
 
 
 class ProductDAO(BaseDAO):
     model = Product
+
+    # Цена и категория входят в итоги каждой продажи товара,
+    # поэтому их смена и удаление товара отслеживают все его продажи
+    @classmethod
+    async def before_write(
+        cls,
+        session: AsyncSession,
+        rows: list[dict],
+        change: RollupChange | None = None,
+        **filter_by
+    ) -> RollupChange:
+        if change is None:
+            change = RollupChange()
+        touched = not rows or any(
+            column in row for row in rows for column in ROLLUP_PRODUCT_COLUMNS
+        )
+        if not filter_by or not touched:
+            return change
+        keys = await sale_keys(
+            session,
+            select(SaleDetails.sale_id, SaleDetails.sale_date)
+            .where(
+                SaleDetails.product_id.in_(
+                    select(Product.id).filter_by(**filter_by)
+                )
+            )
+            .distinct()
+        )
+        await change.track(session, keys)
+        return change
+
+    @classmethod
+    async def after_write(cls, session: AsyncSession, change: RollupChange):
+        await change.apply(session)
@@ -1,6 +1,7 @@
+from sqlalchemy import Index
 from sqlalchemy.orm import Mapped, relationship
 
-from app.database import Base, str_null_true, int_pk
+from app.database import Base, str_null_true, int_pk, timestamp_indexes
 
 
 class Product(Base):
@@ -10,6 +11,17 @@ class Product(Base):
     product_category: Mapped[str]
     unit_price: Mapped[float]
 
+    __table_args__ = (
+        Index("ix_products_product_category", "product_category"),
+        # text_pattern_ops нужен фильтру prefix: LIKE 'abc%' вне локали C
+        Index(
+            "ix_products_product_name_pattern",
+            "product_name",
+            postgresql_ops={"product_name": "text_pattern_ops"}
+        ),
+        *timestamp_indexes("products"),
+    )
+
     saledetails: Mapped[list["SaleDetails"]] = relationship(  # noqa: F821
         "SaleDetails",
         back_populates="product"
@@ -1,5 +1,7 @@
 from datetime import date
 
+from app.dao.filters import Filters, parse_filters
+
 
 class RBProduct:
     def __init__(
@@ -8,11 +10,13 @@ class RBProduct:
             product_name: str | None = None,
             product_category: str | None = None,
             unit_price: float | None = None,
+            filters: Filters = None,
     ):
         self.id = id
         self.product_name = product_name
         self.product_category = product_category
         self.unit_price = unit_price
+        self.filters = parse_filters(filters)
 
     def to_dict(self) -> dict:
         date = {
@@ -20,6 +24,7 @@ class RBProduct:
             'product_name': self.product_name,
             'product_category': self.product_category,
             'unit_price': self.unit_price,
+            'filters': self.filters,
         }
         filttered_date = {
             key: value
@@ -37,7 +42,8 @@ class RBProductTime:
             product_category: str | None = None,
             unit_price: float | None = None,
             start_time: date | None = None,
-            end_time: date | None = None
+            end_time: date | None = None,
+            filters: Filters = None
     ):
         self.id = id
         self.product_name = product_name
@@ -45,6 +51,7 @@ class RBProductTime:
         self.unit_price = unit_price
         self.start_time = start_time
         self.end_time = end_time
+        self.filters = parse_filters(filters)
 
     def to_dict(self) -> dict:
         date = {
@@ -53,7 +60,8 @@ class RBProductTime:
             'product_category': self.product_category,
             'unit_price': self.unit_price,
             'start_time': self.start_time,
-            'end_time': self.end_time
+            'end_time': self.end_time,
+            'filters': self.filters,
         }
         filttered_date = {
             key: value
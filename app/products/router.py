@@ -4,9 +4,14 @@ from fastapi import (
     HTTPException,
     UploadFile,
     File,
+    Response,
 )
 from fastapi.responses import StreamingResponse
-from app.bulk.bulk import get_bulk_dict
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_session, use_workload
+from app.bulk.bulk import BulkMode, iter_bulk_batches
+from app.dao.fields import RBFields
+from app.dao.pagination import RBPage
 from app.products.dao import ProductDAO
 from app.products.schemas import SProduct, SProductAdd, SProductUpd
 from app.products.rb import RBProduct, RBProductTime
@@ -22,10 +27,21 @@ router = APIRouter(prefix="/products", tags=["Работа с продуктам
     summary="Получить список всех продуктов"
 )
 async def get_all_products(
+    response: Response,
     request_body: RBProduct = Depends(),
-    user_data: User = Depends(is_current_user_analyst)
+    page: RBPage = Depends(),
+    fields: RBFields = Depends(),
+    user_data: User = Depends(is_current_user_analyst),
+    session: AsyncSession = Depends(get_session)
 ) -> list[SProduct]:
-    return await ProductDAO.find_all(**request_body.to_dict())
+    products = await ProductDAO.find_rows(
+        **request_body.to_dict(),
+        **page.to_dict(),
+        **fields.to_dict(),
+        session=session
+    )
+    page.set_next_cursor(response, products, ProductDAO.cursor_keys())
+    return fields.render(products, response)
 
 
 @router.get(
@@ -35,9 +51,10 @@ async def get_all_products(
 )
 async def get_product_by_id(
     id: int,
-    user_data: User = Depends(is_current_user_analyst)
+    user_data: User = Depends(is_current_user_analyst),
+    session: AsyncSession = Depends(get_session)
 ) -> SProduct | None:
-    rez = await ProductDAO.find_one_or_none_by_id(id)
+    rez = await ProductDAO.find_one_or_none_by_id(id, session=session)
     if not rez:
         raise HTTPException(status_code=404, detail=f'Продукт с id={id} не найден')
     return rez
@@ -49,25 +66,36 @@ async def get_product_by_id(
     summary=(
         "Получить детали продаж в заданном временном диапазоне."
         "Доступные параметры: created_at, updated_at"
-    )
+    ),
+    dependencies=[Depends(use_workload("analytics"))]
 )
 async def get_products_by_time_range(
     param: str,
+    response: Response,
     user_data: User = Depends(is_current_user_analyst),
-    request_body: RBProductTime = Depends()
+    request_body: RBProductTime = Depends(),
+    page: RBPage = Depends(),
+    fields: RBFields = Depends(),
+    session: AsyncSession = Depends(get_session)
 ) -> list[SProduct]:
-    return await ProductDAO.find_all_in_time_range(
+    products = await ProductDAO.find_rows(
         **request_body.to_dict(),
-        param=param
+        **page.to_dict(),
+        **fields.to_dict(),
+        param=param,
+        session=session
     )
+    page.set_next_cursor(response, products, ProductDAO.cursor_keys())
+    return fields.render(products, response)
 
 
 @router.post("/add/")
 async def add_product(
     product: SProductAdd,
-    user_data: User = Depends(is_current_user_admin)
+    user_data: User = Depends(is_current_user_admin),
+    session: AsyncSession = Depends(get_session)
 ) -> dict:
-    check = await ProductDAO.add(**product.dict())
+    check = await ProductDAO.add(**product.dict(), session=session)
     if check:
         return {"message": "Продукт успешно добавлен!", "product": product}
     else:
@@ -78,11 +106,13 @@ async def add_product(
 async def update_product_by_id(
     id: int,
     new_product: SProductUpd = Depends(),
-    user_data: User = Depends(is_current_user_admin)
+    user_data: User = Depends(is_current_user_admin),
+    session: AsyncSession = Depends(get_session)
 ) -> dict:
     check = await ProductDAO.update(
         filter_by={'id': id},
-        **new_product.to_new_data_dict()
+        **new_product.to_new_data_dict(),
+        session=session
     )
     if check:
         return {
@@ -96,11 +126,13 @@ async def update_product_by_id(
 @router.put("/update_by_filter/")
 async def update_product_by_filter(
     new_product: SProductUpd = Depends(),
-    user_data: User = Depends(is_current_user_admin)
+    user_data: User = Depends(is_current_user_admin),
+    session: AsyncSession = Depends(get_session)
 ) -> dict:
     check = await ProductDAO.update(
         filter_by=new_product.to_filter_dict(),
-        **new_product.to_new_data_dict()
+        **new_product.to_new_data_dict(),
+        session=session
     )
     if check:
         return {
@@ -115,9 +147,10 @@ async def update_product_by_filter(
 @router.delete("/delete/{id}")
 async def delete_product_by_id(
     id: int,
-    user_data: User = Depends(is_current_user_admin)
+    user_data: User = Depends(is_current_user_admin),
+    session: AsyncSession = Depends(get_session)
 ) -> dict:
-    check = await ProductDAO.delete(id=id)
+    check = await ProductDAO.delete(id=id, session=session)
     if check:
         return {"message": f"Продукт с {id} удалён!"}
     else:
@@ -127,23 +160,31 @@ async def delete_product_by_id(
 @router.post("/bulk_insert/")
 async def bulk_insert_products(
     user_data: User = Depends(is_current_user_admin),
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    mode: BulkMode = BulkMode.insert
 ):
-    valid_records = await get_bulk_dict(file, SProductAdd)
+    batches = iter_bulk_batches(file, SProductAdd)
 
-    check = await ProductDAO.bulk_insert(valid_records)
-    if check:
-        return {"message": "Продукты успешно добавлены!"}
+    check = await ProductDAO.bulk_load(batches, mode)
+    if check["inserted"] or check["updated"]:
+        return {"message": "Продукты успешно добавлены!", **check}
     else:
-        return {"message": "Ошибка при добавлении продуктов!"}
+        return {"message": "Ошибка при добавлении продуктов!", **check}
 
 
-@router.get("/get_csv/")
+@router.get(
+    "/get_csv/",
+    dependencies=[Depends(use_workload("analytics"))]
+)
 async def get_csv(
     request_body: RBProduct = Depends(),
+    fields: RBFields = Depends(),
     user_data: User = Depends(is_current_user_admin)
 ):
-    return await ProductDAO.export_to_csv(**request_body.to_dict())
+    return await ProductDAO.export_to_csv(
+        **request_body.to_dict(),
+        **fields.to_dict()
+    )
 
 
 @router.get(
@@ -154,15 +195,18 @@ async def get_csv(
             "content": {"text/csv": {}},
             "description": "Return the CSV file."
         }
-    }
+    },
+    dependencies=[Depends(use_workload("analytics"))]
 )
 async def download_csv(
     request_body: RBProduct = Depends(),
+    fields: RBFields = Depends(),
     user_data: User = Depends(is_current_user_admin)
 ) -> StreamingResponse:
-    csv_data = await ProductDAO.export_to_csv(**request_body.to_dict())
-
+    # Параметры проверяются до начала потока: после заголовков 422 уже не отдать
+    ProductDAO.check_query(**request_body.to_dict(), **fields.to_dict())
     return StreamingResponse(
-        iter([csv_data]), media_type="text/csv",
+        ProductDAO.stream_csv(**request_body.to_dict(), **fields.to_dict()),
+        media_type="text/csv",
         headers={"Content-Disposition": "attachment; filename=products.csv"}
     )
@@ -1,17 +1,71 @@
-from app.database import async_session_maker
+from app.database import primary_reads, session_scope
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 from sqlalchemy.future import select
 
+from app.analytics.rollup import RollupChange, sale_keys
 from app.saledetails.models import SaleDetails
+from app.sales.models import Sale
 from app.dao.base import BaseDAO
 
 
 class SaleDetailsDAO(BaseDAO):
     model = SaleDetails
 
+    # sale_date входит в ключ секционирования, поэтому берётся у продажи.
+    # Для неизвестной продажи он остаётся пустым, и запись отклонит NOT NULL
     @classmethod
-    async def find_with_price_one_or_none_by_id(cls, data_id: int):
-        async with async_session_maker() as session:
+    async def prepare_rows(cls, session: AsyncSession, rows: list[dict]) -> list[dict]:
+        sale_ids = {
+            row["sale_id"]
+            for row in rows
+            if row.get("sale_id") is not None and "sale_date" not in row
+        }
+        if not sale_ids:
+            return rows
+        with primary_reads():
+            result = await session.execute(
+                select(Sale.id, Sale.sale_date).where(Sale.id.in_(sale_ids))
+            )
+        sale_dates = dict(result.all())
+        for row in rows:
+            if row.get("sale_id") in sale_ids:
+                row["sale_date"] = sale_dates.get(row["sale_id"])
+        return rows
+
+    # Отслеживаются продажи записываемых позиций и позиций под условием
+    @classmethod
+    async def before_write(
+        cls,
+        session: AsyncSession,
+        rows: list[dict],
+        change: RollupChange | None = None,
+        **filter_by
+    ) -> RollupChange:
+        if change is None:
+            change = RollupChange()
+        keys = {(row.get("sale_id"), row.get("sale_date")) for row in rows}
+        if filter_by:
+            keys |= await sale_keys(
+                session,
+                select(SaleDetails.sale_id, SaleDetails.sale_date)
+                .filter_by(**filter_by)
+                .distinct()
+            )
+        await change.track(session, keys)
+        return change
+
+    @classmethod
+    async def after_write(cls, session: AsyncSession, change: RollupChange):
+        await change.apply(session)
+
+    @classmethod
+    async def find_with_price_one_or_none_by_id(
+        cls,
+        data_id: int,
+        session: AsyncSession | None = None
+    ):
+        async with session_scope(session) as session:
             query = select(cls.model).options(
                 joinedload(cls.model.product)
             ).filter_by(sale_id=data_id)
@@ -1,21 +1,37 @@
-from sqlalchemy import ForeignKey, text
+from sqlalchemy import ForeignKey, ForeignKeyConstraint, Index, text
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 
-from app.database import Base, int_pk
+from app.database import Base, int_pk, timestamp_indexes
+
+from datetime import date
 from app.products.models import Product
 from app.sales.models import Sale
 
 
 class SaleDetails(Base):
-    sale_id: Mapped[int_pk] = mapped_column(
-        ForeignKey("sales.id"),
-        nullable=False
-    )
+    sale_id: Mapped[int_pk] = mapped_column(nullable=False)
     product_id: Mapped[int_pk] = mapped_column(
         ForeignKey("products.id"),
         nullable=False
     )
     quantity: Mapped[int] = mapped_column(server_default=text('0'))
+    # Копия даты продажи: строки секционируются по тем же месяцам, что и sales,
+    # и ссылаются на продажу по (sale_id, sale_date)
+    sale_date: Mapped[date] = mapped_column(primary_key=True)
+
+    # По sale_id ищет первичный ключ (sale_id, product_id, sale_date)
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["sale_id", "sale_date"],
+            ["sales.id", "sales.sale_date"],
+            name="saledetailss_sale_fkey",
+            onupdate="CASCADE"
+        ),
+        Index("ix_saledetailss_product_id", "product_id"),
+        *timestamp_indexes("saledetailss", brin=True),
+        {"postgresql_partition_by": "RANGE (sale_date)"},
+    )
+    __mapper_args__ = {"primary_key": [sale_id, product_id]}
 
     sale: Mapped["Sale"] = relationship("Sale", back_populates="saledetails")
     product: Mapped["Product"] = relationship("Product", back_populates="saledetails")
@@ -28,6 +44,7 @@ class SaleDetails(Base):
             'sale_id': self.sale_id,
             'product_id': self.product_id,
             'quantity': self.quantity,
+            'sale_date': self.sale_date,
             'created_at': self.created_at,
             'updated_at': self.updated_at
         }
@@ -4,8 +4,13 @@ from fastapi import (
     HTTPException,
     UploadFile,
     File,
+    Response,
 )
 from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_session, use_workload
+from app.dao.fields import RBFields
+from app.dao.pagination import RBPage
 from app.saledetails.dao import SaleDetailsDAO
 from app.saledetails.rb import RBSaleDetail, RBSaleDetailTime
 from app.saledetails.schemas import (
@@ -20,7 +25,7 @@ from app.users.dependencies import (
     is_current_user_vendor,
 )
 from app.users.models import User
-from app.bulk.bulk import get_bulk_dict
+from app.bulk.bulk import BulkMode, iter_bulk_batches
 
 router = APIRouter(prefix="/saledetails", tags=["Работа с SaleDetails"])
 
@@ -31,10 +36,21 @@ router = APIRouter(prefix="/saledetails", tags=["Работа с SaleDetails"])
     description="Получить список всех SaleDetails",
 )
 async def get_all_saledetails(
+    response: Response,
     request_body: RBSaleDetail = Depends(),
-    user_data: User = Depends(is_current_user_analyst)
+    page: RBPage = Depends(),
+    fields: RBFields = Depends(),
+    user_data: User = Depends(is_current_user_analyst),
+    session: AsyncSession = Depends(get_session)
 ) -> list[SSaleDetail]:
-    return await SaleDetailsDAO.find_all(**request_body.to_dict())
+    saledetails = await SaleDetailsDAO.find_rows(
+        **request_body.to_dict(),
+        **page.to_dict(),
+        **fields.to_dict(),
+        session=session
+    )
+    page.set_next_cursor(response, saledetails, SaleDetailsDAO.cursor_keys())
+    return fields.render(saledetails, response)
 
 
 @router.get(
@@ -44,9 +60,13 @@ async def get_all_saledetails(
 )
 async def get_full_by_sale_id(
     sale_id: int,
-    user_data: User = Depends(is_current_user_analyst)
+    user_data: User = Depends(is_current_user_analyst),
+    session: AsyncSession = Depends(get_session)
 ) -> list[SSaleDetail] | None:
-    result = await SaleDetailsDAO.find_with_price_one_or_none_by_id(sale_id)
+    result = await SaleDetailsDAO.find_with_price_one_or_none_by_id(
+        sale_id,
+        session=session
+    )
 
     if not result:
         raise HTTPException(
@@ -61,18 +81,28 @@ async def get_full_by_sale_id(
     response_model=list[SSaleDetail],
     summary=(
         "Получить детали продаж в заданном временном диапазоне."
-        "Доступные параметры: created_at, updated_at"
-    )
+        "Доступные параметры: sale_date, created_at, updated_at"
+    ),
+    dependencies=[Depends(use_workload("analytics"))]
 )
 async def get_saledetails_by_time_range(
     param: str,
+    response: Response,
     user_data: User = Depends(is_current_user_analyst),
-    request_body: RBSaleDetailTime = Depends()
+    request_body: RBSaleDetailTime = Depends(),
+    page: RBPage = Depends(),
+    fields: RBFields = Depends(),
+    session: AsyncSession = Depends(get_session)
 ) -> list[SSaleDetail]:
-    return await SaleDetailsDAO.find_all_in_time_range(
+    saledetails = await SaleDetailsDAO.find_rows(
         **request_body.to_dict(),
-        param=param
+        **page.to_dict(),
+        **fields.to_dict(),
+        param=param,
+        session=session
     )
+    page.set_next_cursor(response, saledetails, SaleDetailsDAO.cursor_keys())
+    return fields.render(saledetails, response)
 
 
 @router.get(
@@ -80,26 +110,30 @@ async def get_saledetails_by_time_range(
     response_model=list[SSaleDetailFull],
     summary=(
         "Получить детали продаж в заданном временном диапазоне."
-        "Доступные параметры: created_at, updated_at"
-    )
+        "Доступные параметры: sale_date, created_at, updated_at"
+    ),
+    dependencies=[Depends(use_workload("analytics"))]
 )
 async def get_full_saledetails_by_time_range(
     param: str,
     user_data: User = Depends(is_current_user_analyst),
-    request_body: RBSaleDetailTime = Depends()
+    request_body: RBSaleDetailTime = Depends(),
+    session: AsyncSession = Depends(get_session)
 ) -> list[SSaleDetailFull]:
     return await SaleDetailsDAO.find_all_in_time_range(
         **request_body.to_dict(),
-        param=param
+        param=param,
+        session=session
     )
 
 
 @router.post("/add/")
 async def add_saledetail(
     saledetail: SSaleDetailAdd,
-    user_data: User = Depends(is_current_user_vendor)
+    user_data: User = Depends(is_current_user_vendor),
+    session: AsyncSession = Depends(get_session)
 ) -> dict:
-    check = await SaleDetailsDAO.add(**saledetail.dict())
+    check = await SaleDetailsDAO.add(**saledetail.dict(), session=session)
     if check:
         return {
             "message": "Детали продажи успешно добавлены!",
@@ -112,11 +146,13 @@ async def add_saledetail(
 @router.put("/update/")
 async def update_saledetail(
     saledetail: SSaleDetailUpd,
-    user_data: User = Depends(is_current_user_admin)
+    user_data: User = Depends(is_current_user_admin),
+    session: AsyncSession = Depends(get_session)
 ) -> dict:
     check = await SaleDetailsDAO.update(
         filter_by=saledetail.to_filter_dict(),
-        **saledetail.to_new_data_dict()
+        **saledetail.to_new_data_dict(),
+        session=session
     )
     if check:
         return {
@@ -131,9 +167,10 @@ async def update_saledetail(
 @router.delete("/delete/{id}")
 async def delete_saledetail_by_id(
     id: int,
-    user_data: User = Depends(is_current_user_admin)
+    user_data: User = Depends(is_current_user_admin),
+    session: AsyncSession = Depends(get_session)
 ) -> dict:
-    check = await SaleDetailsDAO.delete(sale_id=id)
+    check = await SaleDetailsDAO.delete(sale_id=id, session=session)
     if check:
         return {"message": f"Детали продажи с {id} удалены!"}
     else:
@@ -143,23 +180,31 @@ async def delete_saledetail_by_id(
 @router.post("/bulk_insert/")
 async def bulk_insert_saledetails(
     user_data: User = Depends(is_current_user_admin),
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    mode: BulkMode = BulkMode.insert
 ):
-    valid_records = await get_bulk_dict(file, SSaleDetailAdd)
+    batches = iter_bulk_batches(file, SSaleDetailAdd)
 
-    check = await SaleDetailsDAO.bulk_insert(valid_records)
-    if check:
-        return {"message": "Детали продажи успешно добавлены!"}
+    check = await SaleDetailsDAO.bulk_load(batches, mode)
+    if check["inserted"] or check["updated"]:
+        return {"message": "Детали продажи успешно добавлены!", **check}
     else:
-        return {"message": "Ошибка при добавлении деталей продажи!"}
+        return {"message": "Ошибка при добавлении деталей продажи!", **check}
 
 
-@router.get("/get_csv/")
+@router.get(
+    "/get_csv/",
+    dependencies=[Depends(use_workload("analytics"))]
+)
 async def get_csv(
     request_body: RBSaleDetail = Depends(),
+    fields: RBFields = Depends(),
     user_data: User = Depends(is_current_user_admin)
 ):
-    return await SaleDetailsDAO.export_to_csv(**request_body.to_dict())
+    return await SaleDetailsDAO.export_to_csv(
+        **request_body.to_dict(),
+        **fields.to_dict()
+    )
 
 
 @router.get(
@@ -170,15 +215,18 @@ async def get_csv(
             "content": {"text/csv": {}},
             "description": "Return the CSV file."
         }
-    }
+    },
+    dependencies=[Depends(use_workload("analytics"))]
 )
 async def download_csv(
     request_body: RBSaleDetail = Depends(),
+    fields: RBFields = Depends(),
     user_data: User = Depends(is_current_user_admin)
 ) -> StreamingResponse:
-    csv_data = await SaleDetailsDAO.export_to_csv(**request_body.to_dict())
-
+    # Параметры проверяются до начала потока: после заголовков 422 уже не отдать
+    SaleDetailsDAO.check_query(**request_body.to_dict(), **fields.to_dict())
     return StreamingResponse(
-        iter([csv_data]), media_type="text/csv",
+        SaleDetailsDAO.stream_csv(**request_body.to_dict(), **fields.to_dict()),
+        media_type="text/csv",
         headers={"Content-Disposition": "attachment; filename=sales_details.csv"}
     )
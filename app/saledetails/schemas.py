@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional
 
@@ -8,6 +8,7 @@ class SSaleDetail(BaseModel):
     sale_id: int = Field(..., description="ID продажи")
     product_id: int = Field(..., description="ID продукта")
     quantity: int = Field(..., description="Количество продукта")
+    sale_date: date = Field(..., description="Дата продажи")
     created_at: datetime = Field(..., description="Время создания записи в таблице")
     updated_at: datetime = Field(..., description="Время обноввления записи в таблице")
 
@@ -19,6 +20,7 @@ class SSaleDetailFull(BaseModel):
     unit_price: float = Field(..., description="Цена продукта")
     quantity: int = Field(..., description="Количество продукта")
     total_price: float = Field(..., description="Общая стоимость товаров")
+    sale_date: date = Field(..., description="Дата продажи")
     created_at: datetime = Field(..., description="Время создания записи в таблице")
     updated_at: datetime = Field(..., description="Время обноввления записи в таблице")
 
@@ -1,84 +1,431 @@
-from app.database import async_session_maker
-from sqlalchemy.orm import joinedload
+import json
+from datetime import date
+from decimal import Decimal
+
+from app.database import primary_reads, session_scope
+from sqlalchemy import (
+    Date,
+    DateTime,
+    Numeric,
+    case,
+    cast,
+    distinct,
+    func,
+    literal,
+    literal_column,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.logger import logger
 
+from app.analytics.models import DailySalesRollup
+from app.analytics.rollup import RollupChange, sale_keys
+from app.cache import build_cache_key, bump_table_version, get_or_compute
+from app.config import settings
+from app.customers.models import Customer
 from app.sales.models import Sale
 from app.saledetails.models import SaleDetails
+from app.products.models import Product
 from app.dao.base import BaseDAO
+from app.dao.pagination import apply_keyset
+from app.sales.partitions import ensure_sales_partitions
+
+# Шаг generate_series для каждой единицы date_trunc
+GRANULARITY_STEPS = {
+    "day": "1 day",
+    "week": "1 week",
+    "month": "1 month",
+    "quarter": "3 months",
+}
+
+
+def month_of(value):
+    return cast(
+        func.date_trunc(literal("month", literal_execute=True), cast(value, DateTime)),
+        Date
+    )
+
+
+# Измерения сводной таблицы по сырым таблицам
+PIVOT_DIMENSIONS = {
+    "branch": Sale.branch,
+    "city": Sale.city,
+    "customer_type": Sale.customer_type,
+    "gender": Customer.gender,
+    "product_category": Product.product_category,
+    "month": month_of(Sale.sale_date),
+}
+# Измерения и показатели, на которые отвечают дневные итоги
+ROLLUP_DIMENSIONS = {
+    "branch": DailySalesRollup.branch,
+    "city": DailySalesRollup.city,
+    "customer_type": DailySalesRollup.customer_type,
+    "product_category": DailySalesRollup.product_category,
+    "month": month_of(DailySalesRollup.sale_date),
+}
+ROLLUP_MEASURES = ("revenue", "quantity", "orders")
+# Таблицы, от версий которых зависит кешированная сводная таблица
+PIVOT_TABLES = ["sales", "saledetailss", "products", "customers", "daily_sales_rollup"]
 
 
 class SaleDAO(BaseDAO):
     model = Sale
 
     @classmethod
-    async def find_all_with_total(cls, **filter_by):
-        async with async_session_maker() as session:
-            query = select(Sale).filter_by(**filter_by).options(
-                joinedload(Sale.saledetails).joinedload(SaleDetails.product)
+    async def prepare_rows(cls, session: AsyncSession, rows: list[dict]) -> list[dict]:
+        await ensure_sales_partitions(session, [row.get("sale_date") for row in rows])
+        return rows
 
+    # Новые продажи без позиций в итоги не входят, поэтому отслеживаются
+    # только продажи под условием update и delete
+    @classmethod
+    async def before_write(
+        cls,
+        session: AsyncSession,
+        rows: list[dict],
+        change: RollupChange | None = None,
+        **filter_by
+    ) -> RollupChange:
+        if change is None:
+            change = RollupChange()
+        if not filter_by:
+            return change
+        keys = await sale_keys(
+            session,
+            select(Sale.id, Sale.sale_date).filter_by(**filter_by)
+        )
+        await change.track(session, keys)
+        # Смена даты переносит продажу вместе с позициями в другой ключ
+        for values in rows:
+            change.expect(
+                (values.get("id", sale_id), values.get("sale_date", sale_date))
+                for sale_id, sale_date in keys
             )
+        return change
+
+    @classmethod
+    async def after_write(cls, session: AsyncSession, change: RollupChange):
+        await change.apply(session)
+
+    # Смена ключа продажи каскадом переписывает её позиции,
+    # поэтому устаревают и кеши по saledetailss
+    @classmethod
+    async def update(
+        cls,
+        filter_by,
+        session: AsyncSession | None = None,
+        **values
+    ):
+        rowcount = await super().update(filter_by, session=session, **values)
+        if rowcount and ("sale_date" in values or "id" in values):
+            await bump_table_version(SaleDetails.__tablename__)
+        return rowcount
+
+    @classmethod
+    def _total_amount(cls):
+        return func.round(
+            cast(
+                func.coalesce(func.sum(Product.unit_price * SaleDetails.quantity), 0),
+                Numeric
+            ),
+            2
+        )
+
+    @classmethod
+    def _with_total_query(cls, total_amount: float | None = None, **filter_by):
+        total = cls._total_amount()
+        query = (
+            select(
+                Sale.id.label("sale_id"),
+                Sale.branch,
+                Sale.city,
+                Sale.customer_type,
+                Sale.customer_id,
+                Sale.sale_date,
+                total.label("total_amount"),
+                Sale.created_at,
+                Sale.updated_at,
+            )
+            # Условие по sale_date сводит соединение к одноимённым секциям
+            .outerjoin(
+                SaleDetails,
+                (SaleDetails.sale_id == Sale.id)
+                & (SaleDetails.sale_date == Sale.sale_date)
+            )
+            .outerjoin(Product, Product.id == SaleDetails.product_id)
+            .where(*[getattr(Sale, k) == v for k, v in filter_by.items()])
+            .group_by(Sale.id, Sale.sale_date)
+        )
+        if total_amount is not None:
+            query = query.having(total == Decimal(str(total_amount)))
+        return query
+
+    @classmethod
+    async def find_all_with_total(
+        cls,
+        limit: int | None = None,
+        after: str | None = None,
+        session: AsyncSession | None = None,
+        **filter_by
+    ):
+        async with session_scope(session, "analytics") as session:
+            query = cls._with_total_query(**filter_by)
+            query = apply_keyset(query, [Sale.id], limit, after)
             result = await session.execute(query)
-            sales = result.unique().scalars().all()
+            sales_data = result.mappings().all()
 
-            if not sales:
+            if not sales_data:
                 return None
 
-            sales_data = []
-            for sale in sales:
-                total_amount = sum(
-                    sd.product.unit_price * sd.quantity
-                    for sd in sale.saledetails
-                )
-                sales_data.append({
-                    "sale_id": sale.id,
-                    "branch": sale.branch,
-                    "city": sale.city,
-                    "customer_type": sale.customer_type,
-                    "customer_id": sale.customer_id,
-                    "sale_date": sale.sale_date,
-                    "total_amount": (
-                        round(total_amount, 2)
-                        if total_amount is not None
-                        else total_amount
-                    ),
-                    "created_at": sale.created_at,
-                    "updated_at": sale.updated_at
-                })
-
             return sales_data
 
     @classmethod
-    async def find_one_or_none_with_total(cls, data_id: int):
-        async with async_session_maker() as session:
-            query = select(Sale).filter_by(id=data_id).options(
-                joinedload(Sale.saledetails).joinedload(SaleDetails.product)
+    async def find_one_or_none_with_total(
+        cls,
+        data_id: int,
+        session: AsyncSession | None = None
+    ):
+        async with session_scope(session) as session:
+            query = cls._with_total_query(id=data_id)
+            result = await session.execute(query)
+            return result.mappings().one_or_none()
+
+    # Ряд строится по дневным итогам, а не по сырым продажам
+    @classmethod
+    def _revenue_series_query(
+        cls,
+        start_date: date,
+        end_date: date,
+        granularity: str = "month",
+        **filter_by
+    ):
+        # Единица усечения подставляется в SQL литералом: иначе date_trunc
+        # в SELECT и GROUP BY получат разные параметры и не совпадут
+        unit = literal(granularity, literal_execute=True)
+
+        def bucket(value):
+            return func.date_trunc(unit, cast(value, DateTime))
+
+        step = literal_column(f"interval '{GRANULARITY_STEPS[granularity]}'")
+        buckets = select(
+            func.generate_series(
+                bucket(literal(start_date)), bucket(literal(end_date)), step
+            ).label("bucket")
+        ).subquery("buckets")
+
+        rollup = DailySalesRollup
+        # Без фильтра по категории продажа с товарами нескольких категорий
+        # считается один раз
+        orders = rollup.order_share
+        if "product_category" in filter_by:
+            orders = rollup.orders
+        period = bucket(rollup.sale_date).label("bucket")
+        totals = (
+            select(
+                period,
+                func.round(func.sum(rollup.revenue), 2).label("revenue"),
+                func.sum(orders).label("orders"),
+                func.sum(rollup.units).label("units"),
+            )
+            .where(
+                rollup.sale_date >= start_date,
+                rollup.sale_date <= end_date,
+                *[getattr(rollup, k) == v for k, v in filter_by.items()]
+            )
+            .group_by(period)
+            .subquery("totals")
+        )
+
+        # Пустые периоды дополняются нулями через generate_series
+        return (
+            select(
+                cast(buckets.c.bucket, Date).label("bucket"),
+                func.coalesce(totals.c.revenue, 0).label("revenue"),
+                func.coalesce(totals.c.orders, 0).label("orders"),
+                func.coalesce(totals.c.units, 0).label("units"),
+            )
+            .select_from(buckets)
+            .outerjoin(totals, totals.c.bucket == buckets.c.bucket)
+            .order_by(buckets.c.bucket)
+        )
+
+    @classmethod
+    def _pivot_select(cls, columns: dict, measures: dict, totals: str = "rollup"):
+        grouping_sets = func.rollup if totals == "rollup" else func.cube
+        return (
+            select(
+                *[column.label(name) for name, column in columns.items()],
+                *[measure.label(name) for name, measure in measures.items()],
+                func.grouping(*columns.values()).label("grouping_id"),
+            )
+            .group_by(grouping_sets(*columns.values()))
+            # Итог по группе идёт сразу после её строк
+            .order_by(*[
+                clause
+                for column in columns.values()
+                for clause in (func.grouping(column), column)
+            ])
+        )
 
+    @classmethod
+    def _pivot_rollup_query(
+        cls,
+        dimensions: tuple[str, ...],
+        measures: tuple[str, ...],
+        totals: str = "rollup",
+    ):
+        rollup = DailySalesRollup
+        columns = {name: ROLLUP_DIMENSIONS[name] for name in dimensions}
+        orders = func.sum(rollup.order_share)
+        if "product_category" in columns:
+            # Строка категории считает все продажи с её товарами,
+            # итог по категориям — каждую продажу один раз
+            orders = case(
+                (func.grouping(rollup.product_category) == 0, func.sum(rollup.orders)),
+                else_=orders
             )
-            result = await session.execute(query)
-            sale = result.unique().scalar_one_or_none()
+        available = {
+            "revenue": func.round(func.sum(rollup.revenue), 2),
+            "quantity": func.sum(rollup.units),
+            "orders": orders,
+        }
+        return cls._pivot_select(
+            columns,
+            {name: available[name] for name in measures},
+            totals
+        ).select_from(rollup)
 
-            if not sale:
-                return None
+    @classmethod
+    def _pivot_raw_query(
+        cls,
+        dimensions: tuple[str, ...],
+        measures: tuple[str, ...],
+        totals: str = "rollup",
+    ):
+        columns = {name: PIVOT_DIMENSIONS[name] for name in dimensions}
+        available = {
+            "revenue": cls._total_amount(),
+            "quantity": func.sum(SaleDetails.quantity),
+            "orders": func.count(distinct(Sale.id)),
+            "customers": func.count(distinct(Sale.customer_id)),
+        }
+        query = (
+            cls._pivot_select(
+                columns,
+                {name: available[name] for name in measures},
+                totals
+            )
+            .select_from(Sale)
+            .join(
+                SaleDetails,
+                (SaleDetails.sale_id == Sale.id)
+                & (SaleDetails.sale_date == Sale.sale_date)
+            )
+            .join(Product, Product.id == SaleDetails.product_id)
+        )
+        if "gender" in dimensions:
+            query = query.outerjoin(Customer, Customer.id == Sale.customer_id)
+        return query
+
+    # Дневных итогов хватает, если в запросе нет пола и числа клиентов;
+    # иначе запрос идёт по сырым таблицам
+    @classmethod
+    def _pivot_query(
+        cls,
+        dimensions: tuple[str, ...],
+        measures: tuple[str, ...],
+        totals: str = "rollup",
+        start_date: date | None = None,
+        end_date: date | None = None,
+    ):
+        from_rollup = (
+            set(dimensions) <= ROLLUP_DIMENSIONS.keys()
+            and set(measures) <= set(ROLLUP_MEASURES)
+        )
+        if from_rollup:
+            query = cls._pivot_rollup_query(dimensions, measures, totals)
+            sale_date = DailySalesRollup.sale_date
+        else:
+            query = cls._pivot_raw_query(dimensions, measures, totals)
+            sale_date = Sale.sale_date
+        if start_date is not None:
+            query = query.where(sale_date >= start_date)
+        if end_date is not None:
+            query = query.where(sale_date <= end_date)
+        return query
+
+    @classmethod
+    async def pivot(
+        cls,
+        dimensions: tuple[str, ...],
+        measures: tuple[str, ...],
+        totals: str = "rollup",
+        start_date: date | None = None,
+        end_date: date | None = None,
+    ) -> bytes:
+        query = cls._pivot_query(dimensions, measures, totals, start_date, end_date)
+
+        async def build_pivot() -> bytes:
+            async with session_scope(workload="analytics") as session:
+                result = await session.execute(query)
+                rows = []
+                for row in result.mappings():
+                    row = dict(row)
+                    # Бит измерения в GROUPING равен 1, если строка — итог по нему
+                    grouping_id = row.pop("grouping_id")
+                    row["rolled_up"] = [
+                        name
+                        for i, name in enumerate(reversed(dimensions))
+                        if grouping_id >> i & 1
+                    ][::-1]
+                    rows.append(row)
+            return json.dumps(jsonable_encoder(rows)).encode("utf-8")
 
-            total_amount = sum(
-                sd.product.unit_price * sd.quantity
-                for sd in sale.saledetails
+        try:
+            # Ключ — форма запроса и версии всех участвующих таблиц
+            cache_key = await build_cache_key(
+                "pivot:sales",
+                PIVOT_TABLES,
+                dimensions=",".join(dimensions),
+                measures=",".join(measures),
+                totals=totals,
+                start_date=start_date,
+                end_date=end_date
             )
+            if not cache_key:
+                return await build_pivot()
 
-            sales_data = {
-                "sale_id": sale.id,
-                "branch": sale.branch,
-                "city": sale.city,
-                "customer_type": sale.customer_type,
-                "customer_id": sale.customer_id,
-                "sale_date": sale.sale_date,
-                "total_amount": (
-                    round(total_amount, 2)
-                    if total_amount is not None
-                    else total_amount
-                ),
-                "created_at": sale.created_at,
-                "updated_at": sale.updated_at
-            }
+            # Кешируемое значение читается с основной базы, как в export_to_csv
+            async def fill_pivot() -> bytes:
+                with primary_reads():
+                    return await build_pivot()
 
-            return sales_data
+            return await get_or_compute(
+                cache_key,
+                fill_pivot,
+                settings.PIVOT_CACHE_TTL
+            )
+        except Exception as e:
+            logger.error(f"Error building pivot for sales: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error building pivot for sales, {str(e)}"
+            ) from e
+
+    @classmethod
+    async def revenue_series(
+        cls,
+        start_date: date,
+        end_date: date,
+        granularity: str = "month",
+        session: AsyncSession | None = None,
+        **filter_by
+    ):
+        async with session_scope(session, "analytics") as session:
+            query = cls._revenue_series_query(
+                start_date, end_date, granularity, **filter_by
+            )
+            result = await session.execute(query)
+            return result.mappings().all()
@@ -1,18 +1,20 @@
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 
-from app.database import Base, int_pk
+from app.database import Base, int_pk, timestamp_indexes
 
 from datetime import date
 
 
 class Sale(Base):
-    id: Mapped[int_pk]
+    id: Mapped[int_pk] = mapped_column(autoincrement=True)
     branch: Mapped[str]
     city: Mapped[str]
     customer_type: Mapped[str]
     customer_id: Mapped[int] = mapped_column(ForeignKey('customers.id'), nullable=True)
-    sale_date: Mapped[date]
+    # Таблица секционирована по месяцам sale_date, а ключ секционирования
+    # обязан входить в первичный ключ
+    sale_date: Mapped[date] = mapped_column(primary_key=True)
 
     saledetails: Mapped[list["SaleDetails"]] = relationship(  # noqa: F821
         "SaleDetails",
@@ -23,5 +25,16 @@ class Sale(Base):
         back_populates="sales"
     )
 
+    __table_args__ = (
+        Index("ix_sales_customer_id", "customer_id"),
+        Index("ix_sales_sale_date", "sale_date"),
+        Index("ix_sales_branch_city", "branch", "city"),
+        Index("ix_sales_city", "city"),
+        *timestamp_indexes("sales", brin=True),
+        {"postgresql_partition_by": "RANGE (sale_date)"},
+    )
+    # id уникален сам по себе, поэтому ORM и курсоры страниц опираются только на него
+    __mapper_args__ = {"primary_key": [id]}
+
     def __repr__(self):
         return f"{self.__class__.__name__}(id={self.id})"
@@ -0,0 +1,163 @@
+import argparse
+import asyncio
+import contextlib
+from datetime import date
+from typing import Iterable
+
+from fastapi.logger import logger
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import close_engine, engine, primary_reads, session_scope
+
+
+# sales и saledetailss секционируются по одним и тем же месяцам sale_date
+PARTITIONED_TABLES = ("sales", "saledetailss")
+# Ключ advisory-блокировки, под которой создаются секции
+PARTITION_LOCK_ID = 7_340_021
+
+# Месяцы, секции которых уже зафиксированы в базе
+_known_months: set[date] = set()
+_maintenance: asyncio.Task | None = None
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_{month:%Y_%m}"
+
+
+async def _partition_exists(session: AsyncSession, name: str) -> bool:
+    return await session.scalar(select(func.to_regclass(name))) is not None
+
+
+# Секция создаётся отдельной таблицей и присоединяется через ATTACH PARTITION:
+# он берёт на родителе SHARE UPDATE EXCLUSIVE и не блокирует чтения,
+# тогда как CREATE TABLE ... PARTITION OF держал бы ACCESS EXCLUSIVE
+# до конца транзакции записи
+async def _create_partition(session: AsyncSession, table: str, month: date):
+    name = partition_name(table, month)
+    if await _partition_exists(session, name):
+        return
+    connection = await session.connection()
+    await connection.exec_driver_sql(
+        f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS)"
+    )
+    await connection.exec_driver_sql(
+        f"ALTER TABLE {table} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')"
+    )
+    logger.info(f"Created partition {name}")
+
+
+# Создаёт недостающие секции для дат в транзакции сессии, до записи строк.
+# Месяц запоминается, только если секция уже была в базе: созданная
+# в откатившейся транзакции секция исчезнет вместе с ней.
+# Внешний ключ новой секции saledetailss до конца транзакции задерживает
+# чужие записи в sales, поэтому фоновая задача создаёт секции заранее
+async def ensure_sales_partitions(session: AsyncSession, dates: Iterable[date]):
+    months = {month_start(value) for value in dates if value is not None}
+    months -= _known_months
+    if not months:
+        return
+    with primary_reads():
+        for month in sorted(months):
+            # Секции месяца создаются парой, поэтому достаточно проверить последнюю
+            if await _partition_exists(session, partition_name("saledetailss", month)):
+                _known_months.add(month)
+                continue
+            # Конкурентные записи ждут, пока первая создаст секции, и видят их
+            await session.execute(
+                select(func.pg_advisory_xact_lock(PARTITION_LOCK_ID))
+            )
+            for table in PARTITIONED_TABLES:
+                await _create_partition(session, table, month)
+
+
+async def create_future_partitions(months_ahead: int = settings.SALES_PARTITIONS_AHEAD):
+    first = month_start(date.today())
+    async with session_scope() as session:
+        async with session.begin():
+            await ensure_sales_partitions(
+                session,
+                [add_months(first, offset) for offset in range(months_ahead + 1)]
+            )
+
+
+# Отсоединяет месяц для архивации. DETACH ... CONCURRENTLY не блокирует
+# чтение и запись, но работает только вне транзакции и без секции DEFAULT.
+# Сначала отсоединяются детали продаж: их внешний ключ удерживает секцию sales
+async def detach_sales_partition(month: date):
+    month = month_start(month)
+    details = partition_name("saledetailss", month)
+    sales = partition_name("sales", month)
+    async with engine.connect() as connection:
+        connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+        await connection.exec_driver_sql(
+            f"ALTER TABLE saledetailss DETACH PARTITION {details} CONCURRENTLY"
+        )
+        await connection.exec_driver_sql(
+            f"ALTER TABLE {details} DROP CONSTRAINT IF EXISTS saledetailss_sale_fkey"
+        )
+        await connection.exec_driver_sql(
+            f"ALTER TABLE sales DETACH PARTITION {sales} CONCURRENTLY"
+        )
+    _known_months.discard(month)
+    logger.info(f"Detached partitions {sales}, {details}")
+
+
+async def _maintain_partitions():
+    while True:
+        try:
+            await create_future_partitions()
+        except Exception as e:
+            logger.error(f"Error creating sales partitions: {str(e)}")
+        await asyncio.sleep(settings.SALES_PARTITION_CHECK_INTERVAL)
+
+
+async def start_partition_maintenance():
+    global _maintenance
+    _maintenance = asyncio.create_task(_maintain_partitions())
+
+
+async def stop_partition_maintenance():
+    global _maintenance
+    if _maintenance is not None:
+        _maintenance.cancel()
+        # Начатые CREATE и ATTACH не должны идти по закрытому движку
+        with contextlib.suppress(asyncio.CancelledError):
+            await _maintenance
+        _maintenance = None
+
+
+async def main(command: str, month: date | None):
+    try:
+        if command == "ensure":
+            await create_future_partitions()
+        else:
+            await detach_sales_partition(month)
+    finally:
+        await close_engine()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Секции таблиц sales и saledetailss")
+    parser.add_argument("command", choices=["ensure", "detach"])
+    parser.add_argument(
+        "month",
+        nargs="?",
+        type=lambda value: date.fromisoformat(f"{value}-01"),
+        help="Месяц для detach в формате YYYY-MM"
+    )
+    args = parser.parse_args()
+    if args.command == "detach" and args.month is None:
+        parser.error("detach требует месяц YYYY-MM")
+    asyncio.run(main(args.command, args.month))
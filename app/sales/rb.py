@@ -1,4 +1,10 @@
 from datetime import date
+from enum import Enum
+from typing import Annotated
+
+from fastapi import HTTPException, Query
+
+from app.dao.filters import Filters, parse_filters
 
 
 class RBSale:
@@ -10,6 +16,7 @@ class RBSale:
             customer_type: str | None = None,
             customer_id: int | None = None,
             sale_date: date | None = None,
+            filters: Filters = None,
     ):
         self.id = id
         self.branch = branch
@@ -17,6 +24,7 @@ class RBSale:
         self.customer_type = customer_type
         self.customer_id = customer_id
         self.sale_date = sale_date
+        self.filters = parse_filters(filters)
 
     def to_dict(self) -> dict:
         date = {
@@ -26,6 +34,7 @@ class RBSale:
             'customer_type': self.customer_type,
             'customer_id': self.customer_id,
             'sale_date': self.sale_date,
+            'filters': self.filters,
         }
         filttered_date = {
             key: value
@@ -81,7 +90,8 @@ class RBSaleTime:
             customer_type: str | None = None,
             customer_id: int | None = None,
             start_time: date | None = None,
-            end_time: date | None = None
+            end_time: date | None = None,
+            filters: Filters = None
     ):
         self.id = id
         self.branch = branch
@@ -90,6 +100,7 @@ class RBSaleTime:
         self.customer_id = customer_id
         self.start_time = start_time
         self.end_time = end_time
+        self.filters = parse_filters(filters)
 
     def to_dict(self) -> dict:
         date = {
@@ -99,7 +110,120 @@ class RBSaleTime:
             'customer_type': self.customer_type,
             'customer_id': self.customer_id,
             'start_time': self.start_time,
-            'end_time': self.end_time
+            'end_time': self.end_time,
+            'filters': self.filters,
+        }
+        filttered_date = {
+            key: value
+            for key, value in date.items()
+            if value is not None
+        }
+        return filttered_date
+
+
+class Granularity(str, Enum):
+    day = "day"
+    week = "week"
+    month = "month"
+    quarter = "quarter"
+
+
+class RBRevenueSeries:
+    def __init__(
+            self,
+            start_date: date,
+            end_date: date,
+            granularity: Granularity = Granularity.month,
+            branch: str | None = None,
+            city: str | None = None,
+            customer_type: str | None = None,
+            product_category: str | None = None,
+    ):
+        if start_date > end_date:
+            raise HTTPException(
+                status_code=422,
+                detail="start_date не может быть позже end_date"
+            )
+        self.start_date = start_date
+        self.end_date = end_date
+        self.granularity = granularity
+        self.branch = branch
+        self.city = city
+        self.customer_type = customer_type
+        self.product_category = product_category
+
+    def to_dict(self) -> dict:
+        date = {
+            'start_date': self.start_date,
+            'end_date': self.end_date,
+            'granularity': self.granularity.value,
+            'branch': self.branch,
+            'city': self.city,
+            'customer_type': self.customer_type,
+            'product_category': self.product_category,
+        }
+        filttered_date = {
+            key: value
+            for key, value in date.items()
+            if value is not None
+        }
+        return filttered_date
+
+
+class PivotDimension(str, Enum):
+    branch = "branch"
+    city = "city"
+    customer_type = "customer_type"
+    gender = "gender"
+    product_category = "product_category"
+    month = "month"
+
+
+class PivotMeasure(str, Enum):
+    revenue = "revenue"
+    quantity = "quantity"
+    orders = "orders"
+    customers = "customers"
+
+
+class PivotTotals(str, Enum):
+    rollup = "rollup"
+    cube = "cube"
+
+
+class RBPivot:
+    def __init__(
+            self,
+            dimensions: Annotated[
+                list[PivotDimension],
+                Query(description="Измерения в порядке вложенности итогов")
+            ],
+            measures: Annotated[
+                list[PivotMeasure] | None,
+                Query(description="Показатели, по умолчанию все")
+            ] = None,
+            totals: PivotTotals = PivotTotals.rollup,
+            start_date: date | None = None,
+            end_date: date | None = None,
+    ):
+        if start_date and end_date and start_date > end_date:
+            raise HTTPException(
+                status_code=422,
+                detail="start_date не может быть позже end_date"
+            )
+        self.dimensions = tuple(dict.fromkeys(d.value for d in dimensions))
+        self.measures = tuple(dict.fromkeys(m.value for m in measures or PivotMeasure))
+        self.totals = totals
+        self.start_date = start_date
+        self.end_date = end_date
+
+    def to_dict(self) -> dict:
+        date = {
+            'dimensions': self.dimensions,
+            'measures': self.measures,
+            'totals': self.totals.value,
+            'start_date': self.start_date,
+            'end_date': self.end_date,
         }
         filttered_date = {
             key: value
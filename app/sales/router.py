@@ -4,18 +4,36 @@ from fastapi import (
     HTTPException,
     UploadFile,
     File,
+    Response,
 )
 from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_session, use_workload
+from app.dao.fields import RBFields
+from app.dao.pagination import RBPage
 from app.sales.dao import SaleDAO
-from app.sales.schemas import SSale, SSaleAdd, SSaleUpd, SSaleTotal
-from app.sales.rb import RBSale, RBSaleTime, RBSaleWithTotal
+from app.sales.schemas import (
+    SSale,
+    SSaleAdd,
+    SSaleUpd,
+    SSaleTotal,
+    SRevenuePoint,
+    SPivotRow,
+)
+from app.sales.rb import (
+    RBSale,
+    RBSaleTime,
+    RBSaleWithTotal,
+    RBRevenueSeries,
+    RBPivot,
+)
 from app.users.dependencies import (
     is_current_user_admin,
     is_current_user_analyst,
     is_current_user_vendor,
 )
 from app.users.models import User
-from app.bulk.bulk import get_bulk_dict
+from app.bulk.bulk import BulkMode, iter_bulk_batches
 
 router = APIRouter(prefix="/sales", tags=["Работа с продажами"])
 
@@ -26,27 +44,79 @@ router = APIRouter(prefix="/sales", tags=["Работа с продажами"])
     summary="Получить список всех продаж"
 )
 async def get_all_sales(
+    response: Response,
     request_body: RBSale = Depends(),
-    user_data: User = Depends(is_current_user_analyst)
+    page: RBPage = Depends(),
+    fields: RBFields = Depends(),
+    user_data: User = Depends(is_current_user_analyst),
+    session: AsyncSession = Depends(get_session)
 ) -> list[SSale]:
-    return await SaleDAO.find_all(**request_body.to_dict())
+    sales = await SaleDAO.find_rows(
+        **request_body.to_dict(),
+        **page.to_dict(),
+        **fields.to_dict(),
+        session=session
+    )
+    page.set_next_cursor(response, sales, SaleDAO.cursor_keys())
+    return fields.render(sales, response)
 
 
 @router.get(
     "/with_total",
     response_model=list[SSaleTotal],
-    summary="Получить список всех продаж с общими суммами"
+    summary="Получить список всех продаж с общими суммами",
+    dependencies=[Depends(use_workload("analytics"))]
 )
 async def get_all_sales_with_total(
+    response: Response,
     request_body: RBSaleWithTotal = Depends(),
-    user_data: User = Depends(is_current_user_analyst)
+    page: RBPage = Depends(),
+    user_data: User = Depends(is_current_user_analyst),
+    session: AsyncSession = Depends(get_session)
 ) -> list[SSaleTotal]:
-    sales = await SaleDAO.find_all_with_total(**request_body.to_dict())
+    sales = await SaleDAO.find_all_with_total(
+        **request_body.to_dict(),
+        **page.to_dict(),
+        session=session
+    )
     if not sales:
         raise HTTPException(status_code=404, detail="Продажи не найдены")
+    page.set_next_cursor(response, sales, ("sale_id",))
     return sales
 
 
+@router.get(
+    "/analytics/revenue_series",
+    response_model=list[SRevenuePoint],
+    summary="Выручка, число продаж и единиц товара по периодам. "
+            "Доступные периоды: day, week, month, quarter",
+    dependencies=[Depends(use_workload("analytics"))]
+)
+async def get_revenue_series(
+    request_body: RBRevenueSeries = Depends(),
+    user_data: User = Depends(is_current_user_analyst),
+    session: AsyncSession = Depends(get_session)
+) -> list[SRevenuePoint]:
+    return await SaleDAO.revenue_series(**request_body.to_dict(), session=session)
+
+
+@router.get(
+    "/analytics/pivot",
+    response_model=list[SPivotRow],
+    summary="Сводная таблица продаж с промежуточными итогами. "
+            "Измерения: branch, city, customer_type, gender, product_category, month. "
+            "Показатели: revenue, quantity, orders, customers",
+    dependencies=[Depends(use_workload("analytics"))]
+)
+async def get_sales_pivot(
+    request_body: RBPivot = Depends(),
+    user_data: User = Depends(is_current_user_analyst)
+) -> Response:
+    # Ответ уже сериализован и мог прийти из кеша
+    content = await SaleDAO.pivot(**request_body.to_dict())
+    return Response(content=content, media_type="application/json")
+
+
 @router.get(
     "/{id}/with_total/",
     response_model=SSaleTotal,
@@ -54,9 +124,10 @@ async def get_all_sales_with_total(
 )
 async def get_sale_by_id_with_total(
     id: int,
-    user_data: User = Depends(is_current_user_analyst)
+    user_data: User = Depends(is_current_user_analyst),
+    session: AsyncSession = Depends(get_session)
 ) -> SSaleTotal | None:
-    rez = await SaleDAO.find_one_or_none_with_total(id)
+    rez = await SaleDAO.find_one_or_none_with_total(id, session=session)
     if not rez:
         raise HTTPException(status_code=404, detail=f'Продажа с id={id} не найдена')
     return rez
@@ -69,9 +140,10 @@ async def get_sale_by_id_with_total(
 )
 async def get_sale_by_id(
     id: int,
-    user_data: User = Depends(is_current_user_analyst)
+    user_data: User = Depends(is_current_user_analyst),
+    session: AsyncSession = Depends(get_session)
 ) -> SSale | None:
-    rez = await SaleDAO.find_one_or_none_by_id(id)
+    rez = await SaleDAO.find_one_or_none_by_id(id, session=session)
     if not rez:
         raise HTTPException(status_code=404, detail=f'Продукт с id={id} не найден')
     return rez
@@ -83,22 +155,36 @@ async def get_sale_by_id(
     summary=(
         "Получить продажи в заданном временном диапазоне."
         "Доступные параметры: sale_date, created_at, updated_at"
-    )
+    ),
+    dependencies=[Depends(use_workload("analytics"))]
 )
 async def get_sales_by_time_range(
     param: str,
+    response: Response,
     user_data: User = Depends(is_current_user_analyst),
-    request_body: RBSaleTime = Depends()
+    request_body: RBSaleTime = Depends(),
+    page: RBPage = Depends(),
+    fields: RBFields = Depends(),
+    session: AsyncSession = Depends(get_session)
 ) -> list[SSale]:
-    return await SaleDAO.find_all_in_time_range(**request_body.to_dict(), param=param)
+    sales = await SaleDAO.find_rows(
+        **request_body.to_dict(),
+        **page.to_dict(),
+        **fields.to_dict(),
+        param=param,
+        session=session
+    )
+    page.set_next_cursor(response, sales, SaleDAO.cursor_keys())
+    return fields.render(sales, response)
 
 
 @router.post("/add/")
 async def add_sale(
     sale: SSaleAdd,
-    user_data: User = Depends(is_current_user_vendor)
+    user_data: User = Depends(is_current_user_vendor),
+    session: AsyncSession = Depends(get_session)
 ) -> dict:
-    check = await SaleDAO.add(**sale.dict())
+    check = await SaleDAO.add(**sale.dict(), session=session)
     if check:
         return {"message": "Продажа успешно добавлена!", "sale": sale}
     else:
@@ -109,9 +195,14 @@ async def add_sale(
 async def update_sale_by_id(
     id: int,
     new_sale: SSaleUpd = Depends(),
-    user_data: User = Depends(is_current_user_admin)
+    user_data: User = Depends(is_current_user_admin),
+    session: AsyncSession = Depends(get_session)
 ) -> dict:
-    check = await SaleDAO.update(filter_by={'id': id}, **new_sale.to_new_data_dict())
+    check = await SaleDAO.update(
+        filter_by={'id': id},
+        session=session,
+        **new_sale.to_new_data_dict()
+    )
     if check:
         return {
             "message": f"Продажа {id} успешно обновлён!",
@@ -124,11 +215,13 @@ async def update_sale_by_id(
 @router.put("/update_by_filter/")
 async def update_sale_by_filter(
     new_sale: SSaleUpd = Depends(),
-    user_data: User = Depends(is_current_user_admin)
+    user_data: User = Depends(is_current_user_admin),
+    session: AsyncSession = Depends(get_session)
 ) -> dict:
     check = await SaleDAO.update(
         filter_by=new_sale.to_filter_dict(),
-        **new_sale.to_new_data_dict()
+        **new_sale.to_new_data_dict(),
+        session=session
     )
     if check:
         return {
@@ -155,23 +248,31 @@ async def delete_sale_by_id(
 @router.post("/bulk_insert/")
 async def bulk_insert_sales(
     user_data: User = Depends(is_current_user_admin),
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    mode: BulkMode = BulkMode.insert
 ):
-    valid_records = await get_bulk_dict(file, SSaleAdd)
+    batches = iter_bulk_batches(file, SSaleAdd)
 
-    check = await SaleDAO.bulk_insert(valid_records)
-    if check:
-        return {"message": "Продажи успешно добавлены!"}
+    check = await SaleDAO.bulk_load(batches, mode)
+    if check["inserted"] or check["updated"]:
+        return {"message": "Продажи успешно добавлены!", **check}
     else:
-        return {"message": "Ошибка при добавлении продаж!"}
+        return {"message": "Ошибка при добавлении продаж!", **check}
 
 
-@router.get("/get_csv/")
+@router.get(
+    "/get_csv/",
+    dependencies=[Depends(use_workload("analytics"))]
+)
 async def get_csv(
     request_body: RBSale = Depends(),
+    fields: RBFields = Depends(),
     user_data: User = Depends(is_current_user_admin)
 ):
-    return await SaleDAO.export_to_csv(**request_body.to_dict())
+    return await SaleDAO.export_to_csv(
+        **request_body.to_dict(),
+        **fields.to_dict()
+    )
 
 
 @router.get(
@@ -182,15 +283,18 @@ async def get_csv(
             "content": {"text/csv": {}},
             "description": "Return the CSV file."
         }
-    }
+    },
+    dependencies=[Depends(use_workload("analytics"))]
 )
 async def download_csv(
     request_body: RBSale = Depends(),
+    fields: RBFields = Depends(),
     user_data: User = Depends(is_current_user_admin)
 ) -> StreamingResponse:
-    csv_data = await SaleDAO.export_to_csv(**request_body.to_dict())
-
+    # Параметры проверяются до начала потока: после заголовков 422 уже не отдать
+    SaleDAO.check_query(**request_body.to_dict(), **fields.to_dict())
     return StreamingResponse(
-        iter([csv_data]), media_type="text/csv",
+        SaleDAO.stream_csv(**request_body.to_dict(), **fields.to_dict()),
+        media_type="text/csv",
         headers={"Content-Disposition": "attachment; filename=sales.csv"}
     )
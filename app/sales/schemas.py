@@ -74,3 +74,29 @@ class SSaleUpd(BaseModel):
         }
         filtered_data = {key: value for key, value in data.items() if value is not None}
         return filtered_data
+
+
+class SRevenuePoint(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    bucket: date = Field(..., description="Начало периода")
+    revenue: float = Field(..., description="Выручка за период")
+    orders: int = Field(..., description="Количество продаж за период")
+    units: int = Field(..., description="Количество проданных единиц товара")
+
+
+class SPivotRow(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    branch: Optional[str] = Field(None, description="Название филиала")
+    city: Optional[str] = Field(None, description="Город")
+    customer_type: Optional[str] = Field(None, description="Тип клиента")
+    gender: Optional[str] = Field(None, description="Пол клиента")
+    product_category: Optional[str] = Field(None, description="Категория товара")
+    month: Optional[date] = Field(None, description="Месяц продажи")
+    revenue: Optional[float] = Field(None, description="Выручка")
+    quantity: Optional[int] = Field(None, description="Количество единиц товара")
+    orders: Optional[int] = Field(None, description="Количество продаж")
+    customers: Optional[int] = Field(None, description="Количество разных клиентов")
+    rolled_up: list[str] = Field(
+        ...,
+        description="Измерения, по которым строка является итогом"
+    )
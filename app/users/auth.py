@@ -1,3 +1,6 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
 from fastapi import Request, Depends
 
 from passlib.context import CryptContext
@@ -5,8 +8,12 @@ from jose import jwt, JWTError
 from datetime import datetime, timedelta, timezone
 from pydantic import EmailStr
 
-from app.config import get_auth_data
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_auth_data, settings
+from app.database import get_session, primary_reads
 from app.exceptions import (
+    PasswordHashingBusyException,
     TokenExpiredException,
     TokenNotFoundException,
     NoUserIdException,
@@ -14,10 +21,19 @@ from app.exceptions import (
     NoJwtException,
 )
 
+from app.users.cache import get_cached_principal, store_principal
 from app.users.dao import UsersDAO
+from app.users.models import User
 
 pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
 
+# bcrypt отпускает GIL, поэтому хватает пула потоков ограниченного размера.
+# Пул создаётся при первом хешировании и закрывается при остановке приложения
+password_hash_executor: ThreadPoolExecutor | None = None
+password_hash_slots = asyncio.Semaphore(
+    settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE_SIZE
+)
+
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
@@ -27,6 +43,43 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def get_password_hash_executor() -> ThreadPoolExecutor:
+    global password_hash_executor
+    if password_hash_executor is None:
+        password_hash_executor = ThreadPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS,
+            thread_name_prefix="password-hash"
+        )
+    return password_hash_executor
+
+
+def close_password_hashing():
+    global password_hash_executor
+    if password_hash_executor is not None:
+        password_hash_executor.shutdown(wait=False, cancel_futures=True)
+        password_hash_executor = None
+
+
+async def run_in_hash_pool(func, *args):
+    if password_hash_slots.locked():
+        raise PasswordHashingBusyException
+    async with password_hash_slots:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            get_password_hash_executor(),
+            func,
+            *args
+        )
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await run_in_hash_pool(get_password_hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(days=30)
@@ -41,8 +94,9 @@ def create_access_token(data: dict) -> str:
 
 
 async def authenticate_user(email: EmailStr, password: str):
-    user = await UsersDAO.find_one_or_none_by_filter(email=email)
-    if not user or verify_password(
+    with primary_reads():
+        user = await UsersDAO.find_one_or_none_by_filter(email=email)
+    if not user or await verify_password_async(
         plain_password=password,
         hashed_password=user.password
     ) is False:
@@ -57,7 +111,10 @@ def get_token(request: Request):
     return token
 
 
-async def get_current_user(token: str = Depends(get_token)):
+async def get_current_user(
+    token: str = Depends(get_token),
+    session: AsyncSession = Depends(get_session)
+):
     try:
         auth_data = get_auth_data()
         payload = jwt.decode(
@@ -77,8 +134,15 @@ async def get_current_user(token: str = Depends(get_token)):
     if not user_id:
         raise NoUserIdException
 
-    user = await UsersDAO.find_one_or_none_by_id(int(user_id))
-    if not user:
-        raise NoUserException
-
-    return user
+    principal, cache_key = await get_cached_principal(int(user_id))
+    if principal is None:
+        with primary_reads():
+            user = await UsersDAO.find_one_or_none_by_id(int(user_id), session=session)
+        if not user:
+            raise NoUserException
+        principal = await store_principal(user, cache_key)
+        # Возвращаем соединение в пул: заполнение кеша в DAO берёт своё,
+        # и запрос не должен держать два соединения пула нагрузки
+        await session.close()
+
+    return User(**principal)
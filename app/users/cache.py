@@ -0,0 +1,79 @@
+import json
+import time
+
+from app.cache import bump_table_version, build_cache_key, cache_get, cache_set
+from app.config import settings
+
+PRINCIPAL_FIELDS = (
+    "id",
+    "phone_number",
+    "email",
+    "first_name",
+    "last_name",
+    "is_user",
+    "is_vendor",
+    "is_analyst",
+    "is_admin",
+    "is_super_admin",
+)
+
+# Локальный кеш процесса: user_id -> (момент истечения, данные пользователя)
+_local_principals: dict[int, tuple[float, dict]] = {}
+
+
+def principal_version(user_id: int) -> str:
+    return f"principal:{user_id}"
+
+
+# Ключ включает версию пользователя, прочитанную до похода в базу.
+# Запрос, прочитавший пользователя до фиксации записи, сохранит данные
+# под старой версией, которую запись уже сменила, и их никто не прочитает
+async def principal_key(user_id: int) -> str | None:
+    return await build_cache_key("principal", [principal_version(user_id)])
+
+
+# Возвращает данные и ключ, под которым их сохранит store_principal
+async def get_cached_principal(user_id: int) -> tuple[dict | None, str | None]:
+    entry = _local_principals.get(user_id)
+    if entry and entry[0] > time.monotonic():
+        return entry[1], None
+
+    key = await principal_key(user_id)
+    if key is None:
+        return None, None
+    cached = await cache_get(key)
+    if cached is None:
+        return None, key
+    data = json.loads(cached)
+    _remember_locally(user_id, data)
+    return data, key
+
+
+async def store_principal(user, key: str | None) -> dict:
+    data = {field: getattr(user, field) for field in PRINCIPAL_FIELDS}
+    if key is not None:
+        await cache_set(
+            key,
+            json.dumps(data).encode("utf-8"),
+            settings.PRINCIPAL_CACHE_TTL
+        )
+    _remember_locally(user.id, data)
+    return data
+
+
+# Локальные кеши других воркеров не сбрасываются: там данные
+# устаревают не дольше PRINCIPAL_LOCAL_TTL
+async def invalidate_principals(*user_ids: int):
+    for user_id in user_ids:
+        _local_principals.pop(user_id, None)
+    if user_ids:
+        await bump_table_version(*[principal_version(user_id) for user_id in user_ids])
+
+
+def _remember_locally(user_id: int, data: dict):
+    if len(_local_principals) >= settings.PRINCIPAL_LOCAL_MAX_SIZE:
+        _local_principals.clear()
+    _local_principals[user_id] = (
+        time.monotonic() + settings.PRINCIPAL_LOCAL_TTL,
+        data
+    )
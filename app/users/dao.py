@@ -1,6 +1,54 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
 from app.dao.base import BaseDAO
+from app.database import primary_reads, session_scope
+from app.users.cache import invalidate_principals
 from app.users.models import User
 
 
 class UsersDAO(BaseDAO):
     model = User
+    upsert_keys = ("email",)
+    upsert_exclude = ("password",)
+    filter_exclude = ("password",)
+
+    @classmethod
+    async def _find_ids(
+        cls,
+        session: AsyncSession | None = None,
+        **filter_by
+    ) -> list[int]:
+        async with session_scope(session) as session:
+            with primary_reads():
+                query = select(cls.model.id).filter_by(**filter_by)
+                result = await session.execute(query)
+                return result.scalars().all()
+
+    @classmethod
+    async def update(
+        cls,
+        filter_by,
+        session: AsyncSession | None = None,
+        **values
+    ):
+        user_ids = await cls._find_ids(session, **filter_by)
+        rowcount = await super().update(filter_by, session, **values)
+        await invalidate_principals(*user_ids)
+        return rowcount
+
+    @classmethod
+    async def delete(
+        cls,
+        delete_all: bool = False,
+        session: AsyncSession | None = None,
+        **filter_by
+    ):
+        user_ids = await cls._find_ids(session, **filter_by)
+        rowcount = await super().delete(delete_all, session, **filter_by)
+        await invalidate_principals(*user_ids)
+        return rowcount
+
+    @classmethod
+    async def after_bulk_update(cls, ids: list[int]):
+        await invalidate_principals(*ids)
@@ -8,8 +8,13 @@ from fastapi import (
     File,
 )
 from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_session, use_workload
+from app.dao.fields import RBFields
+from app.dao.pagination import RBPage
 from app.users.auth import (
-    get_password_hash,
+    get_password_hash_async,
+    run_in_hash_pool,
     authenticate_user,
     create_access_token,
     get_current_user,
@@ -25,7 +30,7 @@ from app.users.schemas import (
 from app.users.rb import RBUser, RBUserTime
 from app.users.models import User
 from app.users.dependencies import is_current_user_admin, is_current_user_superadmin
-from app.bulk.bulk import get_bulk_dict
+from app.bulk.bulk import BulkMode, iter_bulk_batches
 
 router_auth = APIRouter(prefix="/auth", tags=["Auth"])
 router_users = APIRouter(prefix="/users", tags=["Работа с пользователями"])
@@ -45,7 +50,7 @@ async def register_user(user_data: SUserRegister) -> dict:
             detail='Пользователь уже существует'
         )
     user_dict = user_data.dict()
-    user_dict['password'] = get_password_hash(user_data.password)
+    user_dict['password'] = await get_password_hash_async(user_data.password)
     await UsersDAO.add(**user_dict)
     return {"message": "Пользователь зарегестрирован"}
 
@@ -70,8 +75,20 @@ async def logout_user(response: Response):
 
 
 @router_users.get("/", response_model=list[SUserFullData])
-async def get_all_users(user_data: User = Depends(is_current_user_admin)):
-    return await UsersDAO.find_all()
+async def get_all_users(
+    response: Response,
+    page: RBPage = Depends(),
+    fields: RBFields = Depends(),
+    user_data: User = Depends(is_current_user_admin),
+    session: AsyncSession = Depends(get_session)
+):
+    users = await UsersDAO.find_rows(
+        **page.to_dict(),
+        **fields.to_dict(),
+        session=session
+    )
+    page.set_next_cursor(response, users, UsersDAO.cursor_keys())
+    return fields.render(users, response)
 
 
 @router_users.get("/me", response_model=SUserData)
@@ -81,8 +98,15 @@ async def get_me(user_data: User = Depends(get_current_user)):
 
 # Костыль для суперадмина
 @router_users.put("/set_me_founder")
-async def set_me_founder(user_data: User = Depends(get_current_user)):
-    check = await UsersDAO.update(filter_by={'id': user_data.id}, is_super_admin=True)
+async def set_me_founder(
+    user_data: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session)
+):
+    check = await UsersDAO.update(
+        filter_by={'id': user_data.id},
+        is_super_admin=True,
+        session=session
+    )
     if check:
         return {"message": f"Пользователь {user_data.id} успешно обновлен!"}
     else:
@@ -96,9 +120,10 @@ async def set_me_founder(user_data: User = Depends(get_current_user)):
 )
 async def get_user_by_id(
     id: int,
-    user_data: User = Depends(is_current_user_admin)
+    user_data: User = Depends(is_current_user_admin),
+    session: AsyncSession = Depends(get_session)
 ) -> SUserData | None:
-    rez = await UsersDAO.find_one_or_none_by_id(id)
+    rez = await UsersDAO.find_one_or_none_by_id(id, session=session)
     if not rez:
         raise HTTPException(
             status_code=404,
@@ -113,22 +138,36 @@ async def get_user_by_id(
     summary=(
         "Получить пользователей в заданном временном диапазоне."
         "Доступные параметры: created_at, updated_at"
-    )
+    ),
+    dependencies=[Depends(use_workload("analytics"))]
 )
 async def get_users_by_time_range(
     param: str,
+    response: Response,
     user_data: User = Depends(is_current_user_admin),
-    request_body: RBUserTime = Depends()
+    request_body: RBUserTime = Depends(),
+    page: RBPage = Depends(),
+    fields: RBFields = Depends(),
+    session: AsyncSession = Depends(get_session)
 ) -> list[SUserData]:
-    return await UsersDAO.find_all_in_time_range(**request_body.to_dict(), param=param)
+    users = await UsersDAO.find_rows(
+        **request_body.to_dict(),
+        **page.to_dict(),
+        **fields.to_dict(),
+        param=param,
+        session=session
+    )
+    page.set_next_cursor(response, users, UsersDAO.cursor_keys())
+    return fields.render(users, response)
 
 
 @router_users.post("/add/")
 async def add_user(
     user: SUserRegister,
-    user_data: User = Depends(is_current_user_superadmin)
+    user_data: User = Depends(is_current_user_superadmin),
+    session: AsyncSession = Depends(get_session)
 ) -> dict:
-    check = await UsersDAO.add(**user.dict())
+    check = await UsersDAO.add(**user.dict(), session=session)
     if check:
         return {"message": "Пользователь успешно добавлен!", "user": user}
     else:
@@ -139,16 +178,15 @@ async def add_user(
 async def upd_user_by_id(
     id: int,
     new_user: SUserUpd = Depends(),
-    user_data: User = Depends(is_current_user_superadmin)
+    user_data: User = Depends(is_current_user_superadmin),
+    session: AsyncSession = Depends(get_session)
 ) -> dict:
-    check = await UsersDAO.update(
-        filter_by={"id": id},
-        **new_user.to_new_data_dict()
-    )
+    new_data = await run_in_hash_pool(new_user.to_new_data_dict)
+    check = await UsersDAO.update(filter_by={"id": id}, **new_data, session=session)
     if check:
         return {
             "message": f"Пользователь {id} успешно обновлен!",
-            "rows": new_user.to_new_data_dict()
+            "rows": new_data
         }
     else:
         return {"message": "Ошибка при обновлении пользователя!"}
@@ -157,17 +195,20 @@ async def upd_user_by_id(
 @router_users.put("/update_by_filter/")
 async def upd_user_by_filter(
     new_user: SUserUpd = Depends(),
-    user_data: User = Depends(is_current_user_superadmin)
+    user_data: User = Depends(is_current_user_superadmin),
+    session: AsyncSession = Depends(get_session)
 ) -> dict:
+    new_data = await run_in_hash_pool(new_user.to_new_data_dict)
     check = await UsersDAO.update(
         filter_by=new_user.to_filter_dict(),
-        **new_user.to_new_data_dict()
+        **new_data,
+        session=session
     )
     if check:
         return {
             "message": "Пользователи успешно обновлены!",
             "rows_updated": check,
-            "data": new_user.to_new_data_dict()
+            "data": new_data
         }
     else:
         return {"message": "Ошибка при обновлении пользователя!"}
@@ -176,9 +217,10 @@ async def upd_user_by_filter(
 @router_users.delete("/delete/{id}")
 async def delete_user_by_id(
     id: int,
-    user_data: User = Depends(is_current_user_superadmin)
+    user_data: User = Depends(is_current_user_superadmin),
+    session: AsyncSession = Depends(get_session)
 ) -> dict:
-    check = await UsersDAO.delete(id=id)
+    check = await UsersDAO.delete(id=id, session=session)
     if check:
         return {"message": f"Пользователь с {id} удалён!"}
     else:
@@ -188,23 +230,31 @@ async def delete_user_by_id(
 @router_users.post("/bulk_insert/")
 async def bulk_insert_users(
     user_data: User = Depends(is_current_user_admin),
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    mode: BulkMode = BulkMode.insert
 ):
-    valid_records = await get_bulk_dict(file, SUserRegister)
+    batches = iter_bulk_batches(file, SUserRegister)
 
-    check = await UsersDAO.bulk_insert(valid_records)
-    if check:
-        return {"message": "Пользователи успешно добавлены!"}
+    check = await UsersDAO.bulk_load(batches, mode)
+    if check["inserted"] or check["updated"]:
+        return {"message": "Пользователи успешно добавлены!", **check}
     else:
-        return {"message": "Ошибка при добавлении пользователей!"}
+        return {"message": "Ошибка при добавлении пользователей!", **check}
 
 
-@router_users.get("/get_csv/")
+@router_users.get(
+    "/get_csv/",
+    dependencies=[Depends(use_workload("analytics"))]
+)
 async def get_csv(
     request_body: RBUser = Depends(),
+    fields: RBFields = Depends(),
     user_data: User = Depends(is_current_user_admin)
 ):
-    return await UsersDAO.export_to_csv(**request_body.to_dict())
+    return await UsersDAO.export_to_csv(
+        **request_body.to_dict(),
+        **fields.to_dict()
+    )
 
 
 @router_users.get(
@@ -215,15 +265,18 @@ async def get_csv(
             "content": {"text/csv": {}},
             "description": "Return the CSV file."
         }
-    }
+    },
+    dependencies=[Depends(use_workload("analytics"))]
 )
 async def download_csv(
     request_body: RBUser = Depends(),
+    fields: RBFields = Depends(),
     user_data: User = Depends(is_current_user_admin)
 ) -> StreamingResponse:
-    csv_data = await UsersDAO.export_to_csv(**request_body.to_dict())
-
+    # Параметры проверяются до начала потока: после заголовков 422 уже не отдать
+    UsersDAO.check_query(**request_body.to_dict(), **fields.to_dict())
     return StreamingResponse(
-        iter([csv_data]), media_type="text/csv",
+        UsersDAO.stream_csv(**request_body.to_dict(), **fields.to_dict()),
+        media_type="text/csv",
         headers={"Content-Disposition": "attachment; filename=users.csv"}
     )
@@ -0,0 +1,78 @@
+"""Разбор и валидация CSV продаж: построчный Pydantic против векторной проверки.
+
+Запуск: python -m benchmarks.bench_bulk_validation --rows 1000000
+"""
+import argparse
+import io
+import random
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+
+from app.bulk.bulk import BulkErrors, _validate_chunk
+from app.config import settings
+from app.sales.schemas import SSaleAdd
+
+
+def make_sales_csv(rows: int, invalid_share: float) -> bytes:
+    rng = random.Random(42)
+    start = date(2020, 1, 1)
+    lines = ["branch,city,customer_type,customer_id,sale_date"]
+    for _ in range(rows):
+        customer_id = str(rng.randint(1, 100000))
+        if rng.random() < invalid_share:
+            customer_id = "unknown"
+        sale_date = start + timedelta(days=rng.randint(0, 1500))
+        lines.append(
+            f"{rng.choice('ABC')},{rng.choice(['Yangon', 'Mandalay', 'Naypyitaw'])},"
+            f"{rng.choice(['Member', 'Normal'])},{customer_id},{sale_date.isoformat()}"
+        )
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def per_row(data: bytes, chunk_size: int) -> tuple[int, int]:
+    valid = invalid = 0
+    for chunk in pd.read_csv(io.BytesIO(data), chunksize=chunk_size):
+        for record in chunk.to_dict(orient="records"):
+            try:
+                SSaleAdd(**record).dict()
+                valid += 1
+            except Exception:
+                invalid += 1
+    return valid, invalid
+
+
+def vectorized(data: bytes, chunk_size: int) -> tuple[int, int]:
+    valid = 0
+    errors = BulkErrors()
+    line = 2
+    for chunk in pd.read_csv(io.BytesIO(data), dtype=str, chunksize=chunk_size):
+        valid += len(_validate_chunk(chunk, SSaleAdd, line, errors))
+        line += len(chunk)
+    return valid, errors.count
+
+
+def main(rows: int, invalid_share: float, chunk_size: int):
+    data = make_sales_csv(rows, invalid_share)
+    print(f"rows={rows} invalid_share={invalid_share} chunk_size={chunk_size}")
+    results = {}
+    for name, run in (("per-row", per_row), ("vectorized", vectorized)):
+        started = time.perf_counter()
+        results[name] = run(data, chunk_size)
+        elapsed = time.perf_counter() - started
+        valid, invalid = results[name]
+        print(
+            f"{name:>10}: {elapsed:8.2f} s, {rows / elapsed:12.0f} rows/s, "
+            f"valid={valid} invalid={invalid}"
+        )
+    assert results["per-row"] == results["vectorized"], results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--invalid-share", type=float, default=0.001)
+    parser.add_argument("--chunk-size", type=int, default=settings.BULK_CHUNK_SIZE)
+    args = parser.parse_args()
+    main(args.rows, args.invalid_share, args.chunk_size)
@@ -0,0 +1,65 @@
+"""Чтение списков через ORM (find_all) против Core (find_rows).
+
+Нужна база с данными. Запуск:
+python -m benchmarks.bench_list_read --table sales --limit 100000
+"""
+import argparse
+import asyncio
+import time
+
+from pydantic import TypeAdapter
+
+import app.main  # noqa: F401 регистрирует все модели
+from app.customers.dao import CustomerDAO
+from app.customers.schemas import SCustomer
+from app.database import close_engine
+from app.products.dao import ProductDAO
+from app.products.schemas import SProduct
+from app.sales.dao import SaleDAO
+from app.sales.schemas import SSale
+
+TABLES = {
+    "sales": (SaleDAO, SSale),
+    "customers": (CustomerDAO, SCustomer),
+    "products": (ProductDAO, SProduct),
+}
+
+
+async def measure(read, adapter: TypeAdapter, limit: int) -> tuple[int, float, float]:
+    started = time.perf_counter()
+    rows = await read(limit=limit)
+    fetched = time.perf_counter()
+    adapter.dump_json(adapter.validate_python(rows))
+    serialized = time.perf_counter()
+    return len(rows), fetched - started, serialized - fetched
+
+
+async def main(table: str, limit: int, repeat: int):
+    dao, schema = TABLES[table]
+    adapter = TypeAdapter(list[schema])
+    paths = (("orm", dao.find_all), ("core", dao.find_rows))
+
+    print(f"table={table} limit={limit} repeat={repeat}")
+    for name, read in paths:
+        # Первый прогон прогревает пул соединений и кеш планов
+        await measure(read, adapter, limit)
+        best_fetch = best_total = float("inf")
+        for _ in range(repeat):
+            count, fetch, serialize = await measure(read, adapter, limit)
+            best_fetch = min(best_fetch, fetch)
+            best_total = min(best_total, fetch + serialize)
+        print(
+            f"{name:>5}: rows={count} "
+            f"fetch {count / best_fetch:10.0f} rows/s, "
+            f"fetch+serialize {count / best_total:10.0f} rows/s"
+        )
+    await close_engine()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--table", choices=sorted(TABLES), default="sales")
+    parser.add_argument("--limit", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.table, args.limit, args.repeat))
@@ -0,0 +1,96 @@
+"""Отсечение секций sales против той же выборки из несекционированной копии.
+
+Данные засеваются в транзакции и откатываются в конце. Нужна база
+с применёнными миграциями. Запуск:
+python -m benchmarks.bench_partition_pruning --rows 2000000 --years 5
+"""
+import argparse
+import asyncio
+import time
+from datetime import date
+
+from app.database import async_session_maker, close_engine
+from app.sales.partitions import add_months, ensure_sales_partitions
+
+SEED = """
+INSERT INTO {table} (branch, city, customer_type, customer_id, sale_date)
+SELECT 'branch' || i % 50, 'city' || i % 1000, 'Member', NULL,
+    date '{first}' + i % {days}
+FROM generate_series(1, {rows}) AS i
+"""
+
+# Типичные аналитические выборки за месяц: агрегат и фильтр с сортировкой
+QUERIES = {
+    "month aggregate": (
+        "SELECT count(*), count(DISTINCT city) FROM {table} "
+        "WHERE sale_date >= '{start}' AND sale_date < '{end}'"
+    ),
+    "month by city": (
+        "SELECT id, sale_date FROM {table} "
+        "WHERE sale_date >= '{start}' AND sale_date < '{end}' AND city = 'city7' "
+        "ORDER BY id LIMIT 100"
+    ),
+}
+
+
+async def best_time(connection, sql: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await connection.exec_driver_sql(sql)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+async def main(rows: int, years: int, repeat: int):
+    first = date(2015, 1, 1)
+    months = [add_months(first, offset) for offset in range(years * 12)]
+    days = (add_months(first, years * 12) - first).days
+    month = months[len(months) // 2]
+    bounds = {"start": month, "end": add_months(month, 1)}
+
+    async with async_session_maker() as session:
+        connection = await session.connection()
+        try:
+            await ensure_sales_partitions(session, months)
+            await connection.exec_driver_sql(
+                "CREATE TEMP TABLE sales_flat (LIKE sales INCLUDING ALL)"
+            )
+            for table in ("sales", "sales_flat"):
+                await connection.exec_driver_sql(SEED.format(
+                    table=table, first=first, days=days, rows=rows
+                ))
+                await connection.exec_driver_sql(f"ANALYZE {table}")
+
+            print(f"rows={rows} years={years} month={month:%Y-%m} repeat={repeat}")
+            for name, template in QUERIES.items():
+                timings = {}
+                for table in ("sales_flat", "sales"):
+                    sql = template.format(table=table, **bounds)
+                    await connection.exec_driver_sql(sql)
+                    timings[table] = await best_time(connection, sql, repeat)
+                result = await connection.exec_driver_sql(
+                    "EXPLAIN " + template.format(table="sales", **bounds)
+                )
+                scanned = {
+                    line.split(" on ")[1].split()[0]
+                    for (line,) in result.all()
+                    if " on sales_" in line
+                }
+                print(
+                    f"{name:>20}: flat {timings['sales_flat'] * 1000:8.1f} ms, "
+                    f"partitioned {timings['sales'] * 1000:8.1f} ms, "
+                    f"partitions scanned {len(scanned)} of {len(months)}"
+                )
+        finally:
+            await session.rollback()
+    await close_engine()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.years, args.repeat))
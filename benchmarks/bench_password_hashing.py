@@ -0,0 +1,92 @@
+"""Пропускная способность проверки паролей и задержка event loop.
+
+Запуск: python -m benchmarks.bench_password_hashing --logins 200
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from app.exceptions import PasswordHashingBusyException
+from app.users.auth import (
+    get_password_hash,
+    verify_password,
+    verify_password_async,
+)
+from app.config import settings
+
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.005) -> float:
+    loop = asyncio.get_running_loop()
+    worst = 0.0
+    while not stop.is_set():
+        started = loop.time()
+        await asyncio.sleep(interval)
+        worst = max(worst, loop.time() - started - interval)
+    return worst
+
+
+# Вход сверх ёмкости пула получает 503, как клиент API. Такой вход
+# засчитывается отклонённым один раз и повторяется, пока не пройдёт:
+# в пропускную способность входят все
+async def run_burst(
+    logins: int,
+    hashed: str,
+    offload: bool,
+    retry_delay: float = 0.01
+) -> tuple[float, float, int]:
+    rejected = 0
+
+    async def login():
+        nonlocal rejected
+        if not offload:
+            return verify_password("password", hashed)
+        busy = False
+        while True:
+            try:
+                return await verify_password_async("password", hashed)
+            except PasswordHashingBusyException:
+                if not busy:
+                    busy = True
+                    rejected += 1
+                await asyncio.sleep(retry_delay)
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+    await asyncio.sleep(0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[login() for _ in range(logins)])
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    return elapsed, await lag_task, rejected
+
+
+async def main(logins: int):
+    hashed = get_password_hash("password")
+    cores = min(settings.PASSWORD_HASH_WORKERS, os.cpu_count() or 1)
+
+    capacity = settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE_SIZE
+    print(
+        f"logins={logins} workers={settings.PASSWORD_HASH_WORKERS} "
+        f"capacity={capacity} cores={cores}"
+    )
+    for offload in (False, True):
+        elapsed, lag, rejected = await run_burst(logins, hashed, offload)
+        rate = logins / elapsed
+        mode = "executor" if offload else "inline"
+        used_cores = cores if offload else 1
+        print(
+            f"{mode:>8}: {rate:8.1f} logins/s, "
+            f"{rate / used_cores:8.1f} logins/s per core, "
+            f"max loop lag {lag * 1000:8.1f} ms, "
+            f"rejected (503) {rejected}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins))
@@ -0,0 +1,109 @@
+"""Помесячная выручка по сырым продажам против дневных итогов.
+
+Данные засеваются в транзакции и откатываются в конце. Нужна база
+с применёнными миграциями. Запуск:
+python -m benchmarks.bench_rollup --rows 1000000 --years 3
+"""
+import argparse
+import asyncio
+import time
+from datetime import date
+
+from sqlalchemy import insert
+
+import app.main  # noqa: F401 регистрирует все модели
+from app.analytics.models import DailySalesRollup
+from app.analytics.rollup import ROLLUP_COLUMNS, rollup_query
+from app.database import async_session_maker, close_engine
+from app.sales.partitions import add_months, ensure_sales_partitions
+
+SEED = [
+    """
+    INSERT INTO products (product_name, product_category, unit_price)
+    SELECT 'bench' || i, 'category' || i % 20, i % 100 + 1
+    FROM generate_series(1, 1000) AS i
+    """,
+    """
+    INSERT INTO sales (branch, city, customer_type, customer_id, sale_date)
+    SELECT 'branch' || i % 10, 'city' || i % 30, 'Member', NULL,
+        date '{first}' + i % {days}
+    FROM generate_series(1, {rows}) AS i
+    """,
+    """
+    INSERT INTO saledetailss (sale_id, product_id, quantity, sale_date)
+    SELECT sales.id, top.id - (sales.id * 7 + line) % 1000, line, sales.sale_date
+    FROM (SELECT id, sale_date FROM sales ORDER BY id DESC LIMIT {rows}) AS sales,
+        (SELECT max(id) AS id FROM products) AS top,
+        generate_series(1, 3) AS line
+    """,
+]
+
+QUERIES = {
+    "raw": """
+        SELECT date_trunc('month', s.sale_date), sum(p.unit_price * d.quantity),
+            count(DISTINCT s.id), sum(d.quantity)
+        FROM sales AS s
+        JOIN saledetailss AS d ON d.sale_id = s.id AND d.sale_date = s.sale_date
+        JOIN products AS p ON p.id = d.product_id
+        WHERE s.sale_date BETWEEN '{start}' AND '{end}' AND s.city = 'city7'
+        GROUP BY 1
+    """,
+    "rollup": """
+        SELECT date_trunc('month', sale_date), sum(revenue), sum(order_share),
+            sum(units)
+        FROM daily_sales_rollup
+        WHERE sale_date BETWEEN '{start}' AND '{end}' AND city = 'city7'
+        GROUP BY 1
+    """,
+}
+
+
+async def best_time(connection, sql: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await connection.exec_driver_sql(sql)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+async def main(rows: int, years: int, repeat: int):
+    first = date(2015, 1, 1)
+    months = [add_months(first, offset) for offset in range(years * 12)]
+    last = add_months(first, years * 12)
+    bounds = {"start": first, "end": last}
+
+    async with async_session_maker() as session:
+        connection = await session.connection()
+        try:
+            await ensure_sales_partitions(session, months)
+            for statement in SEED:
+                await connection.exec_driver_sql(statement.format(
+                    first=first, days=(last - first).days, rows=rows
+                ))
+            started = time.perf_counter()
+            await session.execute(
+                insert(DailySalesRollup).from_select(ROLLUP_COLUMNS, rollup_query())
+            )
+            built = time.perf_counter() - started
+            for table in ("sales", "saledetailss", "products", "daily_sales_rollup"):
+                await connection.exec_driver_sql(f"ANALYZE {table}")
+
+            print(f"rows={rows} years={years} repeat={repeat} build={built:.1f} s")
+            for name, template in QUERIES.items():
+                sql = template.format(**bounds)
+                await connection.exec_driver_sql(sql)
+                timing = await best_time(connection, sql, repeat)
+                print(f"{name:>8}: {timing * 1000:8.1f} ms")
+        finally:
+            await session.rollback()
+    await close_engine()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.years, args.repeat))
@@ -14,6 +14,20 @@ from app.main import app  # noqa E402
 fake = Faker()
 
 
+# Списки отдаются страницами: обходит их по X-Next-Cursor
+async def fetch_all(async_client: AsyncClient, url: str) -> list[dict]:
+    rows = []
+    params = {"limit": 1000}
+    while True:
+        response = await async_client.get(url, params=params)
+        assert response.status_code == 200
+        rows.extend(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return rows
+        params = {"limit": 1000, "after": cursor}
+
+
 @pytest_asyncio.fixture()
 async def fake_super_token():
     from tests.test_auth import test_auth_login
@@ -0,0 +1,46 @@
+import pytest
+from httpx import AsyncClient
+
+from app.analytics.views import MATERIALIZED_VIEWS, refresh_view
+
+
+@pytest.mark.asyncio
+async def test_get_customer_spend_no_auth():
+    async with AsyncClient(base_url="http://127.0.0.1:8000") as async_client:
+        response = await async_client.get("/analytics/customer_spend")
+    assert response.status_code == 307
+
+
+@pytest.mark.asyncio
+async def test_get_views_freshness(fake_super_token):
+    async with AsyncClient(
+        base_url="http://127.0.0.1:8000",
+        cookies={"users_access_token": fake_super_token}
+    ) as async_client:
+        response = await async_client.get("/analytics/views")
+    assert response.status_code == 200
+    assert {row["view_name"] for row in response.json()} == set(MATERIALIZED_VIEWS)
+
+
+@pytest.mark.asyncio
+async def test_get_branch_month(fake_super_token, setup_database):
+    async with AsyncClient(
+        base_url="http://127.0.0.1:8000",
+        cookies={"users_access_token": fake_super_token}
+    ) as async_client:
+        response = await async_client.get(
+            "/analytics/branch_month",
+            params={"limit": 1, "fields": "revenue"}
+        )
+    assert response.status_code == 200
+    rows = response.json()
+    assert len(rows) <= 1
+    for row in rows:
+        assert set(row) == {"branch", "month", "revenue"}
+    assert "X-Refreshed-At" in response.headers
+
+
+@pytest.mark.asyncio
+async def test_refresh_view_skips_fresh_view():
+    assert await refresh_view("mv_branch_month", force=True)
+    assert not await refresh_view("mv_branch_month")
@@ -3,6 +3,8 @@ from httpx import AsyncClient
 from faker import Faker
 from fastapi.logger import logger
 
+from tests.conftest import fetch_all
+
 fake = Faker()
 
 
@@ -241,9 +243,7 @@ async def test_get_user_by_id(fake_super_token, setup_database):
         base_url="http://127.0.0.1:8000",
         cookies={"users_access_token": fake_super_token}
     ) as async_client:
-        response = await async_client.get("/users/")
-        assert response.status_code == 200
-        users = response.json()
+        users = await fetch_all(async_client, "/users/")
 
         max_user_id = max(user['id'] for user in users)
 
@@ -284,9 +284,7 @@ async def test_upd_user_by_id(fake_super_token, setup_database):
         base_url="http://127.0.0.1:8000",
         cookies={"users_access_token": fake_super_token}
     ) as async_client:
-        response = await async_client.get("/users/")
-        assert response.status_code == 200
-        users = response.json()
+        users = await fetch_all(async_client, "/users/")
 
         max_user_id = max(user['id'] for user in users)
 
@@ -351,9 +349,7 @@ async def test_delete_user_by_id(fake_super_token, setup_database):
         base_url="http://127.0.0.1:8000",
         cookies={"users_access_token": fake_super_token}
     ) as async_client:
-        response = await async_client.get("/users/")
-        assert response.status_code == 200
-        users = response.json()
+        users = await fetch_all(async_client, "/users/")
 
         max_user_id = max(user['id'] for user in users)
 
@@ -416,3 +412,73 @@ async def test_download_csv(fake_super_token):
         in response.headers["Content-Disposition"]
     )
     assert isinstance(response.content, bytes)
+
+
+@pytest.mark.asyncio
+async def test_role_change_applies_to_cached_user(fake_super_token):
+    email = fake.email()
+    async with AsyncClient(base_url="http://127.0.0.1:8000") as async_client:
+        response = await async_client.post("/auth/register", json={
+            "phone_number": fake.phone_number(),
+            "email": email,
+            "first_name": "Cache",
+            "last_name": "Check",
+            "password": "root3"
+        })
+        assert response.status_code == 200
+
+        response = await async_client.post(
+            "/auth/login",
+            json={"email": email, "password": "root3"}
+        )
+        user_cookies = {"users_access_token": response.cookies["users_access_token"]}
+
+        response = await async_client.get("/sales/", cookies=user_cookies)
+        assert response.status_code == 403
+
+        response = await async_client.put(
+            "/users/update_by_filter/",
+            params={"email": email, "is_analyst_new": True},
+            cookies={"users_access_token": fake_super_token}
+        )
+        assert response.status_code == 200
+
+        response = await async_client.get("/sales/", cookies=user_cookies)
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_update_and_delete_user(fake_super_token):
+    email = fake.unique.email()
+    async with AsyncClient(
+        base_url="http://127.0.0.1:8000",
+        cookies={"users_access_token": fake_super_token}
+    ) as async_client:
+        response = await async_client.post("/users/add/", json={
+            'phone_number': fake.phone_number(),
+            'email': email,
+            'first_name': fake.first_name(),
+            'last_name': fake.last_name(),
+            'password': "root2"
+        })
+        assert response.status_code == 200
+        response = await async_client.get("/users/", params={"email": email})
+        assert response.status_code == 200
+        [user] = response.json()
+
+        response = await async_client.put(
+            f"/users/update_by_id/{user['id']}",
+            params={"first_name_new": "Updated"}
+        )
+        assert response.status_code == 200
+        assert response.json()["message"] == (
+            f"Пользователь {user['id']} успешно обновлен!"
+        )
+        response = await async_client.get(f"/users/{user['id']}")
+        assert response.json()["first_name"] == "Updated"
+
+        response = await async_client.delete(f"/users/delete/{user['id']}")
+        assert response.status_code == 200
+        assert response.json()["message"] == f"Пользователь с {user['id']} удалён!"
+        response = await async_client.get(f"/users/{user['id']}")
+    assert response.status_code == 404
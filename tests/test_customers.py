@@ -1,3 +1,4 @@
+import asyncio
 import pytest
 from httpx import AsyncClient
 from faker import Faker
@@ -298,3 +299,92 @@ async def test_download_csv(fake_super_token):
         in response.headers["Content-Disposition"]
     )
     assert isinstance(response.content, bytes)
+
+
+@pytest.mark.asyncio
+async def test_get_csv_concurrent(fake_super_token):
+    async with AsyncClient(
+        base_url="http://127.0.0.1:8000",
+        cookies={"users_access_token": fake_super_token}
+    ) as async_client:
+        responses = await asyncio.gather(*[
+            async_client.get("/customers/get_csv/")
+            for _ in range(10)
+        ])
+    assert all(response.status_code == 200 for response in responses)
+    assert len({response.text for response in responses}) == 1
+
+
+@pytest.mark.asyncio
+async def test_bulk_insert_upsert(fake_super_token):
+    email = fake.unique.email()
+    phone_number = fake.unique.phone_number()
+    header = b"first_name,last_name,date_of_birth,email,phone_number,gender\n"
+    first = f"John,Doe,1990-01-01,{email},{phone_number},Male\n".encode()
+    second = f"John,Smith,1990-01-01,{email},{phone_number},Male\n".encode()
+    async with AsyncClient(
+        base_url="http://127.0.0.1:8000",
+        cookies={"users_access_token": fake_super_token}
+    ) as async_client:
+        response = await async_client.post(
+            "/customers/bulk_insert/",
+            params={"mode": "upsert"},
+            files={"file": ("test.csv", header + first, "text/csv")}
+        )
+        assert response.status_code == 200
+        assert response.json()["inserted"] == 1
+
+        response = await async_client.post(
+            "/customers/bulk_insert/",
+            params={"mode": "upsert"},
+            files={"file": ("test.csv", header + second, "text/csv")}
+        )
+        assert response.status_code == 200
+        assert response.json()["inserted"] == 0
+        assert response.json()["updated"] == 1
+
+        response = await async_client.post(
+            "/customers/bulk_insert/",
+            params={"mode": "ignore"},
+            files={"file": ("test.csv", header + first, "text/csv")}
+        )
+        assert response.status_code == 200
+        assert response.json()["skipped"] == 1
+
+        response = await async_client.get("/customers/", params={"email": email})
+    assert response.json()[0]["last_name"] == "Smith"
+
+
+@pytest.mark.asyncio
+async def test_bulk_insert_upsert_conflicts(fake_super_token):
+    email = fake.unique.email()
+    phone_number = fake.unique.phone_number()
+    header = b"first_name,last_name,date_of_birth,email,phone_number,gender\n"
+    first = f"John,Doe,1990-01-01,{email},{phone_number},Male\n".encode()
+    # Другой email с занятым телефоном: конфликт не по upsert_keys
+    taken_phone = (
+        f"Jane,Doe,1990-01-01,{fake.unique.email()},{phone_number},Female\n"
+    ).encode()
+    async with AsyncClient(
+        base_url="http://127.0.0.1:8000",
+        cookies={"users_access_token": fake_super_token}
+    ) as async_client:
+        response = await async_client.post(
+            "/customers/bulk_insert/",
+            params={"mode": "upsert"},
+            files={"file": ("test.csv", header + first + first, "text/csv")}
+        )
+        assert response.status_code == 200
+        assert response.json()["inserted"] == 1
+        assert response.json()["duplicates"] == 1
+        assert response.json()["skipped"] == 0
+
+        response = await async_client.post(
+            "/customers/bulk_insert/",
+            params={"mode": "upsert"},
+            files={"file": ("test.csv", header + taken_phone, "text/csv")}
+        )
+    assert response.status_code == 200
+    assert response.json()["inserted"] == 0
+    assert response.json()["duplicates"] == 0
+    assert response.json()["skipped"] == 1
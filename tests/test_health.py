@@ -8,3 +8,9 @@ def test_health_check():
     response = client.get("/")
     assert response.status_code == 200
     assert response.json() == {"message": "Привет мир API!"}
+
+
+def test_health_check_with_lifespan():
+    with TestClient(app) as lifespan_client:
+        response = lifespan_client.get("/")
+    assert response.status_code == 200
@@ -0,0 +1,195 @@
+from datetime import date, datetime, timedelta
+
+import re
+
+import pytest
+from sqlalchemy import select
+
+from app import database
+from app.customers.dao import CustomerDAO
+from app.dao.filters import parse_filters
+from app.products.dao import ProductDAO
+from app.sales.partitions import add_months, ensure_sales_partitions
+from app.saledetails.dao import SaleDetailsDAO
+from app.sales.dao import SaleDAO
+from app.users.dao import UsersDAO
+
+ROWS = 500_000
+
+# Данные вставляются в транзакции теста и откатываются после проверки планов
+SEED = [
+    f"""
+    INSERT INTO customers (
+        first_name, last_name, date_of_birth, email, phone_number, gender,
+        created_at, updated_at
+    )
+    SELECT
+        'First', 'Last', date '1950-01-01' + i % 20000,
+        'index' || i || '@example.com', '+index' || i,
+        CASE WHEN i % 2 = 0 THEN 'Male' ELSE 'Female' END,
+        now() - i * interval '1 minute', now() - i * interval '1 minute'
+    FROM generate_series(1, {ROWS // 10}) AS i
+    """,
+    f"""
+    INSERT INTO products (
+        product_name, product_description, product_category, unit_price,
+        created_at, updated_at
+    )
+    SELECT
+        'product' || i, NULL, 'category' || i % 500, i % 1000,
+        now() - i * interval '1 minute', now() - i * interval '1 minute'
+    FROM generate_series(1, {ROWS // 10}) AS i
+    """,
+    f"""
+    INSERT INTO users (
+        phone_number, email, first_name, last_name, password,
+        created_at, updated_at
+    )
+    SELECT
+        '+index' || i, 'index' || i || '@example.com', 'First', 'Last', 'hash',
+        now() - i * interval '1 minute', now() - i * interval '1 minute'
+    FROM generate_series(1, {ROWS // 10}) AS i
+    """,
+    f"""
+    INSERT INTO sales (
+        branch, city, customer_type, customer_id, sale_date,
+        created_at, updated_at
+    )
+    SELECT
+        'branch' || i % 50, 'city' || i % 1000, 'Member',
+        top.id - i % {ROWS // 10}, date '2020-01-01' + i % 120,
+        now() - i * interval '1 minute', now() - i * interval '1 minute'
+    FROM generate_series(1, {ROWS}) AS i,
+        (SELECT max(id) AS id FROM customers) AS top
+    """,
+    f"""
+    INSERT INTO saledetailss (
+        sale_id, product_id, quantity, sale_date, created_at, updated_at
+    )
+    SELECT sales.id, top.id - sales.id % {ROWS // 10}, 1, sales.sale_date,
+        sales.created_at, sales.updated_at
+    FROM (SELECT id, sale_date, created_at, updated_at FROM sales ORDER BY id DESC
+        LIMIT {ROWS}) AS sales,
+        (SELECT max(id) AS id FROM products) AS top
+    """,
+]
+
+TABLES = ("customers", "products", "users", "sales", "saledetailss")
+# Продажи ложатся в несколько крупных секций: BRIN полезен только
+# на секциях, заметно больших своего диапазона страниц
+SEED_MONTHS = [add_months(date(2020, 1, 1), offset) for offset in range(4)]
+# Пустые секции планировщик законно читает Seq Scan, поэтому проверяются
+# только таблицы и секции с данными
+LARGE_TABLE_ROWS = 1000
+
+
+def finder_queries() -> dict:
+    now = datetime.now()
+    recent = {"start_time": now - timedelta(minutes=100), "end_time": now}
+    older = {
+        "start_time": now - timedelta(days=30),
+        "end_time": now - timedelta(days=30) + timedelta(minutes=100),
+    }
+    queries = {}
+    for dao in (CustomerDAO, ProductDAO, UsersDAO, SaleDAO, SaleDetailsDAO):
+        table = dao.model.__tablename__
+        columns = select(*dao.select_columns())
+        queries[f"{table} created_at"] = dao._list_query(
+            columns, param="created_at", **recent
+        )
+        queries[f"{table} updated_at"] = dao._list_query(
+            columns, param="updated_at", **older
+        )
+        queries[f"{table} page"] = dao._list_query(columns, limit=50)
+    queries.update({
+        "customers by id": select(CustomerDAO.model).filter_by(id=1),
+        "customers by email": select(CustomerDAO.model).filter_by(
+            email="index1@example.com"
+        ),
+        "customers date_of_birth": CustomerDAO._list_query(
+            select(*CustomerDAO.select_columns()),
+            start_time=date(1960, 1, 1),
+            end_time=date(1960, 1, 2),
+            param="date_of_birth"
+        ),
+        "products category": ProductDAO._list_query(
+            select(*ProductDAO.select_columns()),
+            product_category="category7"
+        ),
+        "products prefix": ProductDAO._list_query(
+            select(*ProductDAO.select_columns()),
+            filters=parse_filters(["product_name:prefix:product1999"])
+        ),
+        "sales customer_id": SaleDAO._list_query(
+            select(*SaleDAO.select_columns()),
+            customer_id=1
+        ),
+        "sales city": SaleDAO._list_query(
+            select(*SaleDAO.select_columns()),
+            city="city7"
+        ),
+        "sales branch city": SaleDAO._list_query(
+            select(*SaleDAO.select_columns()),
+            branch="branch7",
+            city="city7"
+        ),
+        "sales sale_date": SaleDAO._list_query(
+            select(*SaleDAO.select_columns()),
+            start_time=date(2020, 2, 1),
+            end_time=date(2020, 2, 1),
+            param="sale_date"
+        ),
+        "saledetails sale_id": SaleDetailsDAO._list_query(
+            select(*SaleDetailsDAO.select_columns()),
+            sale_id=1
+        ),
+        "saledetails product_id": SaleDetailsDAO._list_query(
+            select(*SaleDetailsDAO.select_columns()),
+            product_id=1
+        ),
+    })
+    return queries
+
+
+@pytest.mark.asyncio
+async def test_finders_use_indexes():
+    seq_scans = {}
+    async with database.async_session_maker() as session:
+        connection = await session.connection()
+        try:
+            await ensure_sales_partitions(session, SEED_MONTHS)
+            for statement in SEED:
+                await connection.exec_driver_sql(statement)
+            for table in TABLES:
+                await connection.exec_driver_sql(f"ANALYZE {table}")
+            # BRIN на секционированной таблице — набор индексов секций
+            result = await connection.exec_driver_sql(
+                "SELECT i.relname FROM pg_index x "
+                "JOIN pg_class i ON i.oid = x.indexrelid "
+                "JOIN pg_am am ON am.oid = i.relam "
+                "WHERE am.amname = 'brin' AND i.relkind = 'i'"
+            )
+            for (index,) in result.all():
+                await connection.exec_driver_sql(
+                    f"SELECT brin_summarize_new_values('{index}')"
+                )
+            result = await connection.exec_driver_sql(
+                f"SELECT relname FROM pg_class "
+                f"WHERE relkind = 'r' AND reltuples > {LARGE_TABLE_ROWS}"
+            )
+            large_tables = {relname for (relname,) in result.all()}
+
+            for name, query in finder_queries().items():
+                sql = query.compile(
+                    dialect=connection.dialect,
+                    compile_kwargs={"literal_binds": True}
+                )
+                result = await connection.exec_driver_sql(f"EXPLAIN {sql}")
+                plan = "\n".join(row[0] for row in result)
+                scanned = set(re.findall(r"Seq Scan on (\w+)", plan))
+                if scanned & large_tables:
+                    seq_scans[name] = plan
+        finally:
+            await session.rollback()
+
+    assert not seq_scans, seq_scans
@@ -0,0 +1,24 @@
+import pytest
+from httpx import AsyncClient
+
+
+@pytest.mark.asyncio
+async def test_pool_metrics_no_auth():
+    async with AsyncClient(base_url="http://127.0.0.1:8000") as async_client:
+        response = await async_client.get("/metrics/pools")
+    assert response.status_code == 307
+
+
+@pytest.mark.asyncio
+async def test_pool_metrics(fake_super_token):
+    async with AsyncClient(
+        base_url="http://127.0.0.1:8000",
+        cookies={"users_access_token": fake_super_token}
+    ) as async_client:
+        await async_client.get("/sales/download_csv/")
+        response = await async_client.get("/metrics/pools")
+    assert response.status_code == 200
+    pools = {pool["workload"]: pool for pool in response.json() if not pool["replica"]}
+    assert {"oltp", "analytics", "bulk"} <= set(pools)
+    for pool in pools.values():
+        assert 0 <= pool["saturation"] <= 1
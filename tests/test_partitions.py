@@ -0,0 +1,49 @@
+import re
+from datetime import date
+
+import pytest
+from sqlalchemy import func, select
+
+from app import database
+from app.sales.dao import SaleDAO
+from app.sales.partitions import ensure_sales_partitions, partition_name
+
+
+@pytest.mark.asyncio
+async def test_missing_month_gets_partitions():
+    month = date(1990, 3, 1)
+    async with database.async_session_maker() as session:
+        try:
+            await ensure_sales_partitions(session, [date(1990, 3, 17)])
+            for table in ("sales", "saledetailss"):
+                name = partition_name(table, month)
+                with database.primary_reads():
+                    exists = await session.scalar(select(func.to_regclass(name)))
+                assert exists is not None
+        finally:
+            await session.rollback()
+
+
+@pytest.mark.asyncio
+async def test_sale_date_range_prunes_partitions():
+    months = [date(1990, 3, 1), date(1990, 4, 1), date(1990, 5, 1)]
+    async with database.async_session_maker() as session:
+        connection = await session.connection()
+        try:
+            await ensure_sales_partitions(session, months)
+            query = SaleDAO._list_query(
+                select(*SaleDAO.select_columns()),
+                start_time=date(1990, 4, 1),
+                end_time=date(1990, 4, 30),
+                param="sale_date"
+            )
+            sql = query.compile(
+                dialect=connection.dialect,
+                compile_kwargs={"literal_binds": True}
+            )
+            result = await connection.exec_driver_sql(f"EXPLAIN {sql}")
+            plan = "\n".join(row[0] for row in result)
+        finally:
+            await session.rollback()
+
+    assert set(re.findall(r" on (sales_\d{4}_\d{2})", plan)) == {"sales_1990_04"}
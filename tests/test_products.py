@@ -4,6 +4,8 @@ from faker import Faker
 import random
 from fastapi.logger import logger
 
+from tests.conftest import fetch_all
+
 fake = Faker()
 
 
@@ -122,6 +124,42 @@ async def test_get_all_products(fake_super_token):
     assert isinstance(response.json(), list)
 
 
+@pytest.mark.asyncio
+async def test_get_all_products_filters(fake_super_token, setup_database):
+    async with AsyncClient(
+        base_url="http://127.0.0.1:8000",
+        cookies={"users_access_token": fake_super_token}
+    ) as async_client:
+        response = await async_client.get(
+            "/products/",
+            params={
+                "filters": [
+                    "unit_price:gte:10",
+                    "unit_price:lt:100",
+                    "product_category:in:Electronics,Books",
+                ]
+            }
+        )
+    assert response.status_code == 200
+    for product in response.json():
+        assert 10 <= product["unit_price"] < 100
+        assert product["product_category"] in ("Electronics", "Books")
+
+
+@pytest.mark.asyncio
+async def test_get_all_products_bad_filter(fake_super_token):
+    async with AsyncClient(
+        base_url="http://127.0.0.1:8000",
+        cookies={"users_access_token": fake_super_token}
+    ) as async_client:
+        for condition in ("unit_price:between:1", "id:prefix:1", "unit_price:gt:abc"):
+            response = await async_client.get(
+                "/products/",
+                params={"filters": condition}
+            )
+            assert response.status_code == 422
+
+
 @pytest.mark.asyncio
 async def test_add_product(fake_super_token):
     categories = ['Electronics', 'Clothing', 'Books', 'Toys', 'Groceries']
@@ -225,9 +263,7 @@ async def test_delete_product_by_id(fake_super_token, setup_database):
         base_url="http://127.0.0.1:8000",
         cookies={"users_access_token": fake_super_token}
     ) as async_client:
-        response = await async_client.get("/products/")
-        assert response.status_code == 200
-        products = response.json()
+        products = await fetch_all(async_client, "/products/")
 
         max_product_id = max(product['id'] for product in products)
 
@@ -285,3 +321,74 @@ async def test_download_csv(fake_super_token):
         in response.headers["Content-Disposition"]
     )
     assert isinstance(response.content, bytes)
+
+
+@pytest.mark.asyncio
+async def test_get_csv_sees_new_product(fake_super_token):
+    product_name = f"Cache check {fake.uuid4()}"
+    async with AsyncClient(
+        base_url="http://127.0.0.1:8000",
+        cookies={"users_access_token": fake_super_token}
+    ) as async_client:
+        response = await async_client.get("/products/get_csv/")
+        assert response.status_code == 200
+        assert product_name not in response.text
+
+        response = await async_client.post("/products/add/", json={
+            'product_name': product_name,
+            'product_description': fake.text(),
+            'product_category': fake.word(),
+            'unit_price': 10.0,
+        })
+        assert response.status_code == 200
+
+        response = await async_client.get("/products/get_csv/")
+    assert response.status_code == 200
+    assert product_name in response.text
+
+
+@pytest.mark.asyncio
+async def test_bulk_insert_copy(fake_super_token):
+    test_data = (
+        b"product_name,product_description,product_category,unit_price\n"
+        b"Product C,Desc C,Category X,10\n"
+        b"Product D,Desc D,Category Y,49.50\n"
+    )
+    file = {"file": ("test.csv", test_data, "text/csv")}
+    async with AsyncClient(
+        base_url="http://127.0.0.1:8000",
+        cookies={"users_access_token": fake_super_token}
+    ) as async_client:
+        response = await async_client.post(
+            "/products/bulk_insert/",
+            params={"mode": "copy"},
+            files=file
+        )
+    assert response.status_code == 200
+    assert response.json()["message"] == "Продукты успешно добавлены!"
+
+
+@pytest.mark.asyncio
+async def test_bulk_insert_invalid_rows(fake_super_token):
+    test_data = (
+        b"product_name,product_description,product_category,unit_price\n"
+        b"Product E,Desc E,Category X,10\n"
+        b"Product F,Desc F,Category Y,not_a_price\n"
+        b"Product G,Desc G,Category Z,12\n"
+        b"Product H,Desc H,Category Z,abc\n"
+    )
+    file = {"file": ("test.csv", test_data, "text/csv")}
+    async with AsyncClient(
+        base_url="http://127.0.0.1:8000",
+        cookies={"users_access_token": fake_super_token}
+    ) as async_client:
+        response = await async_client.post("/products/bulk_insert/", files=file)
+        assert response.status_code == 422
+        detail = response.json()["detail"]
+        assert detail["errors_count"] == 2
+        assert [error["line"] for error in detail["errors"]] == [3, 5]
+
+        response = await async_client.get(
+            "/products/", params={"product_name": "Product E"}
+        )
+    assert response.json() == []
@@ -0,0 +1,98 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from app import database
+from app.analytics.models import DailySalesRollup
+from app.analytics.rollup import RollupChange
+from app.sales.partitions import ensure_sales_partitions
+
+DAY = date(1990, 6, 1)
+
+
+async def insert_returning(connection, sql: str) -> list[int]:
+    result = await connection.exec_driver_sql(sql)
+    return [row[0] for row in result.all()]
+
+
+async def rollup_rows(session) -> dict:
+    result = await session.execute(
+        select(
+            DailySalesRollup.product_category,
+            DailySalesRollup.revenue,
+            DailySalesRollup.units,
+            DailySalesRollup.orders,
+            DailySalesRollup.order_share,
+        ).filter_by(sale_date=DAY, branch="rollup")
+    )
+    return {
+        category: (float(revenue), units, orders, order_share)
+        for category, revenue, units, orders, order_share in result.all()
+    }
+
+
+@pytest.mark.asyncio
+async def test_rollup_change():
+    async with database.async_session_maker() as session:
+        connection = await session.connection()
+        try:
+            await ensure_sales_partitions(session, [DAY])
+            product_a, product_b = await insert_returning(
+                connection,
+                "INSERT INTO products (product_name, product_category, unit_price) "
+                "VALUES ('rollup a', 'rollup-a', 10), ('rollup b', 'rollup-b', 5) "
+                "RETURNING id"
+            )
+            first, second = await insert_returning(
+                connection,
+                "INSERT INTO sales (branch, city, customer_type, sale_date) "
+                f"VALUES ('rollup', 'rollup', 'Member', '{DAY}'), "
+                f"('rollup', 'rollup', 'Member', '{DAY}') RETURNING id"
+            )
+
+            change = RollupChange()
+            await change.track(session, [(first, DAY), (second, DAY)])
+            await connection.exec_driver_sql(
+                "INSERT INTO saledetailss (sale_id, product_id, quantity, sale_date) "
+                f"VALUES ({first}, {product_a}, 2, '{DAY}'), "
+                f"({first}, {product_b}, 1, '{DAY}'), "
+                f"({second}, {product_b}, 3, '{DAY}')"
+            )
+            await change.apply(session)
+            rows = await rollup_rows(session)
+            assert rows == {
+                "rollup-a": (20.0, 2, 1, 1),
+                "rollup-b": (20.0, 4, 2, 1),
+            }
+            # Каждая продажа засчитана одной категории
+            assert sum(row[3] for row in rows.values()) == 2
+
+            # Удаление позиций вычитает вклад продажи
+            change = RollupChange()
+            await change.track(session, [(second, DAY)])
+            await connection.exec_driver_sql(
+                f"DELETE FROM saledetailss WHERE sale_id = {second}"
+            )
+            await change.apply(session)
+            assert (await rollup_rows(session))["rollup-b"] == (5.0, 1, 1, 0)
+
+            # Смена цены меняет выручку, но не число заказов
+            change = RollupChange()
+            await change.track(session, [(first, DAY)])
+            await connection.exec_driver_sql(
+                f"UPDATE products SET unit_price = 7 WHERE id = {product_b}"
+            )
+            await change.apply(session)
+            assert (await rollup_rows(session))["rollup-b"] == (7.0, 1, 1, 0)
+
+            # Ключ без продаж удаляется
+            change = RollupChange()
+            await change.track(session, [(first, DAY)])
+            await connection.exec_driver_sql(
+                f"DELETE FROM saledetailss WHERE sale_id = {first}"
+            )
+            await change.apply(session)
+            assert await rollup_rows(session) == {}
+        finally:
+            await session.rollback()
@@ -117,6 +117,29 @@ async def test_get_all_salesdetails(fake_super_token):
     assert isinstance(response.json(), list)
 
 
+@pytest.mark.asyncio
+async def test_get_all_salesdetails_paginated(fake_super_token, setup_database):
+    async with AsyncClient(
+        base_url="http://127.0.0.1:8000",
+        cookies={"users_access_token": fake_super_token}
+    ) as async_client:
+        response = await async_client.get("/saledetails/", params={"limit": 1})
+        assert response.status_code == 200
+        first = response.json()[0]
+        cursor = response.headers["X-Next-Cursor"]
+
+        response = await async_client.get(
+            "/saledetails/",
+            params={"limit": 1, "after": cursor}
+        )
+    assert response.status_code == 200
+    for row in response.json():
+        assert (row["sale_id"], row["product_id"]) > (
+            first["sale_id"],
+            first["product_id"]
+        )
+
+
 @pytest.mark.asyncio
 async def test_get_all_in_time_range(fake_super_token, setup_database):
     params = ["created_at", "updated_at"]
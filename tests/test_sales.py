@@ -4,6 +4,8 @@ from faker import Faker
 import random
 from fastapi.logger import logger
 
+from tests.conftest import fetch_all
+
 fake = Faker()
 
 
@@ -135,6 +137,69 @@ async def test_get_all_sales(fake_super_token):
     assert isinstance(response.json(), list)
 
 
+@pytest.mark.asyncio
+async def test_get_all_sales_paginated(fake_super_token, setup_database):
+    async with AsyncClient(
+        base_url="http://127.0.0.1:8000",
+        cookies={"users_access_token": fake_super_token}
+    ) as async_client:
+        response = await async_client.get("/sales/", params={"limit": 1})
+        assert response.status_code == 200
+        first_page = response.json()
+        assert len(first_page) == 1
+        cursor = response.headers["X-Next-Cursor"]
+
+        response = await async_client.get(
+            "/sales/",
+            params={"limit": 1, "after": cursor}
+        )
+    assert response.status_code == 200
+    second_page = response.json()
+    assert len(second_page) <= 1
+    if second_page:
+        assert second_page[0]["id"] > first_page[0]["id"]
+
+
+@pytest.mark.asyncio
+async def test_get_all_sales_bad_cursor(fake_super_token):
+    async with AsyncClient(
+        base_url="http://127.0.0.1:8000",
+        cookies={"users_access_token": fake_super_token}
+    ) as async_client:
+        response = await async_client.get(
+            "/sales/",
+            params={"limit": 1, "after": "not-a-cursor"}
+        )
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_get_all_sales_fields(fake_super_token, setup_database):
+    async with AsyncClient(
+        base_url="http://127.0.0.1:8000",
+        cookies={"users_access_token": fake_super_token}
+    ) as async_client:
+        response = await async_client.get(
+            "/sales/",
+            params={"limit": 1, "fields": "city,sale_date"}
+        )
+    assert response.status_code == 200
+    sales = response.json()
+    assert len(sales) == 1
+    assert set(sales[0]) == {"id", "city", "sale_date"}
+    assert "X-Next-Cursor" in response.headers
+
+
+@pytest.mark.asyncio
+async def test_get_all_sales_unknown_field(fake_super_token):
+    async with AsyncClient(
+        base_url="http://127.0.0.1:8000",
+        cookies={"users_access_token": fake_super_token}
+    ) as async_client:
+        response = await async_client.get("/sales/", params={"fields": "password"})
+    assert response.status_code == 422
+
+
 @pytest.mark.asyncio
 async def test_add_sale(fake_super_token):
     new_sale = {
@@ -176,6 +241,29 @@ async def test_get_all_sales_with_total(fake_super_token, setup_database):
     assert isinstance(response.json(), list)
 
 
+@pytest.mark.asyncio
+async def test_get_all_sales_with_total_filter_by_total(
+    fake_super_token,
+    setup_database
+):
+    async with AsyncClient(
+        base_url="http://127.0.0.1:8000",
+        cookies={"users_access_token": fake_super_token}
+    ) as async_client:
+        response = await async_client.get("/sales/with_total", params={"limit": 1})
+        assert response.status_code == 200
+        sale = response.json()[0]
+
+        response = await async_client.get(
+            "/sales/with_total",
+            params={"total_amount": sale["total_amount"]}
+        )
+    assert response.status_code == 200
+    sales = response.json()
+    assert sale["sale_id"] in [s["sale_id"] for s in sales]
+    assert all(s["total_amount"] == sale["total_amount"] for s in sales)
+
+
 @pytest.mark.asyncio
 async def test_get_all_sales_with_total_by_id(fake_super_token, setup_database):
     async with AsyncClient(
@@ -183,9 +271,7 @@ async def test_get_all_sales_with_total_by_id(fake_super_token, setup_database):
         cookies={"users_access_token": fake_super_token}
     ) as async_client:
 
-        response = await async_client.get("/sales/")
-        assert response.status_code == 200
-        sales = response.json()
+        sales = await fetch_all(async_client, "/sales/")
 
         max_sale_id = max(sale['id'] for sale in sales)
 
@@ -318,3 +404,164 @@ async def test_download_csv(fake_super_token):
     assert response.headers["Content-Type"] == "text/csv; charset=utf-8"
     assert "attachment; filename=sales.csv" in response.headers["Content-Disposition"]
     assert isinstance(response.content, bytes)
+
+
+@pytest.mark.asyncio
+async def test_download_csv_streams_header(fake_super_token):
+    async with AsyncClient(
+        base_url="http://127.0.0.1:8000",
+        cookies={"users_access_token": fake_super_token}
+    ) as async_client:
+        response = await async_client.get("/sales/download_csv/")
+    assert response.status_code == 200
+    header = response.text.splitlines()[0]
+    assert header == (
+        "id,branch,city,customer_type,customer_id,sale_date,created_at,updated_at"
+    )
+
+
+@pytest.mark.asyncio
+async def test_download_csv_fields(fake_super_token):
+    async with AsyncClient(
+        base_url="http://127.0.0.1:8000",
+        cookies={"users_access_token": fake_super_token}
+    ) as async_client:
+        response = await async_client.get(
+            "/sales/download_csv/",
+            params={"fields": "sale_date,city"}
+        )
+    assert response.status_code == 200
+    assert response.text.splitlines()[0] == "id,city,sale_date"
+
+
+@pytest.mark.asyncio
+async def test_bulk_insert_copy(fake_super_token):
+    test_data = (
+        b"branch,city,customer_type,customer_id,sale_date\n"
+        b"Branch A,City X,Retail,1,2025-01-10\n"
+        b"Branch B,City Y,Wholesale,1,2025-01-11\n"
+    )
+    file = {"file": ("test.csv", test_data, "text/csv")}
+    async with AsyncClient(
+        base_url="http://127.0.0.1:8000",
+        cookies={"users_access_token": fake_super_token}
+    ) as async_client:
+        response = await async_client.post(
+            "/sales/bulk_insert/",
+            params={"mode": "copy"},
+            files=file
+        )
+    assert response.status_code == 200
+    assert response.json()["message"] == "Продажи успешно добавлены!"
+
+
+@pytest.mark.asyncio
+async def test_bulk_insert_invalid_date(fake_super_token):
+    test_data = (
+        b"branch,city,customer_type,customer_id,sale_date\n"
+        b"Branch A,City X,Retail,1,2025-01-10\n"
+        b"Branch B,City Y,Wholesale,1,2025-02-30\n"
+    )
+    file = {"file": ("test.csv", test_data, "text/csv")}
+    async with AsyncClient(
+        base_url="http://127.0.0.1:8000",
+        cookies={"users_access_token": fake_super_token}
+    ) as async_client:
+        response = await async_client.post("/sales/bulk_insert/", files=file)
+    assert response.status_code == 422
+    errors = response.json()["detail"]["errors"]
+    assert errors[0]["line"] == 3
+    assert errors[0]["errors"][0]["loc"] == ["sale_date"]
+
+
+@pytest.mark.asyncio
+async def test_upd_sale_by_id_is_committed(fake_super_token, setup_database):
+    sale_id = 1
+    city = fake.city()
+    async with AsyncClient(
+        base_url="http://127.0.0.1:8000",
+        cookies={"users_access_token": fake_super_token}
+    ) as async_client:
+        response = await async_client.put(
+            f"/sales/update_by_id/{sale_id}",
+            params={"city_new": city}
+        )
+        assert response.status_code == 200
+
+        response = await async_client.get(f"/sales/{sale_id}")
+    assert response.json()["city"] == city
+
+
+@pytest.mark.asyncio
+async def test_get_revenue_series(fake_super_token, setup_database):
+    async with AsyncClient(
+        base_url="http://127.0.0.1:8000",
+        cookies={"users_access_token": fake_super_token}
+    ) as async_client:
+        response = await async_client.get(
+            "/sales/analytics/revenue_series",
+            params={
+                "start_date": "2025-01-15",
+                "end_date": "2025-03-10",
+                "granularity": "month"
+            }
+        )
+    assert response.status_code == 200
+    series = response.json()
+    assert [point["bucket"] for point in series] == [
+        "2025-01-01", "2025-02-01", "2025-03-01"
+    ]
+    for point in series:
+        assert point["revenue"] >= 0
+        assert point["orders"] >= 0
+        assert point["units"] >= 0
+
+
+@pytest.mark.asyncio
+async def test_get_revenue_series_bad_range(fake_super_token):
+    async with AsyncClient(
+        base_url="http://127.0.0.1:8000",
+        cookies={"users_access_token": fake_super_token}
+    ) as async_client:
+        response = await async_client.get(
+            "/sales/analytics/revenue_series",
+            params={"start_date": "2025-03-01", "end_date": "2025-01-01"}
+        )
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_get_sales_pivot(fake_super_token, setup_database):
+    async with AsyncClient(
+        base_url="http://127.0.0.1:8000",
+        cookies={"users_access_token": fake_super_token}
+    ) as async_client:
+        response = await async_client.get(
+            "/sales/analytics/pivot",
+            params={
+                "dimensions": ["branch", "month"],
+                "measures": ["revenue", "orders"]
+            }
+        )
+    assert response.status_code == 200
+    rows = response.json()
+    assert rows
+    assert set(rows[0]) == {"branch", "month", "revenue", "orders", "rolled_up"}
+    # Общий итог — последняя строка ROLLUP
+    assert rows[-1]["rolled_up"] == ["branch", "month"]
+    assert rows[-1]["orders"] == sum(
+        row["orders"] for row in rows if row["rolled_up"] == ["month"]
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_sales_pivot_unknown_dimension(fake_super_token):
+    async with AsyncClient(
+        base_url="http://127.0.0.1:8000",
+        cookies={"users_access_token": fake_super_token}
+    ) as async_client:
+        response = await async_client.get(
+            "/sales/analytics/pivot",
+            params={"dimensions": ["password"]}
+        )
+    assert response.status_code == 422